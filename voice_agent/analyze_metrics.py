@@ -0,0 +1,207 @@
+# analyze_metrics.py
+#
+# Reconstructs the per-turn voice-to-voice latency waterfall from the CSV files
+# written by MetricsCSVLogger and aggregates it across calls:
+#
+#   python analyze_metrics.py metrics/                  # every CSV in a directory
+#   python analyze_metrics.py metrics/*.csv --per-turn  # also print each turn
+#   python analyze_metrics.py metrics/ --turns-out turns.csv
+import argparse
+import csv
+import glob
+import os
+import sys
+from typing import Dict, List
+
+import numpy as np
+
+# Waterfall stages in the order the caller experiences them. The EOU delay is split
+# into the STT finalization part and the turn detector's wait on top of it.
+STAGES = ["stt_final", "turn_detection", "llm_ttft", "tts_ttfb"]
+PERCENTILES = [50, 90, 95, 99]
+
+FLOAT_COLUMNS = ["ttft", "ttfb", "end_of_utterance_delay", "transcription_delay", "metrics_timestamp"]
+
+
+def expand_paths(paths: List[str]) -> List[str]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "**", "*.csv"), recursive=True)))
+        else:
+            files.extend(sorted(glob.glob(path)))
+    return files
+
+
+def _float(value: str) -> float:
+    try:
+        return float(value) if value not in ("", None) else np.nan
+    except ValueError:
+        return np.nan
+
+
+def load_rows(files: List[str]) -> Dict[str, np.ndarray]:
+    """Columns of every metric row across files, plus a per-row turn key"""
+    kinds, keys, file_index = [], [], []
+    floats: Dict[str, list] = {name: [] for name in FLOAT_COLUMNS}
+
+    for index, path in enumerate(files):
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                # Older files have no speech_id column, fall back to the turn counter
+                turn = row.get("speech_id") or row.get("metrics_turncount") or ""
+                kinds.append(row.get("metrics_type", ""))
+                keys.append(f"{index}:{turn}")
+                file_index.append(index)
+                for name in FLOAT_COLUMNS:
+                    floats[name].append(_float(row.get(name)))
+
+    columns = {name: np.asarray(values, dtype=np.float64) for name, values in floats.items()}
+    columns["kind"] = np.asarray(kinds)
+    columns["key"] = np.asarray(keys)
+    columns["file"] = np.asarray(file_index, dtype=np.int64)
+    return columns
+
+
+def build_turns(rows: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """One waterfall per turn, using the first metric of each kind in the turn"""
+    turn_keys, turn_of_row = np.unique(rows["key"], return_inverse=True)
+    n_turns = len(turn_keys)
+
+    def first_per_turn(kind: str, column: str) -> np.ndarray:
+        values = np.full(n_turns, np.nan)
+        idx = np.flatnonzero((rows["kind"] == kind) & ~np.isnan(rows[column]))
+        if len(idx):
+            turns = turn_of_row[idx]
+            _, first = np.unique(turns, return_index=True)
+            values[turns[first]] = rows[column][idx[first]]
+        return values
+
+    eou_delay = first_per_turn("EOU", "end_of_utterance_delay")
+    stt_final = first_per_turn("EOU", "transcription_delay")
+    llm_ttft = first_per_turn("LLM", "ttft")
+    tts_ttfb = first_per_turn("TTS", "ttfb")
+    # Failed requests report -1
+    llm_ttft[llm_ttft < 0] = np.nan
+    tts_ttfb[tts_ttfb < 0] = np.nan
+
+    turns = {
+        "key": turn_keys,
+        "stt_final": stt_final,
+        "turn_detection": np.clip(eou_delay - stt_final, 0, None),
+        "llm_ttft": llm_ttft,
+        "tts_ttfb": tts_ttfb,
+    }
+    turns["voice_to_voice"] = eou_delay + llm_ttft + tts_ttfb
+    return turns
+
+
+def tail_attribution(turns: Dict[str, np.ndarray], tail_percentile: float = 95) -> Dict[str, Dict[str, float]]:
+    """How much each stage contributes to turns in the voice-to-voice tail.
+
+    `excess_share` is the stage's share of (tail mean - median) of voice-to-voice
+    latency, i.e. which stage grows when a turn is slow. `dominant_share` is how
+    often the stage is the largest one in a tail turn.
+    """
+    v2v = turns["voice_to_voice"]
+    complete = ~np.isnan(v2v)
+    if not complete.any():
+        return {}
+
+    stage_matrix = np.column_stack([turns[s][complete] for s in STAGES])
+    v2v = v2v[complete]
+    cutoff = np.percentile(v2v, tail_percentile)
+    tail = v2v >= cutoff
+
+    tail_mean = stage_matrix[tail].mean(axis=0)
+    median = np.median(stage_matrix, axis=0)
+    excess = tail_mean - median
+    total_excess = excess.sum()
+    dominant = np.bincount(stage_matrix[tail].argmax(axis=1), minlength=len(STAGES))
+
+    return {
+        stage: {
+            "tail_mean": float(tail_mean[i]),
+            "median": float(median[i]),
+            "excess_share": float(excess[i] / total_excess) if total_excess > 0 else 0.0,
+            "dominant_share": float(dominant[i] / tail.sum()),
+        }
+        for i, stage in enumerate(STAGES)
+    }
+
+
+def print_report(turns: Dict[str, np.ndarray], n_files: int):
+    v2v = turns["voice_to_voice"]
+    complete = int((~np.isnan(v2v)).sum())
+    print(f"{n_files} files, {len(v2v)} turns, {complete} with a complete waterfall\n")
+
+    header = f"{'stage':<16}" + "".join(f"{'p' + str(p):>9}" for p in PERCENTILES) + f"{'n':>9}"
+    print(header)
+    for stage in STAGES + ["voice_to_voice"]:
+        values = turns[stage][~np.isnan(turns[stage])]
+        if not len(values):
+            continue
+        pct = np.percentile(values, PERCENTILES)
+        print(f"{stage:<16}" + "".join(f"{v * 1000:7.0f}ms" for v in pct) + f"{len(values):9d}")
+
+    attribution = tail_attribution(turns)
+    if not attribution:
+        return
+    print("\nVoice-to-voice tail (>= p95) by stage")
+    print(f"{'stage':<16}{'median':>9}{'tail avg':>10}{'excess':>9}{'dominant':>10}")
+    for stage, a in attribution.items():
+        print(
+            f"{stage:<16}{a['median'] * 1000:7.0f}ms{a['tail_mean'] * 1000:8.0f}ms"
+            f"{a['excess_share'] * 100:8.0f}%{a['dominant_share'] * 100:9.0f}%"
+        )
+    worst = max(attribution, key=lambda s: attribution[s]["excess_share"])
+    print(f"\nTail is dominated by {worst}: {attribution[worst]['excess_share'] * 100:.0f}% of the excess latency in slow turns")
+
+
+def print_turns(turns: Dict[str, np.ndarray], files: List[str]):
+    print(f"{'file':<40}{'turn':>24}" + "".join(f"{s:>16}" for s in STAGES + ["voice_to_voice"]))
+    for i, key in enumerate(turns["key"]):
+        file_index, turn = key.split(":", 1)
+        cells = "".join(
+            f"{'-':>16}" if np.isnan(turns[s][i]) else f"{turns[s][i] * 1000:14.0f}ms"
+            for s in STAGES + ["voice_to_voice"]
+        )
+        print(f"{os.path.basename(files[int(file_index)])[-40:]:<40}{turn[-24:]:>24}{cells}")
+    print()
+
+
+def write_turns(turns: Dict[str, np.ndarray], files: List[str], path: str):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["file", "turn"] + STAGES + ["voice_to_voice"])
+        for i, key in enumerate(turns["key"]):
+            file_index, turn = key.split(":", 1)
+            writer.writerow(
+                [files[int(file_index)], turn]
+                + ["" if np.isnan(turns[s][i]) else f"{turns[s][i]:.4f}" for s in STAGES + ["voice_to_voice"]]
+            )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Voice-to-voice latency waterfall from metrics CSVs")
+    parser.add_argument("paths", nargs="+", help="CSV files, globs or directories")
+    parser.add_argument("--per-turn", action="store_true", help="Print the waterfall of every turn")
+    parser.add_argument("--turns-out", help="Write the per-turn waterfall table to this CSV")
+    args = parser.parse_args(argv)
+
+    files = expand_paths(args.paths)
+    if not files:
+        print("No metrics CSV files found", file=sys.stderr)
+        return 1
+
+    turns = build_turns(load_rows(files))
+    if args.per_turn:
+        print_turns(turns, files)
+    print_report(turns, len(files))
+    if args.turns_out:
+        write_turns(turns, files, args.turns_out)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+# answering_machine.py
+#
+# Local answering-machine detection on the first seconds of the callee's audio,
+# so voicemail is hung up on before the greeting costs an LLM turn and TTS.
+# Frame features are computed with NumPy: speech/silence from frame energy, word
+# cadence (words, greeting length, silence after it) and beeps (a sustained
+# narrowband tone). A human answers with a short "Hello?" and waits; a machine
+# plays a long greeting and usually a beep. Only a tone (the voicemail beep or a
+# carrier's SIT tones) gives a machine verdict and hangs up. Greeting length is
+# not enough on its own, people answer with whole sentences too: a greeting whose
+# cadence is at or above AMD_MACHINE_CONFIDENCE only keeps the detector listening
+# for the beep that follows it. Anything uncertain is greeted as before, and the
+# LLM can still call detected_answering_machine.
+#
+# benchmarks/amd_eval.py measures accuracy and decision time on a labelled set.
+import asyncio
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import numpy as np
+from livekit import rtc
+
+amd_logger = logging.getLogger("answering_machine")
+
+AMD_ENABLED = os.getenv("AMD") == "1"
+# Cadence score above which the detector waits for a beep after the greeting
+# instead of greeting the callee at their first pause (see benchmarks/amd_eval.py)
+AMD_MACHINE_CONFIDENCE = float(os.getenv("AMD_MACHINE_CONFIDENCE", "0.99"))
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+
+LABEL_HUMAN = "human"
+LABEL_MACHINE = "machine"
+LABEL_UNKNOWN = "unknown"
+
+# Speech is this far above the running noise floor, and never below SPEECH_MIN_DBFS
+SPEECH_MARGIN_DB = 12.0
+SPEECH_MIN_DBFS = -45.0
+# Beeps are tones between these frequencies carrying most of the band's energy
+BEEP_MIN_HZ = 300.0
+BEEP_MAX_HZ = 3000.0
+BEEP_TONAL_RATIO = 0.7
+BEEP_MIN_DBFS = -40.0
+
+
+@dataclass
+class AMDVerdict:
+    label: str
+    # Probability that the callee is a machine
+    confidence: float
+    reason: str
+    decided_after_s: float
+    features: Dict[str, Any] = field(default_factory=dict)
+
+
+class AnsweringMachineDetector:
+    """Classifies 20ms frames of 16kHz mono audio as they arrive.
+
+    Cadence rules and defaults follow the classic AMD timing parameters (initial
+    silence, greeting length, silence after the greeting, word count). The length
+    of the greeting and its word count are turned into a machine confidence with a
+    logistic curve centred on `greeting_s` / `max_words`. That confidence never
+    hangs up by itself: above `machine_confidence` the detector keeps listening
+    for `beep_wait_s` after the greeting (up to `max_analysis_s` in all), and only
+    a beep makes the verdict a machine.
+    """
+
+    def __init__(
+        self,
+        machine_confidence: float = AMD_MACHINE_CONFIDENCE,
+        initial_silence_s: float = 2.5,
+        greeting_s: float = 1.5,
+        after_greeting_silence_s: float = 0.8,
+        total_analysis_s: float = 5.0,
+        max_analysis_s: float = 10.0,
+        beep_wait_s: float = 0.7,
+        min_word_s: float = 0.1,
+        between_words_silence_s: float = 0.05,
+        max_words: int = 3,
+        beep_min_s: float = 0.16,
+    ):
+        self.machine_confidence = machine_confidence
+        self.initial_silence_s = initial_silence_s
+        self.greeting_s = greeting_s
+        self.after_greeting_silence_s = after_greeting_silence_s
+        self.total_analysis_s = total_analysis_s
+        self.max_analysis_s = max_analysis_s
+        self.beep_wait_s = beep_wait_s
+        self.min_word_s = min_word_s
+        self.between_words_silence_s = between_words_silence_s
+        self.max_words = max_words
+        self.beep_min_frames = math.ceil(beep_min_s * 1000 / FRAME_MS)
+
+        self.window = np.hanning(FRAME_SAMPLES).astype(np.float32)
+        freqs = np.fft.rfftfreq(FRAME_SAMPLES, 1 / SAMPLE_RATE)
+        self.band = (freqs >= BEEP_MIN_HZ) & (freqs <= BEEP_MAX_HZ)
+        self.band_offset = int(np.argmax(self.band))
+
+        self.elapsed_s = 0.0
+        self.noise_floor_dbfs = -60.0
+        self.words = 0
+        self.speech_run_s = 0.0
+        self.silence_run_s = 0.0
+        self.speech_s = 0.0
+        self.utterance_started_at: Optional[float] = None
+        self.last_speech_at: Optional[float] = None
+        self.beep_frames = 0
+        self.beep_bin: Optional[int] = None
+        self.beep_at: Optional[float] = None
+        self.verdict: Optional[AMDVerdict] = None
+
+    def _is_beep_frame(self, samples: np.ndarray, level: float) -> Optional[int]:
+        if level < BEEP_MIN_DBFS:
+            return None
+        power = np.abs(np.fft.rfft(samples * self.window)) ** 2
+        band = power[self.band]
+        total = band.sum()
+        if total <= 0:
+            return None
+        peak = int(np.argmax(band))
+        # A pure tone leaks into the neighbouring bins through the window
+        tonal = band[max(0, peak - 1):peak + 2].sum() / total
+        return peak + self.band_offset if tonal >= BEEP_TONAL_RATIO else None
+
+    def machine_probability(self) -> float:
+        if self.utterance_started_at is None:
+            return 0.0
+        end = self.last_speech_at if self.silence_run_s > 0 else self.elapsed_s
+        greeting = end - self.utterance_started_at
+        z = 2.0 * (greeting - self.greeting_s) + 0.8 * (self.words - self.max_words)
+        return 1 / (1 + math.exp(-z))
+
+    def features(self) -> Dict[str, Any]:
+        greeting = None
+        if self.utterance_started_at is not None:
+            greeting = (self.last_speech_at or self.elapsed_s) - self.utterance_started_at
+        return {
+            "initial_silence_s": self.utterance_started_at if self.utterance_started_at is not None else self.elapsed_s,
+            "greeting_s": greeting,
+            "words": self.words,
+            "speech_s": round(self.speech_s, 2),
+            "beep_at_s": self.beep_at,
+            "noise_floor_dbfs": round(self.noise_floor_dbfs, 1),
+        }
+
+    def _decide(self, label: str, confidence: float, reason: str) -> AMDVerdict:
+        self.verdict = AMDVerdict(label, round(confidence, 3), reason, round(self.elapsed_s, 2), self.features())
+        return self.verdict
+
+    def add(self, samples: np.ndarray) -> Optional[AMDVerdict]:
+        """Feed one frame of int16 samples; returns the verdict once there is one"""
+        if self.verdict is not None:
+            return self.verdict
+
+        frame_s = len(samples) / SAMPLE_RATE
+        self.elapsed_s += frame_s
+        samples = samples.astype(np.float32)
+        rms = np.sqrt(np.mean(samples ** 2)) if len(samples) else 0.0
+        level = max(-96.0, 20 * math.log10(rms / 32768 + 1e-9))
+
+        beep_bin = self._is_beep_frame(samples, level) if len(samples) == FRAME_SAMPLES else None
+        if beep_bin is not None and (self.beep_bin is None or abs(beep_bin - self.beep_bin) <= 1):
+            self.beep_frames += 1
+        else:
+            self.beep_frames = 1 if beep_bin is not None else 0
+        self.beep_bin = beep_bin
+        if self.beep_frames >= self.beep_min_frames:
+            self.beep_at = round(self.elapsed_s, 2)
+            return self._decide(LABEL_MACHINE, 0.99, "beep")
+
+        is_speech = level > max(SPEECH_MIN_DBFS, self.noise_floor_dbfs + SPEECH_MARGIN_DB)
+        if is_speech:
+            run_before = self.speech_run_s
+            self.speech_run_s += frame_s
+            self.silence_run_s = 0.0
+            self.speech_s += frame_s
+            if run_before < self.min_word_s <= self.speech_run_s + 1e-9:
+                # Long enough to count as a word
+                self.words += 1
+                if self.utterance_started_at is None:
+                    self.utterance_started_at = self.elapsed_s - self.speech_run_s
+            if self.utterance_started_at is not None:
+                self.last_speech_at = self.elapsed_s
+        else:
+            self.silence_run_s += frame_s
+            if self.silence_run_s >= self.between_words_silence_s:
+                self.speech_run_s = 0.0
+            # Slow to rise, quick to fall, so speech does not drag the floor up
+            alpha = 0.02 if level > self.noise_floor_dbfs else 0.2
+            self.noise_floor_dbfs += alpha * (level - self.noise_floor_dbfs)
+
+        probability = self.machine_probability()
+        likely_machine = probability >= self.machine_confidence
+
+        if self.utterance_started_at is None:
+            if self.elapsed_s >= self.initial_silence_s:
+                return self._decide(LABEL_UNKNOWN, 0.5, "initial silence")
+        elif self.silence_run_s >= self.after_greeting_silence_s:
+            if not likely_machine:
+                # A short greeting followed by a pause is someone waiting for us to talk
+                label = LABEL_HUMAN if probability < 0.5 else LABEL_UNKNOWN
+                return self._decide(label, probability, "short greeting" if label == LABEL_HUMAN else "pause after greeting")
+            if self.silence_run_s >= self.after_greeting_silence_s + self.beep_wait_s:
+                # Voicemail beeps right after its greeting; a long greeting alone may be a person
+                return self._decide(LABEL_UNKNOWN, probability, "long greeting, no beep")
+
+        if self.elapsed_s >= (self.max_analysis_s if likely_machine else self.total_analysis_s):
+            return self._decide(LABEL_UNKNOWN, probability, "analysis time exceeded")
+        return None
+
+    def finish(self) -> AMDVerdict:
+        """Verdict for audio that ended before the detector decided"""
+        if self.verdict is None:
+            self._decide(LABEL_UNKNOWN, self.machine_probability(), "audio ended")
+        return self.verdict
+
+
+async def detect_answering_machine(
+    participant: rtc.RemoteParticipant,
+    detector: Optional[AnsweringMachineDetector] = None,
+    timeout: Optional[float] = None,
+) -> AMDVerdict:
+    """Run the detector on the participant's microphone audio until it decides"""
+    detector = detector or AnsweringMachineDetector()
+    if timeout is None:
+        timeout = detector.max_analysis_s + 1.0
+    started_at = time.perf_counter()
+    stream = rtc.AudioStream.from_participant(
+        participant=participant,
+        track_source=rtc.TrackSource.SOURCE_MICROPHONE,
+        sample_rate=SAMPLE_RATE,
+        num_channels=1,
+        frame_size_ms=FRAME_MS,
+    )
+
+    async def run() -> AMDVerdict:
+        async for event in stream:
+            verdict = detector.add(np.frombuffer(event.frame.data, dtype=np.int16))
+            if verdict is not None:
+                return verdict
+        return detector.finish()
+
+    try:
+        verdict = await asyncio.wait_for(run(), timeout)
+    except asyncio.TimeoutError:
+        verdict = detector.finish()
+    finally:
+        await stream.aclose()
+
+    amd_logger.info(
+        f"AMD verdict {verdict.label} ({verdict.reason}, machine confidence {verdict.confidence:.2f}) "
+        f"after {(time.perf_counter() - started_at) * 1000:.0f}ms, features {verdict.features}"
+    )
+    return verdict
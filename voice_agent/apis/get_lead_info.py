@@ -1,5 +1,6 @@
 import os
 import asyncio
+import logging
 import aiohttp
 from typing import Dict, Optional, List
 
@@ -7,6 +8,8 @@ from dotenv import load_dotenv
 
 load_dotenv(dotenv_path=".env.local")
 
+lead_logger = logging.getLogger("get_lead_info")
+
 
 async def get_lead_info(phone_number: str) -> Optional[Dict[str, str]]:
     """
@@ -102,10 +105,10 @@ async def get_lead_info(phone_number: str) -> Optional[Dict[str, str]]:
                     return None
 
     except aiohttp.ClientError as e:
-        print(f"Error making API request: {e}")
+        lead_logger.error("Error making API request: %s", e)
         return None
     except Exception as e:
-        print(f"Unexpected error: {e}")
+        lead_logger.exception("Unexpected error looking up lead")
         return None
 
 
@@ -0,0 +1,21 @@
+from dotenv import load_dotenv
+from livekit import api
+from livekit.agents import get_job_context
+
+load_dotenv(dotenv_path=".env.local")
+
+
+def get_livekit_api() -> api.LiveKitAPI:
+    """
+    Returns the job's LiveKit API client.
+
+    JobContext.api shares the framework's pooled HTTP session, so room and SIP
+    calls made during a call reuse warm connections instead of opening a new
+    client per request. LiveKit closes that session only after every shutdown
+    callback has finished, so hangups running inside those callbacks can still
+    use it; do not close it here.
+
+    Returns:
+        api.LiveKitAPI: Client configured from LIVEKIT_URL/API_KEY/API_SECRET
+    """
+    return get_job_context().api
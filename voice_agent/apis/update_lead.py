@@ -1,10 +1,13 @@
 import os
 import asyncio
+import logging
 import aiohttp
 from dotenv import load_dotenv
 
 load_dotenv(dotenv_path=".env.local")
 
+lead_logger = logging.getLogger("update_lead")
+
 
 async def update_lead(lead_id: str, **kwargs) -> bool:
     """
@@ -44,17 +47,41 @@ async def update_lead(lead_id: str, **kwargs) -> bool:
             async with session.post(url, params=params) as response:
                 response.raise_for_status()
                 await response.text()  # Read response body
-                print(f"Lead updated for: {lead_id}")
+                lead_logger.info("Lead updated for: %s", lead_id)
                 return True
 
     except aiohttp.ClientError as e:
-        print(f"Error making API request: {e}")
+        lead_logger.error("Error making API request: %s", e)
         return False
     except Exception as e:
-        print(f"Unexpected error: {e}")
+        lead_logger.exception("Unexpected error updating lead %s", lead_id)
         return False
 
 
+async def update_lead_with_retry(
+    lead_id: str, attempts: int = 3, backoff: float = 0.5, **kwargs
+) -> bool:
+    """
+    Calls update_lead, retrying with exponential backoff until it succeeds.
+
+    Args:
+        lead_id (str): The lead ID to update (required)
+        attempts (int): Maximum number of attempts
+        backoff (float): Delay in seconds before the first retry, doubled after each
+        **kwargs: Fields to update, passed through to update_lead
+
+    Returns:
+        bool: True if any attempt succeeded, False otherwise
+    """
+    for attempt in range(1, attempts + 1):
+        if await update_lead(lead_id=lead_id, **kwargs):
+            return True
+        if attempt < attempts:
+            lead_logger.warning("Lead update for %s failed, retrying (%d/%d)", lead_id, attempt, attempts)
+            await asyncio.sleep(backoff * 2 ** (attempt - 1))
+    return False
+
+
 # Example usage
 async def main():
     # Example: Update a single lead
@@ -0,0 +1,201 @@
+# benchmarks/amd_eval.py
+#
+# Accuracy and decision time of the local answering-machine detector
+# (answering_machine.py) on a labelled evaluation set, swept over machine
+# confidence thresholds. Without --data it uses a deterministic synthetic set of
+# human pickups and voicemail greetings; with --data it reads recorded pickups,
+# 16 kHz mono WAVs under DIR/human/ and DIR/machine/. Run from voice_agent/:
+#
+#   python benchmarks/amd_eval.py
+#   python benchmarks/amd_eval.py --data amd_recordings/ --thresholds 0.9,0.95,0.99
+import argparse
+import glob
+import os
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+from answering_machine import (
+    AMD_MACHINE_CONFIDENCE,
+    FRAME_SAMPLES,
+    LABEL_HUMAN,
+    LABEL_MACHINE,
+    SAMPLE_RATE,
+    AnsweringMachineDetector,
+)
+from replay_standins import load_wav, synthetic_speech
+
+
+def silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.int16)
+
+
+def beep(seconds: float = 0.4, hz: float = 1000.0) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (6000 * np.sin(2 * np.pi * hz * t)).astype(np.int16)
+
+
+def sit_tones() -> np.ndarray:
+    """Special information tones that open a carrier intercept message"""
+    return np.concatenate([beep(0.274, 913.8), beep(0.274, 1370.6), beep(0.380, 1776.7)])
+
+
+def words(rng: np.random.Generator, count: int, seed: int, word_s=(0.25, 0.5), gap_s=(0.08, 0.25), sentence=0) -> np.ndarray:
+    """Speech-like words separated by short gaps, with a longer pause every `sentence` words"""
+    parts = []
+    for i in range(count):
+        parts.append(synthetic_speech(rng.uniform(*word_s), seed=seed + i))
+        if i < count - 1:
+            pause = rng.uniform(0.4, 0.6) if sentence and (i + 1) % sentence == 0 else rng.uniform(*gap_s)
+            parts.append(silence(pause))
+    return np.concatenate(parts)
+
+
+def add_noise(rng: np.random.Generator, samples: np.ndarray, dbfs: float) -> np.ndarray:
+    noise = rng.normal(0, 32768 * 10 ** (dbfs / 20), len(samples))
+    return np.clip(samples + noise, -32768, 32767).astype(np.int16)
+
+
+def synthetic_set(cases_per_kind: int = 10) -> List[Tuple[str, str, np.ndarray]]:
+    """(name, label, audio) for typical human pickups and voicemail greetings"""
+    cases = []
+    for i in range(cases_per_kind):
+        rng = np.random.default_rng(i)
+        seed = i * 100
+        human = {
+            "hello": np.concatenate([silence(rng.uniform(0.2, 0.8)), words(rng, 1, seed, (0.4, 0.8)), silence(3)]),
+            "hello_hello": np.concatenate([
+                silence(0.3), words(rng, 1, seed, (0.3, 0.5)), silence(0.6), words(rng, 1, seed + 1, (0.3, 0.5)), silence(3),
+            ]),
+            "late_hello": np.concatenate([silence(rng.uniform(1.0, 2.0)), words(rng, 1, seed, (0.4, 0.7)), silence(3)]),
+            "who_is_this": np.concatenate([silence(0.4), words(rng, 3, seed, (0.2, 0.35)), silence(3)]),
+            # "Hi, this is Mark, who's calling?": a whole sentence, about 6 words over 2 s
+            "sentence": np.concatenate([silence(0.4), words(rng, 6, seed, (0.2, 0.35), (0.05, 0.15)), silence(3)]),
+            "chatty": np.concatenate([
+                silence(0.3), words(rng, int(rng.integers(7, 11)), seed, (0.2, 0.35), (0.05, 0.15), sentence=4), silence(3),
+            ]),
+            "hello_then_sentence": np.concatenate([
+                silence(0.3), words(rng, 1, seed, (0.3, 0.5)), silence(0.5),
+                words(rng, 5, seed + 1, (0.2, 0.35), (0.05, 0.15)), silence(3),
+            ]),
+        }
+        machine = {
+            "greeting": np.concatenate([silence(0.3), words(rng, int(rng.integers(8, 16)), seed, sentence=5), silence(1)]),
+            "greeting_beep": np.concatenate([
+                silence(0.3), words(rng, int(rng.integers(6, 12)), seed, sentence=4), silence(0.5), beep(hz=rng.uniform(800, 1400)),
+            ]),
+            # "...at the tone, please record your message." and the beep a moment later
+            "greeting_pause_beep": np.concatenate([
+                silence(0.3), words(rng, int(rng.integers(6, 12)), seed, sentence=4), silence(rng.uniform(0.9, 1.4)), beep(),
+            ]),
+            "short_greeting_beep": np.concatenate([silence(0.5), words(rng, 3, seed), silence(0.4), beep(), silence(2)]),
+            "carrier_message": np.concatenate([
+                silence(0.2), sit_tones(), silence(0.3), words(rng, 14, seed, (0.2, 0.4), (0.05, 0.12)), silence(1),
+            ]),
+        }
+        for kind, audio in human.items():
+            cases.append((f"{kind}_{i}", LABEL_HUMAN, audio))
+            if kind in ("hello", "sentence"):
+                cases.append((f"{kind}_noisy_{i}", LABEL_HUMAN, add_noise(rng, audio, -45)))
+        for kind, audio in machine.items():
+            cases.append((f"{kind}_{i}", LABEL_MACHINE, audio))
+            if kind == "greeting":
+                cases.append((f"{kind}_noisy_{i}", LABEL_MACHINE, add_noise(rng, audio, -45)))
+    return cases
+
+
+def recorded_set(data_dir: str) -> List[Tuple[str, str, np.ndarray]]:
+    cases = []
+    for label in (LABEL_HUMAN, LABEL_MACHINE):
+        for path in sorted(glob.glob(os.path.join(data_dir, label, "*.wav"))):
+            cases.append((os.path.relpath(path, data_dir), label, load_wav(path)))
+    return cases
+
+
+def classify(audio: np.ndarray, threshold: float):
+    detector = AnsweringMachineDetector(machine_confidence=threshold)
+    for start in range(0, len(audio), FRAME_SAMPLES):
+        verdict = detector.add(audio[start:start + FRAME_SAMPLES])
+        if verdict is not None:
+            return verdict
+    return detector.finish()
+
+
+def evaluate(cases, threshold: float, verbose: bool = False) -> Dict[str, float]:
+    counts = {(truth, label): 0 for truth in (LABEL_HUMAN, LABEL_MACHINE) for label in ("human", "machine", "unknown")}
+    decision_s = {LABEL_HUMAN: [], LABEL_MACHINE: []}
+    cpu_started_at = time.process_time()
+    audio_s = 0.0
+    for name, truth, audio in cases:
+        verdict = classify(audio, threshold)
+        counts[(truth, verdict.label)] += 1
+        decision_s[truth].append(verdict.decided_after_s)
+        audio_s += verdict.decided_after_s
+        if verbose:
+            mark = "" if verdict.label in (truth, "unknown") else "  WRONG"
+            print(f"  {name:<28} {truth:<8} -> {verdict.label:<8} {verdict.confidence:5.2f} "
+                  f"{verdict.reason:<22} {verdict.decided_after_s:5.2f}s{mark}")
+    cpu_s = time.process_time() - cpu_started_at
+
+    humans = sum(v for (truth, _), v in counts.items() if truth == LABEL_HUMAN)
+    machines = sum(v for (truth, _), v in counts.items() if truth == LABEL_MACHINE)
+    hung_up = counts[(LABEL_HUMAN, "machine")] + counts[(LABEL_MACHINE, "machine")]
+    return {
+        "threshold": threshold,
+        # Humans we would hang up on: the error that matters
+        "false_hangup_rate": counts[(LABEL_HUMAN, "machine")] / humans if humans else 0.0,
+        "machine_recall": counts[(LABEL_MACHINE, "machine")] / machines if machines else 0.0,
+        "machine_precision": counts[(LABEL_MACHINE, "machine")] / hung_up if hung_up else 1.0,
+        "human_recall": counts[(LABEL_HUMAN, "human")] / humans if humans else 0.0,
+        "machine_decision_s": float(np.mean(decision_s[LABEL_MACHINE])) if decision_s[LABEL_MACHINE] else 0.0,
+        "human_decision_s": float(np.mean(decision_s[LABEL_HUMAN])) if decision_s[LABEL_HUMAN] else 0.0,
+        "cpu_ms_per_audio_s": cpu_s / audio_s * 1000 if audio_s else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Evaluate the local answering-machine detector")
+    parser.add_argument("--data", help="Directory with human/ and machine/ 16 kHz mono WAVs (default: synthetic set)")
+    parser.add_argument("--thresholds", default="0.5,0.7,0.8,0.9,0.95,0.99,0.999")
+    parser.add_argument("--max-false-hangup-rate", type=float, default=0.01)
+    parser.add_argument("--verbose", action="store_true", help="Print every case at the first threshold")
+    args = parser.parse_args(argv)
+
+    cases = recorded_set(args.data) if args.data else synthetic_set()
+    if not cases:
+        print("No evaluation cases found", file=sys.stderr)
+        return 1
+    humans = sum(1 for _, label, _ in cases if label == LABEL_HUMAN)
+    print(f"{len(cases)} cases ({humans} human, {len(cases) - humans} machine)\n")
+
+    thresholds = [float(t) for t in args.thresholds.split(",")]
+    results = []
+    for i, threshold in enumerate(thresholds):
+        results.append(evaluate(cases, threshold, verbose=args.verbose and i == 0))
+
+    print(f"\n{'threshold':>9} {'false hangup':>13} {'machine recall':>15} {'precision':>10} "
+          f"{'human recall':>13} {'machine at':>11} {'human at':>9} {'cpu/audio s':>12}")
+    for r in results:
+        print(f"{r['threshold']:9g} {r['false_hangup_rate'] * 100:12.1f}% {r['machine_recall'] * 100:14.1f}% "
+              f"{r['machine_precision'] * 100:9.1f}% {r['human_recall'] * 100:12.1f}% "
+              f"{r['machine_decision_s']:10.2f}s {r['human_decision_s']:8.2f}s {r['cpu_ms_per_audio_s']:10.2f}ms")
+
+    safe = [r for r in results if r["false_hangup_rate"] <= args.max_false_hangup_rate]
+    if not safe:
+        print(f"\nNo threshold keeps false hangups under {args.max_false_hangup_rate * 100:.1f}%")
+        return 1
+    # Ties go to the higher threshold, which keeps fewer people waiting for a beep
+    best = max(safe, key=lambda r: (r["machine_recall"], r["threshold"]))
+    print(f"\nRecommended AMD_MACHINE_CONFIDENCE={best['threshold']:g}: "
+          f"{best['machine_recall'] * 100:.0f}% of voicemail hung up after {best['machine_decision_s']:.1f}s on average, "
+          f"people greeted after {best['human_decision_s']:.1f}s (current setting {AMD_MACHINE_CONFIDENCE:g})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+# benchmarks/barge_in_tts.py
+#
+# What a caller barge-in costs the Resemble connection, with tts_cancellation.py
+# and with the previous behaviour (TTS_FAST_CANCEL=0: the socket is dropped and
+# closed inside the next turn's pool.get()). Each trial streams a multi-sentence
+# reply through the real resemble plugin and patched_run_ws against the replay
+# stand-in (replay_backends.py), interrupts it once audio is flowing, and then
+# starts the next reply. Reported per mode:
+#
+#   reuse_ms       interruption until a socket is idle in the pool again
+#   next_ttfb_ms   the next reply's first audio, from its start
+#
+# Localhost connects and closes take ~1ms, so --rtt-ms adds what they cost
+# against Resemble: 3 round trips per connect (TCP, TLS, upgrade), 1 per close.
+# Run from voice_agent/:
+#
+#   python benchmarks/barge_in_tts.py --trials 20
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+import aiohttp
+from livekit.plugins import resemble
+import livekit.plugins.resemble.tts as resemble_tts
+
+import main
+from replay_backends import BackendTiming, serve
+
+REPLY_SENTENCES = [
+    "I completely understand, and I just want to make sure you know about the program.",
+    "It can lower your monthly payments on unsecured debt.",
+    "Most people we talk to are able to save quite a bit every month.",
+    "It only takes a couple of minutes to see if you qualify.",
+    "Would you like me to connect you with a specialist right now?",
+]
+NEXT_REPLY = "Sure, no problem at all."
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def with_network_rtt(tts: resemble.TTS, rtt_s: float):
+    pool = tts._pool
+    connect, close = pool._connect_cb, pool._close_cb
+
+    async def slow_connect(timeout: float):
+        await asyncio.sleep(3 * rtt_s)
+        return await connect(timeout)
+
+    async def slow_close(ws):
+        await asyncio.sleep(rtt_s)
+        await close(ws)
+
+    pool._connect_cb, pool._close_cb = slow_connect, slow_close
+
+
+async def first_audio_ms(stream, started_at: float) -> float:
+    async for _ in stream:
+        return (time.perf_counter() - started_at) * 1000
+    raise RuntimeError("TTS stream ended without audio")
+
+
+async def wait_idle_socket(tts: resemble.TTS, since: float, timeout: float = 5.0) -> Optional[float]:
+    while time.perf_counter() - since < timeout:
+        if tts._pool._available:
+            return (time.perf_counter() - since) * 1000
+        await asyncio.sleep(0.001)
+    return None
+
+
+async def trial(backend_url: str, fast_cancel: bool, args) -> Dict[str, Any]:
+    rtt_s, interrupt_after_s, next_turn_after_s = args.rtt_ms / 1000, args.interrupt_after_ms / 1000, args.next_turn_after_ms / 1000
+    main.TTS_FAST_CANCEL = fast_cancel
+    resemble_tts.RESEMBLE_WEBSOCKET_URL = f"{backend_url.replace('http', 'ws')}/stream"
+    async with aiohttp.ClientSession() as http_session:
+        tts = resemble.TTS(api_key="bench", voice_uuid="3c089e29", sample_rate=24000, http_session=http_session)
+        with_network_rtt(tts, rtt_s)
+        # A warm socket, as after prewarm
+        tts._pool.put(await tts._pool.get(timeout=10))
+
+        stream = tts.stream()
+        stream.push_text(" ".join(REPLY_SENTENCES[:args.sentences]))
+        stream.end_input()
+        await first_audio_ms(stream, time.perf_counter())
+        await asyncio.sleep(interrupt_after_s)
+
+        # What LiveKit does on barge-in
+        interrupted_at = time.perf_counter()
+        await stream.aclose()
+        # Only the new path puts a socket back by itself
+        reuse_ms = await wait_idle_socket(tts, interrupted_at, timeout=next_turn_after_s + 2.0) if fast_cancel else None
+
+        await asyncio.sleep(max(0.0, interrupted_at + next_turn_after_s - time.perf_counter()))
+        started_at = time.perf_counter()
+        stream = tts.stream()
+        stream.push_text(NEXT_REPLY)
+        stream.end_input()
+        next_ttfb_ms = await first_audio_ms(stream, started_at)
+        async for _ in stream:
+            pass
+
+        await main.tts_cancellation.aclose()
+        await tts.aclose()
+    return {"reuse_ms": reuse_ms, "next_ttfb_ms": next_ttfb_ms}
+
+
+def median(values: List[Optional[float]]) -> Optional[float]:
+    values = [v for v in values if v is not None]
+    return statistics.median(values) if values else None
+
+
+async def run_all(backend_url: str, args) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for name, fast_cancel in (("previous", False), ("fast cancel", True)):
+        main.tts_cancellation = main.TTSCancellation()
+        trials = [
+            await trial(backend_url, fast_cancel, args)
+            for _ in range(args.trials)
+        ]
+        results[name] = {
+            "reuse_ms_p50": median([t["reuse_ms"] for t in trials]),
+            "next_ttfb_ms_p50": median([t["next_ttfb_ms"] for t in trials]),
+            "next_ttfb_ms_max": max(t["next_ttfb_ms"] for t in trials),
+            "cancellations": main.tts_cancellation.stats(),
+        }
+    return results
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Resemble socket reuse after a barge-in")
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--rtt-ms", type=float, default=60.0, help="Simulated round trip to Resemble")
+    parser.add_argument("--interrupt-after-ms", type=float, default=300.0, help="Barge-in this long after the first audio")
+    parser.add_argument("--sentences", type=int, default=len(REPLY_SENTENCES), help="Sentences in the interrupted reply")
+    parser.add_argument("--next-turn-after-ms", type=float, default=700.0, help="Next reply starts this long after the barge-in")
+    args = parser.parse_args(argv)
+
+    port = free_port()
+    ctx = multiprocessing.get_context("spawn")
+    ready = ctx.Event()
+    backends = ctx.Process(target=serve, args=(port, {}, BackendTiming(), ready), daemon=True)
+    backends.start()
+    try:
+        if not ready.wait(timeout=30):
+            print("Backend stand-ins did not start", file=sys.stderr)
+            return 1
+        results = asyncio.run(run_all(f"http://127.0.0.1:{port}", args))
+    finally:
+        backends.terminate()
+        backends.join()
+
+    print(f"{args.trials} barge-ins per mode into a {args.sentences}-sentence reply, RTT {args.rtt_ms:.0f}ms, next reply {args.next_turn_after_ms:.0f}ms after the barge-in")
+    print(f"{'':<14}{'reuse p50':>12}{'next ttfb p50':>16}{'next ttfb max':>16}")
+    for name, r in results.items():
+        reuse = f"{r['reuse_ms_p50']:.1f}ms" if r["reuse_ms_p50"] is not None else "never"
+        print(f"{name:<14}{reuse:>12}{r['next_ttfb_ms_p50']:>14.1f}ms{r['next_ttfb_ms_max']:>14.1f}ms")
+    print(f"fast cancel: {results['fast cancel']['cancellations']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,265 @@
+# benchmarks/capacity_load_test.py
+#
+# A pipeline-only approximation of how many simultaneous calls one worker host
+# can hold. Ramps the number of concurrent calls, each in its own process like a
+# LiveKit job process, replaying the corpus back to back through the call
+# pipeline of replay_pipeline.py with the production Silero VAD. That is the
+# AgentSession and GalacticVoiceAgent, not main.entrypoint: the lead lookup, task
+# supervisor, journal, tracing, shutdown callbacks and hangup paths do not run. Reports per-call real-time factor, audio input lag,
+# playout underruns, CPU and memory per level, and an upper bound on calls per
+# core.
+# Run from voice_agent/:
+#
+#   python benchmarks/capacity_load_test.py --levels 1,2,4,8 --duration 60
+#
+# Not covered offline: BVC noise cancellation and Opus encode run in the LiveKit
+# FFI on room tracks, and the EnglishModel turn detector runs in the host's shared
+# inference process, so they need a real room and are replaced by stand-ins here.
+# Those are the CPU-heavy parts of a call, so the calls-per-core figure is an
+# upper bound, not a capacity to configure: a host holds fewer calls than this.
+# Size hosts from a load test in a real room.
+import argparse
+import asyncio
+import json
+import multiprocessing
+import resource
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+from replay_pipeline import free_port, load_scenarios, percentile, run_scenario
+from replay_backends import BackendTiming, serve
+from main import LOAD_THRESHOLD
+from vad_service import start_service_process
+
+# A level is healthy while every call keeps up with real time
+MAX_INPUT_LAG_P99_MS = 40.0  # two 20ms frames
+MAX_UNDERRUNS_PER_CALL_MIN = 0.5
+MAX_V2V_P95_GROWTH = 0.25  # over the single-call level
+
+
+def call_process(index: int, backend_url: str, names: List[str], duration: float, vad_kind: str, start, results):
+    """One simulated job process: prewarm, then replay calls until `duration` has passed"""
+    from livekit.plugins import silero
+
+    from replay_standins import EnergyVAD
+    from vad_service import SharedVAD
+
+    # Loaded once per process like prewarm_fnc, shared by the calls it handles
+    if vad_kind == "silero":
+        vad = silero.VAD.load()
+    elif vad_kind == "shared":
+        vad = SharedVAD.load()
+    else:
+        vad = EnergyVAD()
+    scenarios = load_scenarios(names)
+
+    async def run() -> Dict[str, Any]:
+        calls = []
+        cpu_started_at = time.process_time()
+        started_at = time.perf_counter()
+        while time.perf_counter() - started_at < duration:
+            scenario = scenarios[(index + len(calls)) % len(scenarios)]
+            calls.append(await run_scenario(scenario, backend_url, repeat_index=index * 1000 + len(calls), vad=vad))
+        return {
+            "calls": calls,
+            "cpu_s": time.process_time() - cpu_started_at,
+            "wall_s": time.perf_counter() - started_at,
+            "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }
+
+    start.wait()
+    try:
+        results.put(asyncio.run(run()))
+    except Exception as e:
+        results.put({"error": repr(e)})
+
+
+def run_level(
+    level: int,
+    backend_url: str,
+    names: List[str],
+    duration: float,
+    vad_kind: str,
+    service: Optional[psutil.Process] = None,
+) -> Dict[str, Any]:
+    ctx = multiprocessing.get_context("spawn")
+    start = ctx.Event()
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=call_process, args=(i, backend_url, names, duration, vad_kind, start, results), daemon=True)
+        for i in range(level)
+    ]
+    for p in procs:
+        p.start()
+    # Imports and VAD loading are not part of the measurement
+    time.sleep(5 + 0.5 * level)
+
+    psutil.cpu_percent()
+    service_cpu_started = sum(service.cpu_times()[:2]) if service else 0.0
+    start.set()
+    outputs = [results.get(timeout=duration + 120) for _ in procs]
+    host_cpu = psutil.cpu_percent()
+    # The shared VAD service works for all calls, charge its CPU to them
+    service_cpu_s = sum(service.cpu_times()[:2]) - service_cpu_started if service else 0.0
+    for p in procs:
+        p.join()
+
+    errors = [o["error"] for o in outputs if "error" in o]
+    outputs = [o for o in outputs if "error" not in o]
+    calls = [c for o in outputs for c in o["calls"]]
+    v2v = [t["voice_to_voice_ms"] for c in calls for t in c["turns"] if t["response"] == "audio" and "voice_to_voice_ms" in t]
+    call_minutes = sum(c["call_s"] for c in calls) / 60
+    vad_ms = [c["vad_inference_ms"] for c in calls if c["vad_inference_ms"] is not None]
+
+    return {
+        "level": level,
+        "calls": len(calls),
+        "flow_errors": [e for c in calls for e in c["errors"]] + errors,
+        # CPU seconds per second of call, i.e. the share of one core a call needs
+        "rtf": (sum(o["cpu_s"] for o in outputs) + service_cpu_s) / sum(o["wall_s"] for o in outputs) if outputs else None,
+        "input_lag_p99_ms": max((c["input_lag_p99_ms"] for c in calls if c["input_lag_p99_ms"] is not None), default=None),
+        "underruns_per_call_min": sum(c["underruns"] for c in calls) / call_minutes if call_minutes else None,
+        "voice_to_voice_p50_ms": percentile(v2v, 0.5),
+        "voice_to_voice_p95_ms": percentile(v2v, 0.95),
+        "vad_inference_ms": sum(vad_ms) / len(vad_ms) if vad_ms else None,
+        "host_cpu_percent": host_cpu,
+        "max_rss_mb": max((o["max_rss_mb"] for o in outputs), default=None),
+    }
+
+
+def is_healthy(result: Dict[str, Any], single_call: Dict[str, Any]) -> List[str]:
+    problems = []
+    if result["flow_errors"]:
+        problems.append(f"{len(result['flow_errors'])} broken flows")
+    if (result["input_lag_p99_ms"] or 0) > MAX_INPUT_LAG_P99_MS:
+        problems.append(f"input lag p99 {result['input_lag_p99_ms']:.0f}ms")
+    if (result["underruns_per_call_min"] or 0) > MAX_UNDERRUNS_PER_CALL_MIN:
+        problems.append(f"{result['underruns_per_call_min']:.1f} underruns/call-min")
+    base_p95 = single_call["voice_to_voice_p95_ms"]
+    if base_p95 and result["voice_to_voice_p95_ms"] and result["voice_to_voice_p95_ms"] > base_p95 * (1 + MAX_V2V_P95_GROWTH):
+        problems.append(f"v2v p95 {result['voice_to_voice_p95_ms']:.0f}ms vs {base_p95:.0f}ms at 1 call")
+    return problems
+
+
+def capacity_bound(results: List[Dict[str, Any]], cores: int) -> Dict[str, Any]:
+    healthy = [r for r in results if not r["problems"]]
+    if not healthy:
+        return {"upper_bound_calls_per_core": None, "reason": "no healthy level, even a single call misses real time"}
+
+    best = max(healthy, key=lambda r: r["level"])
+    # Keep enough CPU headroom that the load function closes admission first
+    cpu_bound = LOAD_THRESHOLD / best["rtf"] if best["rtf"] else float("inf")
+    # Without BVC, the turn detector and Opus encode, which all add CPU per call
+    upper_bound = min(best["level"] / cores, cpu_bound)
+    saturated = any(r["problems"] for r in results if r["level"] > best["level"])
+    return {
+        "upper_bound_calls_per_core": round(upper_bound, 2),
+        "upper_bound_calls_per_host": int(upper_bound * cores),
+        "cpu_bound_calls_per_core": round(cpu_bound, 2),
+        "highest_healthy_level": best["level"],
+        "saturated": saturated,
+        "host_cpu_percent_at_best": best["host_cpu_percent"],
+    }
+
+
+def print_report(results: List[Dict[str, Any]], bound: Dict[str, Any], cores: int):
+    def num(value, fmt):
+        return format(value, fmt) if value is not None else "-"
+
+    print(f"\n{'calls':>5} {'rtf':>6} {'lag p99':>8} {'underrun':>9} {'v2v p50':>8} {'v2v p95':>8} "
+          f"{'vad':>7} {'cpu':>5} {'rss':>7}  status")
+    for r in results:
+        print(
+            f"{r['level']:>5} {num(r['rtf'], '6.3f')} {num(r['input_lag_p99_ms'], '6.0f')}ms "
+            f"{num(r['underruns_per_call_min'], '9.2f')} {num(r['voice_to_voice_p50_ms'], '6.0f')}ms "
+            f"{num(r['voice_to_voice_p95_ms'], '6.0f')}ms {num(r['vad_inference_ms'], '5.2f')}ms "
+            f"{r['host_cpu_percent']:4.0f}% {num(r['max_rss_mb'], '5.0f')}MB  "
+            f"{'ok' if not r['problems'] else ', '.join(r['problems'])}"
+        )
+
+    print()
+    if bound["upper_bound_calls_per_core"] is None:
+        print(f"No result: {bound['reason']}")
+        return
+    print(
+        f"Upper bound: {bound['upper_bound_calls_per_core']} calls per core "
+        f"({bound['upper_bound_calls_per_host']} on this {cores}-core host)"
+    )
+    print(
+        "  Not a capacity to configure: only the call pipeline ran, not main.entrypoint, and BVC, "
+        "the EnglishModel turn detector and Opus encode were stand-ins that add CPU per call. "
+        "Confirm with a load test in a real room"
+    )
+    if not bound["saturated"]:
+        print(
+            f"  Every level was healthy, ramp further to find the real limit "
+            f"(CPU alone allows {bound['cpu_bound_calls_per_core']} per core)"
+        )
+    print(
+        f"  Host CPU at {bound['highest_healthy_level']} calls was "
+        f"{bound['host_cpu_percent_at_best']:.0f}% (load_threshold is {LOAD_THRESHOLD})"
+    )
+
+
+def main_cli(argv=None) -> int:
+    cores = psutil.cpu_count(logical=False) or psutil.cpu_count() or 1
+    default_levels = sorted({1, max(1, cores // 2), cores, 2 * cores, 4 * cores})
+
+    parser = argparse.ArgumentParser(description="Concurrent-call capacity load test")
+    parser.add_argument("--levels", default=",".join(map(str, default_levels)), help="Comma separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of calls per level")
+    parser.add_argument("--vad", choices=["silero", "shared", "energy"], default="silero",
+                        help="shared: batched Silero in the host VAD service (see vad_service.py)")
+    parser.add_argument("--scenario", action="append", help="Only replay this scenario (repeatable)")
+    parser.add_argument("--out", help="Write per-level results as JSON")
+    parser.add_argument("--stop-when-unhealthy", action="store_true")
+    args = parser.parse_args(argv)
+
+    levels = sorted({int(level) for level in args.levels.split(",")})
+    scenarios = load_scenarios(args.scenario)
+    if not scenarios:
+        print("No scenarios found", file=sys.stderr)
+        return 1
+    names = [s["name"] for s in scenarios]
+
+    port = free_port()
+    ctx = multiprocessing.get_context("spawn")
+    ready = ctx.Event()
+    backends = ctx.Process(target=serve, args=(port, {s["name"]: s for s in scenarios}, BackendTiming(), ready), daemon=True)
+    backends.start()
+    if not ready.wait(timeout=30):
+        print("Backend stand-ins did not start", file=sys.stderr)
+        return 1
+    print(f"{cores} cores, levels {levels}, {args.duration:.0f}s per level, {args.vad} VAD")
+
+    service_process = start_service_process() if args.vad == "shared" else None
+    service = psutil.Process(service_process.pid) if service_process else None
+    results = []
+    try:
+        for level in levels:
+            result = run_level(level, f"http://127.0.0.1:{port}", names, args.duration, args.vad, service)
+            result["problems"] = is_healthy(result, results[0] if results else result)
+            results.append(result)
+            print(f"  {level} calls: {'ok' if not result['problems'] else ', '.join(result['problems'])}")
+            if result["problems"] and args.stop_when_unhealthy:
+                break
+    finally:
+        backends.terminate()
+        backends.join()
+        if service_process:
+            service_process.terminate()
+            service_process.join()
+
+    bound = capacity_bound(results, cores)
+    print_report(results, bound, cores)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"cores": cores, "levels": results, "upper_bound": bound}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
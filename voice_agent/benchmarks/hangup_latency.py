@@ -0,0 +1,83 @@
+# benchmarks/hangup_latency.py
+#
+# Time from the hangup decision to room deletion, serial (update_lead then
+# delete_room, the previous behaviour) vs GalacticVoiceAgent.hangup().
+# API latencies are simulated, run from the voice_agent directory:
+#
+#   python benchmarks/hangup_latency.py
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import GalacticVoiceAgent.agent as agent_module
+from GalacticVoiceAgent.agent import GalacticVoiceAgent
+from task_supervisor import CallTaskSupervisor
+
+ITERATIONS = 50
+UPDATE_LEAD_MEDIAN_S = 0.4  # dialer API
+DELETE_ROOM_MEDIAN_S = 0.06  # LiveKit API on a warm connection
+
+rng = random.Random(42)
+room_deleted_at = 0.0
+
+
+def simulated_latency(median: float) -> float:
+    return rng.lognormvariate(0, 0.5) * median
+
+
+async def fake_update_lead(lead_id: str, **kwargs) -> bool:
+    await asyncio.sleep(simulated_latency(UPDATE_LEAD_MEDIAN_S))
+    return True
+
+
+class FakeRoomService:
+    async def delete_room(self, request):
+        global room_deleted_at
+        await asyncio.sleep(simulated_latency(DELETE_ROOM_MEDIAN_S))
+        room_deleted_at = time.perf_counter()
+
+
+fake_livekit_api = SimpleNamespace(room=FakeRoomService())
+
+
+async def serial_hangup(agent: GalacticVoiceAgent):
+    await fake_update_lead(lead_id=agent.lead_id, status=agent.current_status)
+    await fake_livekit_api.room.delete_room(None)
+
+
+async def measure(hangup_fn) -> list:
+    samples = []
+    for _ in range(ITERATIONS):
+        supervisor = CallTaskSupervisor(name="bench")
+        agent = GalacticVoiceAgent("Jane Doe", "1", task_supervisor=supervisor)
+        started_at = time.perf_counter()
+        await hangup_fn(agent)
+        samples.append((room_deleted_at - started_at) * 1000)
+        await supervisor.aclose()
+    return samples
+
+
+def summarize(label: str, samples: list):
+    samples = sorted(samples)
+    p95 = samples[int(0.95 * (len(samples) - 1))]
+    print(f"{label:<10} mean {statistics.mean(samples):7.1f}ms  p50 {statistics.median(samples):7.1f}ms  p95 {p95:7.1f}ms")
+
+
+async def main():
+    agent_module.get_job_context = lambda: SimpleNamespace(room=SimpleNamespace(name="bench"))
+    agent_module.get_livekit_api = lambda: fake_livekit_api
+    agent_module.update_lead_with_retry = fake_update_lead
+
+    print(f"Hangup decision -> room deleted ({ITERATIONS} iterations)")
+    summarize("before", await measure(serial_hangup))
+    summarize("after", await measure(lambda agent: agent.hangup()))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,148 @@
+# benchmarks/logging_overhead.py
+#
+# Event loop time per log event in a job process, previous logging (eager
+# f-strings, DEBUG level, LiveKit's LogQueueHandler formatting and pickling on
+# the logging thread) vs call_logging.py (lazy %-style args, LOG_LEVEL, sampling,
+# the queue in front of the same handler). Both forward over a real socketpair to
+# a reader thread standing in for the worker. Run from voice_agent/:
+#
+#   python benchmarks/logging_overhead.py
+import logging
+import os
+import pickle
+import socket
+import sys
+import threading
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from livekit.agents.ipc.log_queue import LogQueueHandler
+from livekit.agents.utils.aio import duplex_unix
+
+import call_logging
+from metrics_csv_overhead import sample_metrics
+
+EVENTS_PER_RUN = int(os.getenv("EVENTS_PER_RUN", "5000"))
+
+LEAD = {
+    "status": "NEW", "user": "VDAD", "vendor_lead_code": "", "source_id": "", "list_id": "1001",
+    "gmt_offset_now": "-8.00", "phone_code": "1", "phone_number": "8052226101", "title": "Mr",
+    "first_name": "John", "middle_initial": "Q", "last_name": "Public", "address1": "1 Main St",
+    "address2": "", "address3": "", "city": "Ventura", "state": "CA", "province": "", "postal_code": "93001",
+    "country_code": "USA", "gender": "M", "date_of_birth": "1970-01-01", "alt_phone": "8055550100",
+    "email": "john@example.com", "security_phrase": "", "comments": "", "called_count": "3",
+    "last_local_call_time": "2026-10-19 10:00:00", "rank": "0", "owner": "", "entry_list_id": "0", "lead_id": "123456",
+}
+
+
+class Worker:
+    """The worker side of the job process's log socket"""
+
+    def __init__(self):
+        worker_sock, job_sock = socket.socketpair()
+        self.duplex = duplex_unix._Duplex.open(job_sock)
+        self.reader = duplex_unix._Duplex.open(worker_sock)
+        self.records: List[logging.LogRecord] = []
+        self.thread = threading.Thread(target=self._read, daemon=True)
+        self.thread.start()
+
+    def _read(self):
+        while True:
+            try:
+                self.records.append(pickle.loads(self.reader.recv_bytes()))
+            except duplex_unix.DuplexClosed:
+                return
+
+
+def job_process_logging(worker: Worker) -> LogQueueHandler:
+    """The root logger as proc_client sets it up"""
+    root = logging.getLogger()
+    handler = LogQueueHandler(worker.duplex)
+    root.handlers = [handler]
+    root.setLevel(logging.NOTSET)
+    return handler
+
+
+def old_events(logger: logging.Logger, metrics: list) -> Dict[str, Callable[[int], None]]:
+    def metric(i):
+        logger.info(f"Metrics: {metrics[i]}")
+
+    def status(i):
+        logger.info(f"SIP Call Status updated: {'ringing' if i % 2 else 'active'}")
+
+    def lead(i):
+        logger.info(f"Result: {LEAD}")
+
+    return {"metrics": metric, "call_status": status, "lead_record": lead}
+
+
+def new_events(logger: logging.Logger, metrics: list) -> Dict[str, Callable[[int], None]]:
+    def metric(i):
+        m = metrics[i]
+        logger.debug("Metrics: %s", m, extra={"speech_id": getattr(m, "speech_id", None)})
+
+    def status(i):
+        logger.info("SIP Call Status updated: %s", "ringing" if i % 2 else "active")
+
+    def lead(i):
+        logger.debug("Result: %s", LEAD)
+
+    return {"metrics": metric, "call_status": status, "lead_record": lead}
+
+
+def loop_cost(event: Callable[[int], None], n: int) -> float:
+    """Microseconds on the logging thread per event"""
+    started_at = time.perf_counter()
+    for i in range(n):
+        event(i)
+    return (time.perf_counter() - started_at) / n * 1e6
+
+
+def run(setup: str, level: str, n: int, metrics: list, sample_rate: float = call_logging.LOG_SAMPLE_RATE) -> Dict[str, float]:
+    worker = Worker()
+    handler = job_process_logging(worker)
+    logger = logging.getLogger("inbound-caller")
+    if setup == "old":
+        logger.setLevel(logging.DEBUG)
+        events = old_events(logger, metrics)
+    else:
+        logger.setLevel(logging.NOTSET)
+        call_logging._listener = None
+        listener = call_logging.install(level, sample_rate=sample_rate)
+        call_logging.set_call_context(room="bench-room", lead_id=LEAD["lead_id"])
+        events = new_events(logger, metrics)
+
+    results = {name: loop_cost(event, n) for name, event in events.items()}
+    if setup == "new":
+        listener.stop()
+    handler.close()
+    handler._send_thread.join()
+    worker.thread.join(timeout=5)
+    results["forwarded"] = len(worker.records)
+    results["sample"] = next((r.msg for r in worker.records if r.msg.startswith("Result")), None)
+    return results
+
+
+def main():
+    n = EVENTS_PER_RUN
+    metrics = sample_metrics(n)
+    runs = {
+        "previous (DEBUG, f-strings)": run("old", "DEBUG", n, metrics),
+        "call_logging LOG_LEVEL=INFO": run("new", "INFO", n, metrics),
+        "call_logging LOG_LEVEL=DEBUG": run("new", "DEBUG", n, metrics),
+        "  without sampling": run("new", "DEBUG", n, metrics, sample_rate=0),
+    }
+
+    print(f"{n} events of each kind, us of event loop time per event")
+    print(f"{'':<30}{'metrics':>10}{'call_status':>13}{'lead_record':>13}{'forwarded':>11}")
+    for name, r in runs.items():
+        print(f"{name:<30}{r['metrics']:>10.1f}{r['call_status']:>13.1f}{r['lead_record']:>13.1f}{r['forwarded']:>11}")
+    for name, r in runs.items():
+        if r["sample"]:
+            print(f"\n{name} lead record as forwarded:\n  {r['sample'][:240]}")
+
+
+if __name__ == "__main__":
+    main()
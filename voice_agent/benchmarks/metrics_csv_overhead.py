@@ -0,0 +1,91 @@
+# benchmarks/metrics_csv_overhead.py
+#
+# Per-metric cost of MetricsCSVLogger on the event loop, previous path
+# (asyncio.to_thread hop per metric) vs direct write_metrics, and writer
+# throughput with flush-per-row vs batched writes. Run from voice_agent/:
+#
+#   python benchmarks/metrics_csv_overhead.py
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from livekit.agents.metrics import EOUMetrics, LLMMetrics, STTMetrics, TTSMetrics
+
+from metrics_csv_logger import MetricsCSVLogger
+
+METRICS_PER_RUN = 5000
+
+
+def sample_metrics(n: int) -> list:
+    """A realistic mix of per-turn metrics, built without validation"""
+    now = time.time()
+    samples = []
+    for i in range(n):
+        speech_id = f"speech_{i // 4}"
+        kind = i % 4
+        if kind == 0:
+            m = STTMetrics.model_construct(timestamp=now, duration=0.0, audio_duration=2.1, speech_id=speech_id)
+        elif kind == 1:
+            m = EOUMetrics.model_construct(timestamp=now, end_of_utterance_delay=0.52, transcription_delay=0.21, speech_id=speech_id)
+        elif kind == 2:
+            m = LLMMetrics.model_construct(timestamp=now, duration=0.9, ttft=0.31, prompt_tokens=2100, completion_tokens=40, total_tokens=2140, speech_id=speech_id)
+        else:
+            m = TTSMetrics.model_construct(timestamp=now, duration=1.1, ttfb=0.19, audio_duration=3.2, characters_count=120, speech_id=speech_id)
+        samples.append(m)
+    return samples
+
+
+async def loop_cost(logger: MetricsCSVLogger, filename: str, samples: list, hop: bool) -> float:
+    """Microseconds of event loop time per metric"""
+    started_at = time.perf_counter()
+    if hop:
+        tasks = [
+            asyncio.create_task(asyncio.to_thread(logger.write_metrics, filename, m))
+            for m in samples
+        ]
+        await asyncio.gather(*tasks)
+    else:
+        for m in samples:
+            logger.write_metrics(filename, m)
+    return (time.perf_counter() - started_at) / len(samples) * 1e6
+
+
+def writer_throughput(samples: list, batch_size: int, flush_interval: float) -> float:
+    """Rows per second from first enqueue to everything on disk"""
+    with tempfile.TemporaryDirectory() as base_dir:
+        logger = MetricsCSVLogger(base_dir=base_dir, batch_size=batch_size, flush_interval=flush_interval)
+        filename = logger.get_csv_filename("bench", "bench")
+        logger.initialize_csv(filename)
+        started_at = time.perf_counter()
+        for m in samples:
+            logger.write_metrics(filename, m)
+        logger.stop()
+        return logger.write_count / (time.perf_counter() - started_at)
+
+
+async def main():
+    samples = sample_metrics(METRICS_PER_RUN)
+
+    with tempfile.TemporaryDirectory() as base_dir:
+        logger = MetricsCSVLogger(base_dir=base_dir)
+        filename = logger.get_csv_filename("bench", "bench")
+        logger.initialize_csv(filename)
+        hop_us = await loop_cost(logger, filename, samples, hop=True)
+        direct_us = await loop_cost(logger, filename, samples, hop=False)
+        logger.stop()
+
+    print(f"Event loop cost per metric ({METRICS_PER_RUN} metrics)")
+    print(f"  to_thread hop per metric (before): {hop_us:8.1f}us")
+    print(f"  direct write_metrics (after):      {direct_us:8.1f}us")
+
+    print("Writer throughput")
+    print(f"  flush every row:  {writer_throughput(samples, batch_size=1, flush_interval=0.1):10.0f} rows/s")
+    print(f"  batched (100/1s): {writer_throughput(samples, batch_size=100, flush_interval=1.0):10.0f} rows/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,210 @@
+# benchmarks/noise_gate_wer.py
+#
+# Effect of noise gating on recognition accuracy: word error rate of the
+# production Deepgram model on recorded caller clips, with the audio as it
+# arrives vs through NoiseCancellationGate, optionally with white line noise
+# mixed in. Clips are mono 16-bit WAVs, each with its reference transcript next
+# to it (<clip>.txt). Needs DEEPGRAM_API_KEY and network access. Run from
+# voice_agent/:
+#
+#   python benchmarks/noise_gate_wer.py recordings/ --noise-dbfs none,-50,-40,-30
+#   python benchmarks/noise_gate_wer.py recordings/ --force-gate   # expander on every clip
+#
+# BVC only runs on tracks in a real room, so clips the gate would send to BVC
+# are transcribed unprocessed and counted separately; compare BVC with calls
+# recorded with and without it on a live worker. NOISE_GATING stays off by
+# default until this shows gating does not raise the WER.
+import argparse
+import asyncio
+import glob
+import json
+import math
+import os
+import re
+import sys
+import wave
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aiohttp
+import numpy as np
+from dotenv import load_dotenv
+from livekit import rtc
+from livekit.agents import stt as agents_stt
+from livekit.plugins import deepgram
+
+from campaign_config import DEFAULT_CAMPAIGN
+from noise_gate import MODE_BVC, MODE_GATE, MODE_OFF, NoiseCancellationGate
+from telephony_audio import audio_rates
+
+load_dotenv(dotenv_path=".env.local")
+
+FRAME_MS = 20
+# Lets Deepgram finalize the last words before the stream is closed
+TRAILING_SILENCE_S = 1.5
+STT_MODEL = "nova-2-phonecall"
+
+
+def load_clip(path: str, sample_rate: int) -> np.ndarray:
+    with wave.open(path, "rb") as f:
+        if f.getnchannels() != 1 or f.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected mono 16-bit PCM")
+        clip_rate = f.getframerate()
+        data = f.readframes(f.getnframes())
+    if clip_rate == sample_rate:
+        return np.frombuffer(data, dtype=np.int16)
+    resampler = rtc.AudioResampler(clip_rate, sample_rate, quality=rtc.AudioResamplerQuality.HIGH)
+    frames = resampler.push(bytearray(data)) + resampler.flush()
+    return np.concatenate([np.frombuffer(frame.data, dtype=np.int16) for frame in frames])
+
+
+def with_trailing_silence(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """Padded before the noise is mixed in, so the gate's noise floor is not skewed by digital silence"""
+    return np.concatenate([samples, np.zeros(int(TRAILING_SILENCE_S * sample_rate), dtype=np.int16)])
+
+
+def add_noise(samples: np.ndarray, noise_dbfs: Optional[float], seed: int = 0) -> np.ndarray:
+    if noise_dbfs is None:
+        return samples
+    noise = np.random.default_rng(seed).normal(0, 32768 * 10 ** (noise_dbfs / 20), len(samples))
+    return np.clip(samples + noise, -32768, 32767).astype(np.int16)
+
+
+def to_frames(samples: np.ndarray, sample_rate: int) -> List[rtc.AudioFrame]:
+    per_frame = sample_rate * FRAME_MS // 1000
+    padded = np.pad(samples, (0, -len(samples) % per_frame))
+    return [
+        rtc.AudioFrame(chunk.tobytes(), sample_rate=sample_rate, num_channels=1, samples_per_channel=per_frame)
+        for chunk in padded.reshape(-1, per_frame)
+    ]
+
+
+async def gated(frames: List[rtc.AudioFrame], force_gate: bool) -> Dict[str, Any]:
+    """The frames as the STT node would see them through the gate, without a room"""
+    if force_gate:
+        gate = NoiseCancellationGate(
+            bvc_on_snr_db=-math.inf, bvc_off_snr_db=-math.inf,
+            gate_on_snr_db=math.inf, gate_off_snr_db=math.inf, min_hold_s=0,
+        )
+    else:
+        gate = NoiseCancellationGate.from_env(None)
+
+    async def source():
+        for frame in frames:
+            yield frame
+
+    processed = [frame async for frame in gate.process(source())]
+    return {"frames": processed, "mode": gate.mode, "snr_db": (gate.last_quality or {}).get("snr_db")}
+
+
+async def transcribe(stt: deepgram.STT, frames: List[rtc.AudioFrame]) -> str:
+    stream = stt.stream()
+    for frame in frames:
+        stream.push_frame(frame)
+    stream.end_input()
+    words = []
+    async for event in stream:
+        if event.type == agents_stt.SpeechEventType.FINAL_TRANSCRIPT and event.alternatives:
+            words.append(event.alternatives[0].text)
+    await stream.aclose()
+    return " ".join(words)
+
+
+def normalize(text: str) -> List[str]:
+    text = re.sub(r"(?<=\d),(?=\d)", "", text.lower())
+    return re.sub(r"[^\w\s']", " ", text).split()
+
+
+def word_errors(reference: str, hypothesis: str) -> tuple:
+    """(edit distance in words, reference length)"""
+    ref, hyp = normalize(reference), normalize(hypothesis)
+    row = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        previous, row[0] = row[0], i
+        for j, hyp_word in enumerate(hyp, 1):
+            previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (ref_word != hyp_word))
+    return row[-1], len(ref)
+
+
+def wer(results: List[Dict[str, Any]], key: str) -> Optional[float]:
+    words = sum(r["words"] for r in results)
+    return sum(r[key] for r in results) / words if words else None
+
+
+async def run(clips: List[str], noise_levels: List[Optional[float]], force_gate: bool) -> List[Dict[str, Any]]:
+    sample_rate = audio_rates(DEFAULT_CAMPAIGN.tts_sample_rate).stt
+    results = []
+    async with aiohttp.ClientSession() as session:
+        stt = deepgram.STT(model=STT_MODEL, sample_rate=sample_rate, http_session=session)
+        for path in clips:
+            with open(os.path.splitext(path)[0] + ".txt") as f:
+                reference = f.read().strip()
+            clean = with_trailing_silence(load_clip(path, sample_rate), sample_rate)
+            for seed, noise_dbfs in enumerate(noise_levels):
+                frames = to_frames(add_noise(clean, noise_dbfs, seed), sample_rate)
+                gate = await gated(frames, force_gate)
+                off_text, gated_text = await asyncio.gather(transcribe(stt, frames), transcribe(stt, gate["frames"]))
+                off_errors, words = word_errors(reference, off_text)
+                gated_errors, _ = word_errors(reference, gated_text)
+                results.append({
+                    "clip": os.path.basename(path),
+                    "noise_dbfs": noise_dbfs,
+                    "mode": gate["mode"],
+                    "snr_db": gate["snr_db"],
+                    "words": words,
+                    "off_errors": off_errors,
+                    "gated_errors": gated_errors,
+                    "off_text": off_text,
+                    "gated_text": gated_text,
+                })
+                print(f"  {os.path.basename(path)} noise {noise_dbfs} ({gate['mode']}): {off_errors} vs {gated_errors} errors / {words} words")
+    return results
+
+
+def print_report(results: List[Dict[str, Any]], noise_levels: List[Optional[float]]):
+    def pct(value):
+        return f"{value * 100:6.1f}%" if value is not None else "     -"
+
+    print(f"\n{'noise':>6} {'mode':>5} {'clips':>6} {'wer off':>8} {'wer gated':>10} {'delta':>7}")
+    for noise_dbfs in noise_levels:
+        for mode in (MODE_OFF, MODE_GATE, MODE_BVC, None):
+            rows = [r for r in results if r["noise_dbfs"] == noise_dbfs and (mode is None or r["mode"] == mode)]
+            if not rows or (mode is None and len({r["mode"] for r in rows}) == 1):
+                continue
+            off, on = wer(rows, "off_errors"), wer(rows, "gated_errors")
+            print(
+                f"{'none' if noise_dbfs is None else noise_dbfs:>6} {mode or 'all':>5} {len(rows):>6} "
+                f"{pct(off)}  {pct(on)}   {pct(on - off if off is not None else None)}"
+            )
+    if any(r["mode"] == MODE_BVC for r in results):
+        print("\nbvc rows: the gate would have switched to BVC, which needs a real room; both columns are unprocessed")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="WER with and without noise gating")
+    parser.add_argument("clips", help="Directory of mono 16-bit WAV clips with <clip>.txt references")
+    parser.add_argument("--noise-dbfs", default="none", help="Comma separated white noise levels, 'none' for the clip as recorded")
+    parser.add_argument("--force-gate", action="store_true", help="Run the expander on every clip regardless of its SNR")
+    parser.add_argument("--out", help="Write per-clip results as JSON")
+    args = parser.parse_args(argv)
+
+    clips = sorted(p for p in glob.glob(os.path.join(args.clips, "*.wav")) if os.path.exists(os.path.splitext(p)[0] + ".txt"))
+    if not clips:
+        print(f"No clips with reference transcripts in {args.clips}", file=sys.stderr)
+        return 1
+    if not os.getenv("DEEPGRAM_API_KEY"):
+        print("DEEPGRAM_API_KEY is not set", file=sys.stderr)
+        return 1
+    noise_levels = [None if level == "none" else float(level) for level in args.noise_dbfs.split(",")]
+
+    results = asyncio.run(run(clips, noise_levels, args.force_gate))
+    print_report(results, noise_levels)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+# benchmarks/replay_backends.py
+#
+# Local stand-ins for the LLM (OpenAI-compatible streaming chat completions) and
+# Resemble (streaming WebSocket TTS) used by replay_pipeline.py. They run in a
+# child process so the agent process CPU numbers only cover the agent itself.
+# The real openai and resemble plugins (including patched_run_ws) talk to them.
+import asyncio
+import base64
+import json
+import math
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from aiohttp import web
+
+TTS_SAMPLE_RATE = 24000
+MP3_FRAME_SAMPLES = 1152
+MP3_PACKETS_PER_MESSAGE = 4  # ~190ms of audio per Resemble "audio" message
+
+
+@dataclass
+class BackendTiming:
+    """Fixed service latencies, so two runs differ only by the agent's own overhead"""
+
+    llm_ttft_s: float = 0.25
+    llm_prefill_s_per_1k_tokens: float = 0.01
+    llm_tokens_per_s: float = 400.0
+    tts_ttfb_s: float = 0.15
+    tts_realtime_factor: float = 0.25  # seconds to generate one second of audio
+    tts_words_per_s: float = 2.7
+
+
+def encode_tone_mp3(seconds: float = 4.0) -> List[bytes]:
+    """MP3 packets of a quiet tone; sentences are cut from this stream"""
+    import av
+
+    codec = av.CodecContext.create("libmp3lame", "w")
+    codec.sample_rate = TTS_SAMPLE_RATE
+    codec.layout = "mono"
+    codec.format = "fltp"
+
+    t = np.arange(int(seconds * TTS_SAMPLE_RATE)) / TTS_SAMPLE_RATE
+    tone = (0.1 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+    packets = []
+    for start in range(0, len(tone), MP3_FRAME_SAMPLES):
+        frame = av.AudioFrame.from_ndarray(
+            tone[start:start + MP3_FRAME_SAMPLES].reshape(1, -1), format="fltp", layout="mono"
+        )
+        frame.sample_rate = TTS_SAMPLE_RATE
+        packets.extend(bytes(p) for p in codec.encode(frame))
+    packets.extend(bytes(p) for p in codec.encode(None))
+    return packets
+
+
+class ReplayBackends:
+    def __init__(self, scenarios: Dict[str, Dict[str, Any]], timing: BackendTiming):
+        self.scenarios = scenarios
+        self.timing = timing
+        self.mp3_packets = encode_tone_mp3()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_get("/stream", self.resemble_stream)
+        return app
+
+    # LLM
+
+    def scripted_response(self, body: Dict[str, Any]) -> tuple:
+        """Reply text and optional tool call for the conversation so far"""
+        scenario = self.scenarios[body["model"]]
+        messages = body.get("messages", [])
+        user_turns = sum(1 for m in messages if m.get("role") == "user")
+        if user_turns == 0:
+            return scenario["greeting"], None
+
+        turn = scenario["turns"][min(user_turns, len(scenario["turns"])) - 1]
+        if messages and messages[-1].get("role") == "tool":
+            return turn.get("after_tool", ""), None
+        return turn.get("reply", ""), turn.get("tool")
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        received_at = time.perf_counter()
+        body = await request.json()
+        text, tool = self.scripted_response(body)
+        prompt_tokens = len(json.dumps(body.get("messages", []))) // 4
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        ttft = self.timing.llm_ttft_s + self.timing.llm_prefill_s_per_1k_tokens * prompt_tokens / 1000
+        await asyncio.sleep(max(0.0, received_at + ttft - time.perf_counter()))
+
+        completion_id = f"chatcmpl-replay-{int(received_at * 1000)}"
+
+        async def send(delta: Optional[dict], finish_reason: Optional[str] = None, usage: Optional[dict] = None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": [] if delta is None else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            if usage is not None:
+                chunk["usage"] = usage
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+
+        tokens = re.findall(r"\S+\s*", text)
+        await send({"role": "assistant", "content": ""})
+        # Four tokens per chunk keeps the chunk rate realistic without 2ms sleeps
+        for start in range(0, len(tokens), 4):
+            await send({"content": "".join(tokens[start:start + 4])})
+            await asyncio.sleep(4 / self.timing.llm_tokens_per_s)
+
+        if tool:
+            await send({
+                "tool_calls": [{
+                    "index": 0,
+                    "id": f"call_{completion_id}",
+                    "type": "function",
+                    "function": {"name": tool["name"], "arguments": json.dumps(tool.get("arguments", {}))},
+                }]
+            })
+        await send({}, finish_reason="tool_calls" if tool else "stop")
+        await send(None, usage={
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens),
+        })
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    # TTS
+
+    async def resemble_stream(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        requests: asyncio.Queue = asyncio.Queue()
+
+        async def synthesize():
+            # Requests on one connection are answered in order, like the real service
+            packet_s = MP3_FRAME_SAMPLES / TTS_SAMPLE_RATE
+            while True:
+                received_at, payload = await requests.get()
+                text = re.sub(r"<[^>]+>", "", payload.get("data", ""))
+                duration = max(0.3, len(text.split()) / self.timing.tts_words_per_s)
+                n_packets = math.ceil(duration / packet_s)
+                await asyncio.sleep(max(0.0, received_at + self.timing.tts_ttfb_s - time.perf_counter()))
+                for start in range(0, n_packets, MP3_PACKETS_PER_MESSAGE):
+                    count = min(MP3_PACKETS_PER_MESSAGE, n_packets - start)
+                    audio = b"".join(
+                        self.mp3_packets[(start + i) % len(self.mp3_packets)] for i in range(count)
+                    )
+                    await ws.send_json({
+                        "type": "audio",
+                        "request_id": payload["request_id"],
+                        "audio_content": base64.b64encode(audio).decode(),
+                    })
+                    await asyncio.sleep(count * packet_s * self.timing.tts_realtime_factor)
+                await ws.send_json({"type": "audio_end", "request_id": payload["request_id"]})
+
+        synthesizer = asyncio.create_task(synthesize())
+        try:
+            async for msg in ws:
+                if msg.type == web.WSMsgType.TEXT:
+                    requests.put_nowait((time.perf_counter(), json.loads(msg.data)))
+        finally:
+            synthesizer.cancel()
+            await asyncio.gather(synthesizer, return_exceptions=True)
+        return ws
+
+
+def serve(port: int, scenarios: Dict[str, Dict[str, Any]], timing: BackendTiming, ready):
+    """Child process entry point"""
+
+    async def run():
+        runner = web.AppRunner(ReplayBackends(scenarios, timing).app(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        ready.set()
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,422 @@
+# benchmarks/replay_pipeline.py
+#
+# Offline record-and-replay benchmark of the full call pipeline. Each scenario in
+# benchmarks/replay_corpus/ is replayed through AgentSession (built by
+# main.create_session) with GalacticVoiceAgent, the real openai and resemble
+# plugins (including patched_run_ws) pointed at local fixed-latency stand-ins,
+# and a scripted STT/VAD/turn detector. Reports per-turn voice-to-voice latency
+# and CPU, and exits non-zero when a flow breaks or latency regresses. Run from
+# voice_agent/:
+#
+#   python benchmarks/replay_pipeline.py
+#   python benchmarks/replay_pipeline.py --out replay.json            # save a baseline
+#   python benchmarks/replay_pipeline.py --baseline replay.json       # compare against it
+#   python benchmarks/replay_pipeline.py --noise-dbfs -45 --noise-gating
+#   python benchmarks/replay_pipeline.py --greeting-fast-path         # answer to first audio without the LLM
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+import aiohttp
+from livekit import rtc
+from livekit.agents import metrics
+from livekit.plugins import openai, resemble
+import livekit.plugins.resemble.tts as resemble_tts
+
+import GalacticVoiceAgent.agent as agent_module
+import main
+from GalacticVoiceAgent.agent import GalacticVoiceAgent
+from greeting import GreetingAudioCache, GreetingFastPath
+from noise_gate import NoiseCancellationGate
+from replay_backends import BackendTiming, serve
+from replay_standins import (
+    EnergyVAD,
+    ReplayAudioInput,
+    ReplayAudioOutput,
+    ReplaySTT,
+    ReplayTurnDetector,
+    load_wav,
+    synthetic_speech,
+)
+from task_supervisor import CallTaskSupervisor
+
+CORPUS_DIR = os.path.join(BENCHMARKS_DIR, "replay_corpus")
+RESPONSE_TIMEOUT_S = 10.0
+CALL_END_TIMEOUT_S = 15.0
+
+_greeting_cache: Optional[GreetingAudioCache] = None
+
+
+class FakeCall:
+    """What GalacticVoiceAgent reaches through get_job_context() and the LiveKit API"""
+
+    def __init__(self, name: str):
+        sip_participant = SimpleNamespace(kind=rtc.ParticipantKind.PARTICIPANT_KIND_SIP, identity="sip_caller")
+        self.room = SimpleNamespace(name=name, remote_participants={"sip_caller": sip_participant})
+        self.ended = asyncio.get_running_loop().create_future()
+        self.room_service = SimpleNamespace(delete_room=self.delete_room)
+        self.sip = SimpleNamespace(transfer_sip_participant=self.transfer_sip_participant)
+        self.updates: List[Dict[str, Any]] = []
+
+    def end(self, how: str):
+        if not self.ended.done():
+            self.ended.set_result((how, time.perf_counter()))
+
+    async def delete_room(self, request):
+        await asyncio.sleep(0.05)
+        self.end("hangup")
+
+    async def transfer_sip_participant(self, request):
+        await asyncio.sleep(0.2)
+        self.end("transfer")
+
+    async def update_lead(self, lead_id, **kwargs) -> bool:
+        await asyncio.sleep(0.1)
+        self.updates.append(kwargs)
+        return True
+
+
+def install_fakes(call: FakeCall):
+    agent_module.get_job_context = lambda: SimpleNamespace(room=call.room)
+    agent_module.get_livekit_api = lambda: SimpleNamespace(room=call.room_service, sip=call.sip)
+    agent_module.update_lead_with_retry = call.update_lead
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def run_scenario(
+    scenario: Dict[str, Any],
+    backend_url: str,
+    repeat_index: int,
+    vad=None,
+    noise_dbfs: Optional[float] = None,
+    noise_gating: bool = False,
+    greeting_fast_path: bool = False,
+) -> Dict[str, Any]:
+    global _greeting_cache
+    call = FakeCall(f"replay_{scenario['name']}")
+    install_fakes(call)
+    resemble_tts.RESEMBLE_WEBSOCKET_URL = f"{backend_url.replace('http', 'ws')}/stream"
+
+    http_session = aiohttp.ClientSession()
+    # Same models and options as prewarm_fnc, against the local stand-ins
+    tts = resemble.TTS(api_key="replay", voice_uuid="3c089e29", sample_rate=24000, http_session=http_session)
+    llm = openai.LLM(model=scenario["name"], base_url=f"{backend_url}/v1", api_key="replay", temperature=0.1)
+    stt = ReplaySTT()
+    session = main.create_session(stt, llm, tts, vad or EnergyVAD(), ReplayTurnDetector())
+
+    audio_in = ReplayAudioInput(noise_dbfs=noise_dbfs, seed=repeat_index)
+    audio_out = ReplayAudioOutput()
+    session.input.audio = audio_in
+    session.output.audio = audio_out
+
+    eou_events: List[tuple] = []
+    stage_values: Dict[str, Dict[str, float]] = {}
+    vad_inference = [0.0, 0]
+
+    @session.on("metrics_collected")
+    def _on_metrics(ev):
+        m = ev.metrics
+        if isinstance(m, metrics.EOUMetrics):
+            eou_events.append((time.perf_counter(), m.speech_id))
+            stage_values.setdefault(m.speech_id, {}).update(
+                eou_delay=m.end_of_utterance_delay, transcription_delay=m.transcription_delay
+            )
+        elif isinstance(m, metrics.LLMMetrics) and m.ttft >= 0:
+            stage_values.setdefault(m.speech_id, {}).setdefault("llm_ttft", m.ttft)
+        elif isinstance(m, metrics.TTSMetrics) and m.ttfb >= 0:
+            stage_values.setdefault(m.speech_id, {}).setdefault("tts_ttfb", m.ttfb)
+        elif isinstance(m, metrics.VADMetrics):
+            vad_inference[0] += m.inference_duration_total
+            vad_inference[1] += m.inference_count
+
+    async def wait_until_listening():
+        while session.agent_state != "listening" or audio_out.playing:
+            await asyncio.sleep(0.02)
+
+    supervisor = CallTaskSupervisor(name=call.room.name)
+    # No room here, so the gate measures and picks modes but cannot switch BVC
+    noise_gate = NoiseCancellationGate() if noise_gating else None
+    agent = GalacticVoiceAgent(scenario.get("lead_name"), "replay", task_supervisor=supervisor, noise_gate=noise_gate)
+    greeting = None
+    if greeting_fast_path:
+        # A host whose cache already holds the static segments, like after prewarm_fnc
+        if _greeting_cache is None:
+            _greeting_cache = GreetingAudioCache(voice="replay", sample_rate=24000, cache_dir=tempfile.mkdtemp())
+        await _greeting_cache.warm(tts, agent.campaign.greeting_segments())
+        greeting = GreetingFastPath(
+            tts, _greeting_cache, agent.name, agent.campaign.introduction, agent.campaign.opening_pitch
+        )
+    await session.start(agent=agent)
+
+    call_started_at = time.perf_counter()
+    cpu_started_at = time.process_time()
+    if greeting:
+        # Synthesis of the name starts at answer here; main.py starts it before
+        greeting.start()
+        if await greeting.ready():
+            greeting.say(session)
+        else:
+            session.generate_reply(allow_interruptions=False)
+    else:
+        session.generate_reply(allow_interruptions=False)
+    first_audio_at = await audio_out.next_segment(call_started_at, RESPONSE_TIMEOUT_S)
+
+    turns = []
+    errors = []
+    for index, turn in enumerate(scenario["turns"]):
+        await wait_until_listening()
+        await asyncio.sleep(turn.get("pause_s", 0.4))
+
+        if turn.get("audio"):
+            samples = load_wav(os.path.join(CORPUS_DIR, turn["audio"]))
+        else:
+            samples = synthetic_speech(turn.get("speech_s", 1.5), seed=repeat_index * 1000 + index)
+        stt.expect(turn["user"])
+        speech_end_at = await audio_in.play(samples)
+        cpu_at_speech_end = time.process_time()
+
+        # Tool turns may answer by ending the call instead of speaking
+        reply = asyncio.create_task(audio_out.next_segment(speech_end_at, RESPONSE_TIMEOUT_S))
+        await asyncio.wait([reply, call.ended], return_when=asyncio.FIRST_COMPLETED)
+        responded_at = reply.result() if reply.done() else None
+        response = "audio"
+        if responded_at is None and call.ended.done():
+            response, responded_at = call.ended.result()
+        reply.cancel()
+
+        record = {"turn": index, "user": turn["user"], "response": response}
+        if responded_at is None:
+            errors.append(f"turn {index}: no response within {RESPONSE_TIMEOUT_S:.0f}s")
+        else:
+            record["voice_to_voice_ms"] = (responded_at - speech_end_at) * 1000
+            record["cpu_ms"] = (time.process_time() - cpu_at_speech_end) * 1000
+        record["speech_id"] = next((sid for at, sid in eou_events if at >= speech_end_at), None)
+        turns.append(record)
+
+    expected = scenario.get("expect", {})
+    try:
+        ended_by, _ = await asyncio.wait_for(asyncio.shield(call.ended), CALL_END_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        ended_by = None
+    if expected.get("ended_by") and ended_by != expected["ended_by"]:
+        errors.append(f"call ended by {ended_by}, expected {expected['ended_by']}")
+    if expected.get("status") and agent.current_status != expected["status"]:
+        errors.append(f"disposition {agent.current_status}, expected {expected['status']}")
+
+    call_s = time.perf_counter() - call_started_at
+    cpu_s = time.process_time() - cpu_started_at
+
+    audio_in.close()
+    await session.aclose()
+    # TTS metrics are only emitted once a reply's audio stream has finished
+    for record in turns:
+        for stage, value in stage_values.get(record.pop("speech_id"), {}).items():
+            record[f"{stage}_ms"] = value * 1000
+    await supervisor.aclose()
+    if greeting:
+        await greeting.aclose()
+    await tts.aclose()
+    await llm.aclose()
+    await http_session.close()
+
+    return {
+        "scenario": scenario["name"],
+        "answer_to_first_audio_ms": (first_audio_at - call_started_at) * 1000 if first_audio_at else None,
+        "turns": turns,
+        "call_s": call_s,
+        "cpu_s": cpu_s,
+        "cpu_percent": cpu_s / call_s * 100,
+        "status": agent.current_status,
+        "ended_by": ended_by,
+        "underruns": audio_out.underruns,
+        "underrun_ms": audio_out.underrun_s * 1000,
+        "input_lag_p99_ms": percentile(audio_in.lags_ms, 0.99),
+        "vad_inference_ms": vad_inference[0] / vad_inference[1] * 1000 if vad_inference[1] else None,
+        "noise_gating": noise_gate.stats() if noise_gate else None,
+        "greeting": greeting.stats() if greeting else None,
+        "errors": errors,
+    }
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    turns = [t for r in results for t in r["turns"]]
+    spoken = [t for t in turns if t["response"] == "audio" and "voice_to_voice_ms" in t]
+    v2v = [t["voice_to_voice_ms"] for t in spoken]
+    summary = {
+        "turns": len(turns),
+        "voice_to_voice_p50_ms": percentile(v2v, 0.5),
+        "voice_to_voice_p95_ms": percentile(v2v, 0.95),
+        "cpu_ms_per_turn": statistics.mean(t["cpu_ms"] for t in turns if "cpu_ms" in t) if turns else None,
+        "cpu_percent": statistics.mean(r["cpu_percent"] for r in results),
+        "answer_to_first_audio_p50_ms": percentile(
+            [r["answer_to_first_audio_ms"] for r in results if r["answer_to_first_audio_ms"]], 0.5
+        ),
+    }
+    for stage in ("eou_delay", "transcription_delay", "llm_ttft", "tts_ttfb"):
+        summary[f"{stage}_p50_ms"] = percentile([t[f"{stage}_ms"] for t in spoken if f"{stage}_ms" in t], 0.5)
+    gated = [r for r in results if r.get("noise_gating")]
+    if gated:
+        # Calls on a line this clean skip BVC for this share of their duration
+        summary["bvc_off_percent"] = statistics.mean(100 * (1 - (r["noise_gating"]["bvc_share"] or 0)) for r in gated)
+        summary["noise_gating_cpu_percent"] = statistics.mean(
+            r["noise_gating"]["processing_ms"] / 10 / r["call_s"] for r in gated
+        )
+    return summary
+
+
+def print_report(results: List[Dict[str, Any]], summary: Dict[str, Any]):
+    def ms(value):
+        return f"{value:6.0f}ms" if value is not None else "     -  "
+
+    for r in results:
+        print(f"\n{r['scenario']}: answer to first audio {ms(r['answer_to_first_audio_ms'])}, "
+              f"status {r['status']}, ended by {r['ended_by']}, CPU {r['cpu_percent']:.1f}% of a core, "
+              f"{r['underruns']} underruns")
+        gating = r.get("noise_gating")
+        if gating:
+            print(f"  noise gating: {gating['mode']} after {gating['switches']} switches, "
+                  f"SNR {gating.get('snr_db', 0):.1f}dB, BVC {gating['bvc_share'] * 100:.0f}% of the call, "
+                  f"{gating['processing_ms']:.0f}ms of gate CPU")
+        print(f"  {'turn':<4} {'response':<9}{'v2v':>9}{'eou':>9}{'ttft':>9}{'ttfb':>9}{'cpu':>9}")
+        for t in r["turns"]:
+            print(
+                f"  {t['turn']:<4} {t['response']:<9}{ms(t.get('voice_to_voice_ms'))}{ms(t.get('eou_delay_ms'))}"
+                f"{ms(t.get('llm_ttft_ms'))}{ms(t.get('tts_ttfb_ms'))}{ms(t.get('cpu_ms'))}"
+            )
+        for error in r["errors"]:
+            print(f"  FAIL {error}")
+
+    print("\nSummary")
+    for name, value in summary.items():
+        print(f"  {name:<30} {value:.1f}" if isinstance(value, float) else f"  {name:<30} {value}")
+
+
+def check(results, summary, baseline: Optional[Dict[str, Any]], args) -> List[str]:
+    failures = [f"{r['scenario']}: {e}" for r in results for e in r["errors"]]
+    p95 = summary["voice_to_voice_p95_ms"]
+    if p95 is not None and p95 > args.max_v2v_p95_ms:
+        failures.append(f"voice-to-voice p95 {p95:.0f}ms over {args.max_v2v_p95_ms:.0f}ms")
+
+    if baseline:
+        base = baseline["summary"]
+        for name, slack in (("voice_to_voice_p50_ms", 30.0), ("voice_to_voice_p95_ms", 50.0), ("cpu_ms_per_turn", 5.0)):
+            if base.get(name) is None or summary.get(name) is None:
+                continue
+            limit = base[name] * (1 + args.tolerance) + slack
+            if summary[name] > limit:
+                failures.append(f"{name} {summary[name]:.1f} over baseline {base[name]:.1f} (limit {limit:.1f})")
+    return failures
+
+
+def load_scenarios(names: Optional[List[str]]) -> List[Dict[str, Any]]:
+    scenarios = []
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, "*.json"))):
+        with open(path) as f:
+            scenario = json.load(f)
+        if not names or scenario["name"] in names:
+            scenarios.append(scenario)
+    return scenarios
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def run_all(scenarios, backend_url: str, repeat: int, **options) -> List[Dict[str, Any]]:
+    results = []
+    for repeat_index in range(repeat):
+        for scenario in scenarios:
+            results.append(await run_scenario(scenario, backend_url, repeat_index, **options))
+    return results
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay the call corpus through the agent pipeline")
+    parser.add_argument("--scenario", action="append", help="Only run this scenario (repeatable)")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--out", help="Write results as JSON, usable as a --baseline")
+    parser.add_argument("--baseline", help="Fail if latency or CPU regress against this results file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression against the baseline")
+    parser.add_argument("--max-v2v-p95-ms", type=float, default=2000.0)
+    parser.add_argument("--noise-dbfs", type=float, help="Add white line noise at this level to the caller audio")
+    parser.add_argument("--noise-gating", action="store_true", help="Run the adaptive noise gate (see noise_gate.py)")
+    parser.add_argument("--greeting-fast-path", action="store_true", help="Speak the templated greeting (see greeting.py)")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    if not args.verbose:
+        logging.getLogger("inbound-caller").setLevel(logging.WARNING)
+
+    scenarios = load_scenarios(args.scenario)
+    if not scenarios:
+        print("No scenarios found", file=sys.stderr)
+        return 1
+
+    port = free_port()
+    ctx = multiprocessing.get_context("spawn")
+    ready = ctx.Event()
+    backends = ctx.Process(
+        target=serve,
+        args=(port, {s["name"]: s for s in scenarios}, BackendTiming(), ready),
+        daemon=True,
+    )
+    backends.start()
+    try:
+        if not ready.wait(timeout=30):
+            print("Backend stand-ins did not start", file=sys.stderr)
+            return 1
+        results = asyncio.run(run_all(
+            scenarios,
+            f"http://127.0.0.1:{port}",
+            args.repeat,
+            noise_dbfs=args.noise_dbfs,
+            noise_gating=args.noise_gating,
+            greeting_fast_path=args.greeting_fast_path,
+        ))
+    finally:
+        backends.terminate()
+        backends.join()
+
+    summary = summarize(results)
+    print_report(results, summary)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"summary": summary, "results": results}, f, indent=2)
+
+    failures = check(results, summary, baseline, args)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print("PASS" if not failures else f"{len(failures)} check(s) failed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
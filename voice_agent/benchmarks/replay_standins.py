@@ -0,0 +1,346 @@
+# benchmarks/replay_standins.py
+#
+# In-process stand-ins for the caller side of a call, used by replay_pipeline.py:
+# paced audio input and output in place of RoomIO, an energy VAD in place of
+# Silero, a scripted streaming STT in place of Deepgram and a fixed-latency turn
+# detector in place of the EnglishModel (which needs the job inference process).
+import asyncio
+import time
+import wave
+from collections import deque
+from typing import Deque, List, Optional
+
+import numpy as np
+from livekit import rtc
+from livekit.agents import DEFAULT_API_CONNECT_OPTIONS, NOT_GIVEN, APIConnectOptions, stt, vad
+from livekit.agents.voice import io
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+SAMPLES_PER_FRAME = SAMPLE_RATE * FRAME_MS // 1000
+SPEECH_RMS_THRESHOLD = 500.0
+
+
+# (F1, F2, F3) of /a/, /i/, /o/, /e/
+VOWEL_FORMANTS = [(700, 1220, 2600), (300, 2300, 3000), (500, 900, 2400), (400, 1900, 2500)]
+SYLLABLE_S = 0.22
+
+
+def synthetic_speech(duration: float, seed: int) -> np.ndarray:
+    """Deterministic voiced speech-like audio that Silero VAD classifies as speech.
+
+    A jittered harmonic series around a 120 Hz pitch, shaped by vowel formants
+    that change every syllable, with a syllable-rate envelope.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(duration * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+    f0 = 120 + 15 * np.sin(2 * np.pi * 0.7 * t) + rng.normal(0, 1, n).cumsum() / 400
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    syllable = (t // SYLLABLE_S).astype(int) + seed
+    formants = np.array(VOWEL_FORMANTS, dtype=np.float64)[syllable % len(VOWEL_FORMANTS)]
+    bandwidth = 80 + 0.05 * formants
+
+    out = np.zeros(n)
+    for k in range(1, 30):
+        gain = (1 / (1 + ((k * f0[:, None] - formants) / bandwidth) ** 2)).sum(axis=1)
+        out += gain * np.sin(k * phase) / np.sqrt(k)
+    out *= np.sin(np.pi * (t % SYLLABLE_S) / SYLLABLE_S) ** 0.6
+    return (out / np.abs(out).max() * 8000).astype(np.int16)
+
+
+def load_wav(path: str) -> np.ndarray:
+    """Recorded caller audio, 16 kHz mono 16-bit"""
+    with wave.open(path, "rb") as f:
+        if f.getframerate() != SAMPLE_RATE or f.getnchannels() != 1 or f.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected {SAMPLE_RATE} Hz mono 16-bit PCM")
+        return np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+
+
+def frame_rms(frame: rtc.AudioFrame) -> float:
+    samples = np.frombuffer(frame.data, dtype=np.int16).astype(np.float32)
+    return float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+
+
+class ReplayAudioInput(io.AudioInput):
+    """Caller audio paced in real time: silence, or whatever `play()` queued.
+
+    `noise_dbfs` adds white line noise at that RMS level under everything.
+    """
+
+    def __init__(self, noise_dbfs: Optional[float] = None, seed: int = 0):
+        self.noise_rms = 32768 * 10 ** (noise_dbfs / 20) if noise_dbfs is not None else None
+        self.rng = np.random.default_rng(seed)
+        self.pending: Deque[tuple] = deque()
+        self.started_at: Optional[float] = None
+        self.frame_index = 0
+        self.closed = False
+        # How late each frame was delivered, a sign of an overloaded event loop
+        self.lags_ms: List[float] = []
+
+    def play(self, samples: np.ndarray) -> asyncio.Future:
+        """Queue caller speech; resolves with the perf_counter time its last frame was sent"""
+        done = asyncio.get_running_loop().create_future()
+        self.pending.append((samples, 0, done))
+        return done
+
+    def close(self):
+        self.closed = True
+
+    async def __anext__(self) -> rtc.AudioFrame:
+        if self.closed:
+            raise StopAsyncIteration
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+
+        # Absolute deadlines, so scheduling jitter does not accumulate into drift
+        deadline = self.started_at + self.frame_index * FRAME_MS / 1000
+        await asyncio.sleep(max(0.0, deadline - time.perf_counter()))
+        self.lags_ms.append((time.perf_counter() - deadline) * 1000)
+        self.frame_index += 1
+
+        chunk = np.zeros(SAMPLES_PER_FRAME, dtype=np.int16)
+        if self.pending:
+            samples, offset, done = self.pending[0]
+            part = samples[offset:offset + SAMPLES_PER_FRAME]
+            chunk[:len(part)] = part
+            offset += SAMPLES_PER_FRAME
+            if offset >= len(samples):
+                self.pending.popleft()
+                if not done.done():
+                    done.set_result(time.perf_counter())
+            else:
+                self.pending[0] = (samples, offset, done)
+        if self.noise_rms is not None:
+            noise = self.rng.normal(0, self.noise_rms, SAMPLES_PER_FRAME)
+            chunk = np.clip(chunk + noise, -32768, 32767).astype(np.int16)
+
+        return rtc.AudioFrame(
+            chunk.tobytes(),
+            sample_rate=SAMPLE_RATE,
+            num_channels=1,
+            samples_per_channel=SAMPLES_PER_FRAME,
+        )
+
+
+class ReplayAudioOutput(io.AudioOutput):
+    """Plays agent audio out in real time and timestamps the start of every segment.
+
+    A frame that arrives after everything pushed so far has already played out is
+    an underrun: the caller heard a gap, and playout resumes late by that much.
+    """
+
+    def __init__(self):
+        super().__init__(next_in_chain=None, sample_rate=None)
+        self.underruns = 0
+        self.underrun_s = 0.0
+        self.segment_starts: List[float] = []
+        self.segment_started = asyncio.Event()
+        self.playing = False
+        self.pushed_duration = 0.0
+        self.playout_started_at = 0.0
+        self.interrupted = asyncio.Event()
+        self.flush_task: Optional[asyncio.Task] = None
+
+    async def capture_frame(self, frame: rtc.AudioFrame) -> None:
+        await super().capture_frame(frame)
+        if self.flush_task and not self.flush_task.done():
+            await self.flush_task
+        now = time.perf_counter()
+        if not self.pushed_duration:
+            self.playing = True
+            self.playout_started_at = now
+            self.segment_starts.append(now)
+            self.segment_started.set()
+        elif now > self.playout_started_at + self.pushed_duration:
+            gap = now - (self.playout_started_at + self.pushed_duration)
+            self.underruns += 1
+            self.underrun_s += gap
+            self.playout_started_at += gap
+        self.pushed_duration += frame.duration
+
+    def flush(self) -> None:
+        super().flush()
+        if not self.pushed_duration:
+            return
+        self.flush_task = asyncio.create_task(self._wait_for_playout())
+
+    def clear_buffer(self) -> None:
+        if self.pushed_duration:
+            self.interrupted.set()
+
+    async def _wait_for_playout(self):
+        remaining = self.playout_started_at + self.pushed_duration - time.perf_counter()
+        try:
+            await asyncio.wait_for(self.interrupted.wait(), timeout=max(0.0, remaining))
+            interrupted = True
+        except asyncio.TimeoutError:
+            interrupted = False
+
+        position = min(self.pushed_duration, time.perf_counter() - self.playout_started_at)
+        self.pushed_duration = 0.0
+        self.playing = False
+        self.interrupted.clear()
+        self.on_playback_finished(playback_position=position, interrupted=interrupted)
+
+    async def next_segment(self, after: float, timeout: float) -> Optional[float]:
+        """Start time of the first segment that started at or after `after`"""
+        deadline = time.perf_counter() + timeout
+        while True:
+            for started_at in self.segment_starts:
+                if started_at >= after:
+                    return started_at
+            self.segment_started.clear()
+            try:
+                await asyncio.wait_for(self.segment_started.wait(), deadline - time.perf_counter())
+            except asyncio.TimeoutError:
+                return None
+
+
+class EnergyVAD(vad.VAD):
+    """Frame RMS threshold with Silero's default speech/silence durations"""
+
+    def __init__(self, min_speech_duration: float = 0.05, min_silence_duration: float = 0.55):
+        super().__init__(capabilities=vad.VADCapabilities(update_interval=FRAME_MS / 1000))
+        self.min_speech_duration = min_speech_duration
+        self.min_silence_duration = min_silence_duration
+
+    def stream(self) -> "EnergyVADStream":
+        return EnergyVADStream(self)
+
+
+class EnergyVADStream(vad.VADStream):
+    async def _main_task(self) -> None:
+        speaking = False
+        speech_duration = silence_duration = 0.0
+        samples_index = 0
+
+        async for frame in self._input_ch:
+            if not isinstance(frame, rtc.AudioFrame):
+                continue
+            started_at = time.perf_counter()
+            voiced = frame_rms(frame) > SPEECH_RMS_THRESHOLD
+            samples_index += frame.samples_per_channel
+            if voiced:
+                speech_duration += frame.duration
+                silence_duration = 0.0
+            else:
+                silence_duration += frame.duration
+
+            def event(kind: vad.VADEventType, **kwargs) -> vad.VADEvent:
+                return vad.VADEvent(
+                    type=kind,
+                    samples_index=samples_index,
+                    timestamp=time.time(),
+                    speech_duration=speech_duration,
+                    silence_duration=silence_duration,
+                    speaking=speaking,
+                    **kwargs,
+                )
+
+            if not speaking and voiced and speech_duration >= self._vad.min_speech_duration:
+                speaking = True
+                self._event_ch.send_nowait(event(vad.VADEventType.START_OF_SPEECH))
+            elif speaking and silence_duration >= self._vad.min_silence_duration:
+                speaking = False
+                self._event_ch.send_nowait(event(vad.VADEventType.END_OF_SPEECH))
+                speech_duration = 0.0
+            elif not speaking and not voiced:
+                speech_duration = 0.0
+
+            self._event_ch.send_nowait(
+                event(
+                    vad.VADEventType.INFERENCE_DONE,
+                    probability=1.0 if voiced else 0.0,
+                    inference_duration=time.perf_counter() - started_at,
+                    frames=[frame],
+                )
+            )
+
+
+class ReplaySTT(stt.STT):
+    """Streaming STT that returns the scripted transcript of each caller utterance.
+
+    Utterance boundaries come from the audio itself (frame energy), and the final
+    transcript is emitted `final_delay` seconds of audio after the utterance ends,
+    so transcription timing follows the audio clock rather than wall time.
+    """
+
+    def __init__(self, final_delay: float = 0.15, interim_after: float = 0.3):
+        super().__init__(capabilities=stt.STTCapabilities(streaming=True, interim_results=True))
+        self.final_delay = final_delay
+        self.interim_after = interim_after
+        self.transcripts: Deque[str] = deque()
+
+    def expect(self, text: str):
+        """Transcript of the next utterance"""
+        self.transcripts.append(text)
+
+    async def _recognize_impl(self, buffer, *, language=NOT_GIVEN, conn_options=DEFAULT_API_CONNECT_OPTIONS) -> stt.SpeechEvent:
+        raise NotImplementedError("ReplaySTT only supports streaming")
+
+    def stream(
+        self, *, language=NOT_GIVEN, conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS
+    ) -> "ReplaySpeechStream":
+        return ReplaySpeechStream(stt=self, conn_options=conn_options)
+
+
+class ReplaySpeechStream(stt.RecognizeStream):
+    async def _run(self) -> None:
+        replay_stt: ReplaySTT = self._stt
+        speaking = False
+        speech_s = silence_s = audio_s = 0.0
+        interim_sent = False
+        text = ""
+
+        def send(kind: stt.SpeechEventType, transcript: str = ""):
+            alternatives = [stt.SpeechData(language="en", text=transcript, confidence=0.95)] if transcript else []
+            self._event_ch.send_nowait(stt.SpeechEvent(type=kind, alternatives=alternatives))
+
+        async for frame in self._input_ch:
+            if not isinstance(frame, rtc.AudioFrame):
+                continue
+            audio_s += frame.duration
+            if frame_rms(frame) > SPEECH_RMS_THRESHOLD:
+                if not speaking:
+                    speaking, speech_s, interim_sent = True, 0.0, False
+                    text = replay_stt.transcripts.popleft() if replay_stt.transcripts else ""
+                    send(stt.SpeechEventType.START_OF_SPEECH)
+                speech_s += frame.duration
+                silence_s = 0.0
+                if text and not interim_sent and speech_s >= replay_stt.interim_after:
+                    interim_sent = True
+                    words = text.split()
+                    send(stt.SpeechEventType.INTERIM_TRANSCRIPT, " ".join(words[: max(1, len(words) // 2)]))
+            elif speaking:
+                silence_s += frame.duration
+                if silence_s >= replay_stt.final_delay:
+                    speaking = False
+                    if text:
+                        send(stt.SpeechEventType.FINAL_TRANSCRIPT, text)
+                    send(stt.SpeechEventType.END_OF_SPEECH)
+                    self._event_ch.send_nowait(
+                        stt.SpeechEvent(
+                            type=stt.SpeechEventType.RECOGNITION_USAGE,
+                            recognition_usage=stt.RecognitionUsage(audio_duration=audio_s),
+                        )
+                    )
+                    audio_s = 0.0
+
+
+class ReplayTurnDetector:
+    """EnglishModel stand-in with a fixed inference time"""
+
+    def __init__(self, inference_s: float = 0.03, probability: float = 0.9):
+        self.inference_s = inference_s
+        self.probability = probability
+
+    def unlikely_threshold(self, language: Optional[str]) -> Optional[float]:
+        return 0.15
+
+    def supports_language(self, language: Optional[str]) -> bool:
+        return True
+
+    async def predict_end_of_turn(self, chat_ctx) -> float:
+        await asyncio.sleep(self.inference_s)
+        return self.probability
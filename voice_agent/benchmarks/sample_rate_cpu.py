@@ -0,0 +1,215 @@
+# benchmarks/sample_rate_cpu.py
+#
+# CPU per call of the agent-side audio path at the wideband default and the
+# telephony rates of telephony_audio.py. Each configuration runs one call's worth
+# of audio through the stages whose rate it sets, with the production components:
+#
+#   room input   48kHz Opus decode output resampled to the input track rate (FFI)
+#   stt          resampled to Deepgram's rate when it differs, converted to bytes
+#   vad          Silero, resampled to its model rate when it differs
+#   tts decode   Resemble's MP3 stream decoded at the TTS rate
+#   room output  resampled to the output track rate when it differs, then to
+#                48kHz for the Opus encoder (FFI)
+#
+# Opus encode/decode, BVC and the turn detector cost the same at every rate and
+# are left out. Run from voice_agent/:
+#
+#   python benchmarks/sample_rate_cpu.py --call-s 60
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+import av
+import numpy as np
+from livekit import rtc
+from livekit.agents.utils import codecs
+from livekit.plugins import silero
+
+from replay_backends import MP3_FRAME_SAMPLES
+from replay_standins import SAMPLE_RATE as SPEECH_SAMPLE_RATE, synthetic_speech
+from telephony_audio import AudioRates, audio_rates
+
+WEBRTC_SAMPLE_RATE = 48000
+INPUT_FRAME_MS = 10  # rtc.AudioStream frame size
+CAMPAIGN_TTS_SAMPLE_RATE = 24000
+
+CONFIGURATIONS = {
+    "wideband": audio_rates(CAMPAIGN_TTS_SAMPLE_RATE, telephony_sample_rate=None),
+    "telephony_16k": audio_rates(CAMPAIGN_TTS_SAMPLE_RATE, telephony_sample_rate=16000),
+    "telephony_8k": audio_rates(CAMPAIGN_TTS_SAMPLE_RATE, telephony_sample_rate=8000),
+}
+
+
+def resample_all(samples: np.ndarray, input_rate: int, output_rate: int) -> np.ndarray:
+    """Setup helper, not measured"""
+    resampler = rtc.AudioResampler(input_rate, output_rate, quality=rtc.AudioResamplerQuality.HIGH)
+    frame = rtc.AudioFrame(samples.tobytes(), input_rate, 1, len(samples))
+    frames = resampler.push(frame) + resampler.flush()
+    return np.concatenate([np.frombuffer(f.data, dtype=np.int16) for f in frames])
+
+
+def to_frames(samples: np.ndarray, sample_rate: int, frame_ms: int) -> List[rtc.AudioFrame]:
+    step = sample_rate * frame_ms // 1000
+    return [
+        rtc.AudioFrame(samples[i:i + step].tobytes(), sample_rate, 1, step)
+        for i in range(0, len(samples) - step + 1, step)
+    ]
+
+
+def encode_mp3(samples: np.ndarray, sample_rate: int) -> bytes:
+    """Resemble's streaming format at `sample_rate`"""
+    codec = av.CodecContext.create("libmp3lame", "w")
+    codec.sample_rate = sample_rate
+    codec.layout = "mono"
+    codec.format = "fltp"
+    audio = (samples.astype(np.float32) / 32768).reshape(1, -1)
+    packets = []
+    for start in range(0, audio.shape[1], MP3_FRAME_SAMPLES):
+        frame = av.AudioFrame.from_ndarray(audio[:, start:start + MP3_FRAME_SAMPLES], format="fltp", layout="mono")
+        frame.sample_rate = sample_rate
+        packets.extend(bytes(p) for p in codec.encode(frame))
+    packets.extend(bytes(p) for p in codec.encode(None))
+    return b"".join(packets)
+
+
+def cpu_ms(fn) -> float:
+    started_at = time.process_time()
+    fn()
+    return (time.process_time() - started_at) * 1000
+
+
+def resample_stage(frames: List[rtc.AudioFrame], output_rate: int, quality=rtc.AudioResamplerQuality.MEDIUM) -> float:
+    def run():
+        resampler = rtc.AudioResampler(frames[0].sample_rate, output_rate, quality=quality)
+        for frame in frames:
+            resampler.push(frame)
+        resampler.flush()
+
+    return cpu_ms(run) if frames[0].sample_rate != output_rate else 0.0
+
+
+def stt_stage(frames: List[rtc.AudioFrame], stt_rate: int) -> float:
+    # RecognizeStream.push_frame resamples with HIGH quality, Deepgram sends bytes
+    def run():
+        resampler = (
+            rtc.AudioResampler(frames[0].sample_rate, stt_rate, quality=rtc.AudioResamplerQuality.HIGH)
+            if frames[0].sample_rate != stt_rate
+            else None
+        )
+        for frame in frames:
+            for f in resampler.push(frame) if resampler else [frame]:
+                f.data.tobytes()
+
+    return cpu_ms(run)
+
+
+async def vad_stage(frames: List[rtc.AudioFrame], vad_rate: int) -> float:
+    vad = silero.VAD.load(sample_rate=vad_rate)
+    started_at = time.process_time()
+    stream = vad.stream()
+    for frame in frames:
+        stream.push_frame(frame)
+    stream.end_input()
+    async for _ in stream:
+        pass
+    cpu = (time.process_time() - started_at) * 1000
+    await stream.aclose()
+    return cpu
+
+
+async def tts_decode_stage(mp3: bytes, tts_rate: int) -> List[rtc.AudioFrame]:
+    # AudioEmitter decodes Resemble's MP3 at the TTS rate
+    decoder = codecs.AudioStreamDecoder(sample_rate=tts_rate, num_channels=1)
+    chunk = 4096
+    for i in range(0, len(mp3), chunk):
+        decoder.push(mp3[i:i + chunk])
+    decoder.end_input()
+    frames = [frame async for frame in decoder]
+    await decoder.aclose()
+    return frames
+
+
+async def run_configuration(rates: AudioRates, speech: np.ndarray, call_s: float, talk_ratio: float) -> Dict[str, Any]:
+    # Caller audio as the FFI decodes it from Opus, for the whole call
+    caller = resample_all(speech, SPEECH_SAMPLE_RATE, WEBRTC_SAMPLE_RATE)
+    webrtc_frames = to_frames(caller, WEBRTC_SAMPLE_RATE, INPUT_FRAME_MS)
+    input_samples = resample_all(caller, WEBRTC_SAMPLE_RATE, rates.room_input)
+    input_frames = to_frames(input_samples, rates.room_input, INPUT_FRAME_MS)
+    # The agent speaks for talk_ratio of the call
+    agent_speech = speech[: int(len(speech) * talk_ratio)]
+    mp3 = encode_mp3(resample_all(agent_speech, SPEECH_SAMPLE_RATE, rates.tts), rates.tts)
+
+    stages = {"room_input": resample_stage(webrtc_frames, rates.room_input)}
+    stages["stt"] = stt_stage(input_frames, rates.stt)
+    stages["vad"] = await vad_stage(input_frames, rates.vad)
+
+    started_at = time.process_time()
+    tts_frames = await tts_decode_stage(mp3, rates.tts)
+    stages["tts_decode"] = (time.process_time() - started_at) * 1000
+
+    output_frames = tts_frames
+    if rates.tts != rates.room_output:
+        output_frames = to_frames(
+            resample_all(np.concatenate([np.frombuffer(f.data, dtype=np.int16) for f in tts_frames]), rates.tts, rates.room_output),
+            rates.room_output,
+            INPUT_FRAME_MS,
+        )
+    stages["room_output"] = resample_stage(tts_frames, rates.room_output) + resample_stage(output_frames, WEBRTC_SAMPLE_RATE)
+
+    total = sum(stages.values())
+    return {
+        "rates": rates.__dict__,
+        "resampling": rates.resampling_stages(),
+        "cpu_ms_per_call_min": {k: v / call_s * 60 for k, v in stages.items()},
+        "total_cpu_ms_per_call_min": total / call_s * 60,
+        "core_percent_per_call": total / call_s / 10,
+    }
+
+
+def print_report(results: Dict[str, Dict[str, Any]]):
+    stages = list(next(iter(results.values()))["cpu_ms_per_call_min"])
+    print(f"{'CPU ms per call-minute':<16}" + "".join(f"{s:>13}" for s in stages) + f"{'total':>10}{'%core':>8}  resampling")
+    for name, result in results.items():
+        row = "".join(f"{result['cpu_ms_per_call_min'][s]:>13.1f}" for s in stages)
+        print(
+            f"{name:<16}{row}{result['total_cpu_ms_per_call_min']:>10.1f}{result['core_percent_per_call']:>8.2f}  "
+            f"{', '.join(result['resampling']) or 'none'}"
+        )
+    baseline = results["wideband"]["total_cpu_ms_per_call_min"]
+    for name, result in results.items():
+        if name != "wideband":
+            print(f"{name}: {(1 - result['total_cpu_ms_per_call_min'] / baseline) * 100:.0f}% less CPU per call than wideband")
+
+
+def main_cli(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="CPU per call of the audio path at 8, 16 and 24kHz")
+    parser.add_argument("--call-s", type=float, default=60.0, help="Seconds of call audio per configuration")
+    parser.add_argument("--talk-ratio", type=float, default=0.5, help="Share of the call the agent speaks")
+    parser.add_argument("--config", action="append", choices=sorted(CONFIGURATIONS), help="Only run this configuration")
+    parser.add_argument("--out", help="Write results as JSON")
+    args = parser.parse_args(argv)
+
+    speech = synthetic_speech(args.call_s, seed=7)
+    names = args.config or list(CONFIGURATIONS)
+    if "wideband" not in names:
+        names.insert(0, "wideband")
+    results = {
+        name: asyncio.run(run_configuration(CONFIGURATIONS[name], speech, args.call_s, args.talk_ratio))
+        for name in names
+    }
+    print_report(results)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
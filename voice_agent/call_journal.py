@@ -0,0 +1,169 @@
+# call_journal.py
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+import zlib
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, Optional
+
+journal_logger = logging.getLogger("call_journal")
+
+# Directory for per-call journals; unset (the default) disables journaling, the
+# journals hold full transcripts with the caller's personal details
+CALL_JOURNAL_DIR = os.getenv("CALL_JOURNAL_DIR")
+
+
+class CallJournal:
+    """Append-only, gzip-compressed JSON-lines journal of one call.
+
+    `append()` only puts a small dict on a bounded in-memory buffer, so it is safe
+    on the audio path. A background task serializes, compresses and writes the
+    buffer in a thread every `flush_interval` seconds (or sooner once
+    `flush_threshold` events are waiting). Each flush writes one gzip member, so the
+    file is readable with `gzip.open` while the call is still in progress.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = 2.0,
+        flush_threshold: int = 200,
+        max_buffered: int = 5000,
+    ):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.buffer: Deque[Dict[str, Any]] = deque(maxlen=max_buffered)
+        self.flush_needed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.closing = False
+        self.file = None
+        self.started_at = time.time()
+
+        # Statistics
+        self.appended_count = 0
+        self.written_count = 0
+        self.dropped_count = 0
+        self.bytes_written = 0
+
+    @classmethod
+    def for_call(cls, call_id: str, journal_dir: str = CALL_JOURNAL_DIR) -> "CallJournal":
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        return cls(os.path.join(journal_dir, f"{timestamp}_{call_id}.jsonl.gz"))
+
+    def start(self):
+        self.task = asyncio.create_task(self._flush_loop(), name="call_journal")
+
+    def append(self, kind: str, **data: Any):
+        """Record an event. Never blocks; the oldest events are dropped if the writer falls behind"""
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped_count += 1
+        data["t"] = round(time.time() - self.started_at, 3)
+        data["kind"] = kind
+        self.buffer.append(data)
+        self.appended_count += 1
+        if len(self.buffer) >= self.flush_threshold:
+            self.flush_needed.set()
+
+    async def _flush_loop(self):
+        # Only this task writes, so flushes never overlap in the writer thread
+        while not self.closing:
+            try:
+                await asyncio.wait_for(self.flush_needed.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.flush_needed.clear()
+            await self.flush()
+
+    async def flush(self):
+        if not self.buffer:
+            return
+        events = list(self.buffer)
+        self.buffer.clear()
+        try:
+            await asyncio.to_thread(self._write, events)
+            self.written_count += len(events)
+        except Exception as e:
+            self.dropped_count += len(events)
+            journal_logger.error(f"Failed to write {len(events)} journal events to {self.path}: {e}")
+
+    def _write(self, events):
+        lines = "".join(json.dumps(e, separators=(",", ":"), default=str) + "\n" for e in events)
+        member = gzip.compress(lines.encode(), compresslevel=6)
+        if self.file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.file = open(self.path, "ab")
+        self.file.write(member)
+        self.file.flush()
+        self.bytes_written += len(member)
+
+    async def aclose(self):
+        """Flush whatever is buffered and close the file"""
+        self.closing = True
+        self.flush_needed.set()
+        if self.task:
+            await asyncio.gather(self.task, return_exceptions=True)
+        # Events appended while the loop's last flush was writing
+        await self.flush()
+        if self.file is not None:
+            await asyncio.to_thread(self.file.close)
+            self.file = None
+        journal_logger.info(
+            f"Journal {self.path} closed. Events: {self.written_count}, "
+            f"dropped: {self.dropped_count}, bytes: {self.bytes_written}"
+        )
+
+
+def read_journal(path: str, follow: bool = False, poll_interval: float = 0.5) -> Iterator[Dict[str, Any]]:
+    """Stream events back from a journal, optionally following a call in progress"""
+    with open(path, "rb") as f:
+        decompressor = zlib.decompressobj(wbits=31)
+        pending = b""
+        while True:
+            chunk = f.read(64 * 1024)
+            if not chunk:
+                if not follow:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            data = chunk
+            while data:
+                pending += decompressor.decompress(data)
+                if decompressor.eof:
+                    # Next gzip member
+                    data = decompressor.unused_data
+                    decompressor = zlib.decompressobj(wbits=31)
+                else:
+                    data = b""
+
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                if line:
+                    yield json.loads(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print a call journal")
+    parser.add_argument("path")
+    parser.add_argument("--follow", action="store_true", help="Keep reading as the call goes on")
+    parser.add_argument("--kind", action="append", help="Only show events of this kind")
+    args = parser.parse_args()
+
+    try:
+        for event in read_journal(args.path, follow=args.follow):
+            if args.kind and event.get("kind") not in args.kind:
+                continue
+            t = event.pop("t")
+            kind = event.pop("kind")
+            print(f"{t:9.3f}  {kind:<22} {json.dumps(event)}")
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+# call_logging.py
+#
+# Logging for job processes that keeps formatting and I/O off the event loop.
+#
+# LiveKit's job-process handler formats, copies and pickles every record on the
+# thread that logs it, i.e. the event loop, and the root logger of a job process
+# is NOTSET, so even records the worker later drops by level pay that cost.
+# install() puts a queue in front of it: on the loop a record is only
+# level-checked, sampled and enqueued; a listener thread then redacts PII,
+# formats the message and hands it to LiveKit's handler.
+#
+# - Lazy formatting: log with %-style args (`logger.info("Metrics: %s", m)`), the
+#   message is built on the listener thread, and not at all if the record is
+#   dropped. Pass immutable values, the args are read after the call returns.
+# - Per-call context: set_call_context() adds room and lead_id to every record of
+#   the process (one call per job process); pass speech_id with
+#   `extra={"speech_id": ...}`. They are JSON fields in production logs.
+# - Sampling: below WARNING each message template gets LOG_SAMPLE_RATE records
+#   per second (burst LOG_SAMPLE_BURST); the next record that passes carries the
+#   number suppressed since.
+# - PII redaction: lead fields in dict args and emails, phone numbers and API
+#   passwords in messages are masked before anything is written.
+#
+# benchmarks/logging_overhead.py measures the per-event cost on the loop.
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+LOG_LEVEL = os.getenv("LOG_LEVEL") or ("DEBUG" if os.getenv("ENVIRONMENT") == "development" else "INFO")
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "5"))
+LOG_SAMPLE_BURST = float(os.getenv("LOG_SAMPLE_BURST", "20"))
+# Records queued beyond this are dropped rather than blocking the loop
+LOG_QUEUE_SIZE = 10000
+
+PII_FIELDS = frozenset({
+    "first_name", "middle_initial", "last_name", "name", "title", "email",
+    "phone_number", "alt_phone", "phone", "address1", "address2", "address3",
+    "city", "state", "province", "postal_code", "gender", "date_of_birth", "security_phrase",
+    "comments", "pass", "transcript",
+})
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+# North American numbers as the dialer and SIP attributes carry them
+PHONE_RE = re.compile(r"(?<![\w.:-])(?:\+?1[\s.-]?)?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}(?![\w.:-])")
+PASSWORD_RE = re.compile(r"(pass=)[^&\s'\"]+")
+
+_call_context: Dict[str, Any] = {}
+_listener: Optional["RedactingQueueListener"] = None
+
+
+def set_call_context(**fields: Any):
+    """Fields added to every record of this process, e.g. room and lead_id"""
+    _call_context.update({k: v for k, v in fields.items() if v is not None})
+
+
+def _mask_phone(match: re.Match) -> str:
+    digits = re.sub(r"\D", "", match.group(0))
+    return f"***{digits[-2:]}"
+
+
+def redact_text(text: str) -> str:
+    text = PASSWORD_RE.sub(r"\1***", text)
+    text = EMAIL_RE.sub("***@***", text)
+    return PHONE_RE.sub(_mask_phone, text)
+
+
+def redact_value(value: Any) -> Any:
+    """Lead records and other dicts with their PII fields masked"""
+    if isinstance(value, dict):
+        return {k: "***" if k in PII_FIELDS and v else redact_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(redact_value(v) for v in value)
+    return value
+
+
+class CallContextFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _call_context.items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Token bucket per (logger, message template) for records below WARNING"""
+
+    def __init__(self, rate: float = LOG_SAMPLE_RATE, burst: float = LOG_SAMPLE_BURST):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.lock = threading.Lock()
+        # key -> [tokens, last refill, suppressed since the last record that passed]
+        self.buckets: Dict[Tuple[str, Any], list] = {}
+
+        # Statistics
+        self.suppressed_total = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.rate <= 0:
+            return True
+        key = (record.name, record.msg if isinstance(record.msg, str) else type(record.msg))
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = [self.burst, now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1.0:
+                bucket[2] += 1
+                self.suppressed_total += 1
+                return False
+            bucket[0] -= 1.0
+            if bucket[2]:
+                record.suppressed = bucket[2]
+                bucket[2] = 0
+        return True
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """Enqueues records as they are; formatting happens on the listener thread"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+
+        # Statistics
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RedactingQueueListener(logging.handlers.QueueListener):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        try:
+            args = record.args
+            if isinstance(args, dict):
+                args = redact_value(args)
+            elif args:
+                args = tuple(redact_value(a) for a in args)
+            message = record.msg % args if args else str(record.msg)
+        except Exception:
+            message = f"{record.msg} {record.args}"
+        message = redact_text(message)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            message = f"{message} ({suppressed} similar suppressed)"
+        record.msg, record.args = message, None
+        return record
+
+    def enqueue_sentinel(self):
+        # Waits for room, the queue may be full when the process exits
+        self.queue.put(self._sentinel)
+
+    def stop(self):
+        """Hand the queued records to the handlers and stop; safe to call twice"""
+        if self._thread is not None:
+            super().stop()
+
+
+def install(level: str = LOG_LEVEL, sample_rate: float = LOG_SAMPLE_RATE) -> Optional[RedactingQueueListener]:
+    """Route this process's logging through the queue; call once per process (prewarm_fnc)"""
+    global _listener
+    if _listener is not None:
+        return _listener
+    root = logging.getLogger()
+    handlers = root.handlers[:]
+    if not handlers:
+        return None
+
+    log_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+    handler = LazyQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(rate=sample_rate))
+    handler.addFilter(CallContextFilter())
+    listener = RedactingQueueListener(log_queue, *handlers, respect_handler_level=True)
+    for wrapped in handlers:
+        # LiveKit closes its handler once the job's loop is done; the records still
+        # queued (shutdown callbacks) go out first
+        wrapped.close = _drain_before(listener, wrapped.close)
+    root.handlers = [handler]
+    # Filtered where the record is created, so dropped debug output costs nothing
+    root.setLevel(level)
+    listener.start()
+    atexit.register(listener.stop)
+    _listener = listener
+    return listener
+
+
+def _drain_before(listener: RedactingQueueListener, close):
+    def drain_and_close():
+        listener.stop()
+        close()
+
+    return drain_and_close
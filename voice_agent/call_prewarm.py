@@ -0,0 +1,211 @@
+# call_prewarm.py
+#
+# Connection pre-warming driven by the SIP call status. As soon as the SIP
+# participant shows up (dialing, ringing or already active) the Deepgram
+# websocket and a Resemble websocket are opened, in parallel with the lead
+# lookup and session setup instead of after them, and the greeting's name
+# segment is synthesized (see greeting.py). The agent then waits for `active`
+# before it speaks, so a call that is still ringing does not get its greeting
+# played into the ring tone, and the first STT result and first TTS audio pay
+# no connection setup once the callee answers.
+#
+# If the call never becomes active (hangup while ringing, CALL_ANSWER_TIMEOUT_S),
+# the pre-opened connections are closed.
+import asyncio
+import logging
+import os
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+
+import aiohttp
+from livekit import rtc
+from livekit.agents import DEFAULT_API_CONNECT_OPTIONS, APIConnectOptions, NOT_GIVEN
+from livekit.agents import tts as agents_tts
+from livekit.plugins import deepgram
+import livekit.plugins.deepgram.stt as deepgram_stt
+
+prewarm_logger = logging.getLogger("call_prewarm")
+
+CALL_ANSWER_TIMEOUT_S = float(os.getenv("CALL_ANSWER_TIMEOUT_S", "60"))
+# sip.callStatus values before and at answer
+PREWARM_CALL_STATUSES = ("dialing", "ringing", "active")
+ANSWERED_CALL_STATUS = "active"
+ENDED_CALL_STATUS = "hangup"
+# Deepgram closes a websocket that gets neither audio nor KeepAlive for 10s
+DEEPGRAM_KEEPALIVE_S = 5.0
+
+
+class PrewarmedDeepgramSTT(deepgram.STT):
+    """deepgram.STT whose first stream starts on a websocket opened by prewarm().
+
+    AgentSession also calls prewarm() when it starts, which is a no-op once the
+    call status already did.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._prewarm_task: Optional[asyncio.Task] = None
+        self._keepalive_task: Optional[asyncio.Task] = None
+        self._claimed = False
+
+    def prewarm(self) -> None:
+        if self._prewarm_task is None and not self._claimed:
+            self._prewarm_task = asyncio.create_task(self._open_ws(), name="deepgram_prewarm")
+
+    async def _open_ws(self) -> aiohttp.ClientWebSocketResponse:
+        # Same URL and options a stream of this client connects with
+        stream_like = SimpleNamespace(
+            _opts=self._sanitize_options(),
+            _api_key=self._api_key,
+            _session=self._ensure_session(),
+            _base_url=self._base_url,
+            _conn_options=DEFAULT_API_CONNECT_OPTIONS,
+        )
+        ws = await deepgram_stt.SpeechStream._connect_ws(stream_like)
+        self._keepalive_task = asyncio.create_task(self._keepalive(ws), name="deepgram_prewarm_keepalive")
+        return ws
+
+    async def _keepalive(self, ws: aiohttp.ClientWebSocketResponse):
+        try:
+            while True:
+                await ws.send_str(deepgram_stt.SpeechStream._KEEPALIVE_MSG)
+                await asyncio.sleep(DEEPGRAM_KEEPALIVE_S)
+        except Exception as e:
+            prewarm_logger.warning(f"Pre-warmed Deepgram websocket lost: {e}")
+
+    async def take_prewarmed(self) -> Optional[aiohttp.ClientWebSocketResponse]:
+        """The pre-opened websocket, at most once; None if there is none or it broke"""
+        # Later streams (reconnects) connect normally
+        task, self._prewarm_task, self._claimed = self._prewarm_task, None, True
+        if task is None:
+            return None
+        try:
+            ws = await task
+        except Exception as e:
+            prewarm_logger.warning(f"Deepgram pre-warm failed, connecting now: {e}")
+            return None
+        keepalive, self._keepalive_task = self._keepalive_task, None
+        if keepalive is None or keepalive.done() or ws.closed:
+            await ws.close()
+            return None
+        keepalive.cancel()
+        await asyncio.gather(keepalive, return_exceptions=True)
+        return ws
+
+    async def release(self):
+        """Close the pre-opened websocket if no stream took it"""
+        ws = await self.take_prewarmed()
+        if ws is not None:
+            await ws.close()
+
+    def stream(
+        self,
+        *,
+        language=NOT_GIVEN,
+        conn_options: APIConnectOptions = DEFAULT_API_CONNECT_OPTIONS,
+    ) -> deepgram_stt.SpeechStream:
+        stream = PrewarmedSpeechStream(
+            stt=self,
+            conn_options=conn_options,
+            opts=self._sanitize_options(language=language),
+            api_key=self._api_key,
+            http_session=self._ensure_session(),
+            base_url=self._base_url,
+        )
+        self._streams.add(stream)
+        return stream
+
+
+class PrewarmedSpeechStream(deepgram_stt.SpeechStream):
+    async def _connect_ws(self) -> aiohttp.ClientWebSocketResponse:
+        ws = await self._stt.take_prewarmed()
+        if ws is not None:
+            prewarm_logger.info("Deepgram stream started on the pre-warmed websocket")
+            return ws
+        return await super()._connect_ws()
+
+
+class CallPrewarm:
+    """Pre-warming and answer tracking of one call, fed with sip.callStatus values"""
+
+    def __init__(self, stt: Any, tts: agents_tts.TTS):
+        self.stt = stt
+        self.tts = tts
+        self.status: Optional[str] = None
+        self._answered = asyncio.Event()
+        self._ended = asyncio.Event()
+        self._released = False
+
+        # Statistics
+        self.created_at = time.perf_counter()
+        self.first_status: Optional[str] = None
+        self.prewarm_started_ms: Optional[float] = None
+        self.answered_after_ms: Optional[float] = None
+
+    @property
+    def answered(self) -> bool:
+        return self._answered.is_set()
+
+    def on_call_status(self, status: Optional[str]):
+        if not status or status == self.status:
+            return
+        self.status = status
+        if self.first_status is None:
+            self.first_status = status
+        if status in PREWARM_CALL_STATUSES and self.prewarm_started_ms is None:
+            self.prewarm_started_ms = (time.perf_counter() - self.created_at) * 1000
+            # Both return immediately, the connections open in the background
+            self.stt.prewarm()
+            self.tts.prewarm()
+        if status == ANSWERED_CALL_STATUS and not self.answered:
+            self.answered_after_ms = (time.perf_counter() - self.created_at) * 1000
+            self._answered.set()
+        elif status == ENDED_CALL_STATUS:
+            self._ended.set()
+
+    async def wait_answered(self, participant: Optional[rtc.Participant], timeout: float = CALL_ANSWER_TIMEOUT_S) -> bool:
+        """Whether the callee picked up; a call without SIP status counts as answered"""
+        if participant is not None:
+            # Transitions during the lead lookup happened before the event handler was registered
+            self.on_call_status(participant.attributes.get("sip.callStatus"))
+        if self.status is None:
+            self._answered.set()
+        if self.answered:
+            return True
+        if self.status == ENDED_CALL_STATUS:
+            return False
+
+        prewarm_logger.info(f"Call is {self.status}, waiting for it to be answered")
+        answered = asyncio.create_task(self._answered.wait())
+        ended = asyncio.create_task(self._ended.wait())
+        try:
+            await asyncio.wait([answered, ended], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            answered.cancel()
+            ended.cancel()
+        if not self.answered:
+            prewarm_logger.info(f"Call not answered ({self.status}), releasing pre-warmed connections")
+            await self.release()
+        return self.answered
+
+    async def release(self):
+        if self._released:
+            return
+        self._released = True
+        if isinstance(self.stt, PrewarmedDeepgramSTT):
+            await self.stt.release()
+        # Job processes serve one call, so the client's pooled connection can go with it
+        await self.tts.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "first_status": self.first_status,
+            "prewarm_started_ms": round(self.prewarm_started_ms, 1) if self.prewarm_started_ms is not None else None,
+            "answered_after_ms": round(self.answered_after_ms, 1) if self.answered_after_ms is not None else None,
+        }
+
+    async def aclose(self):
+        if not self.answered:
+            await self.release()
+        prewarm_logger.info(f"Call pre-warm: {self.stats()}")
@@ -0,0 +1,430 @@
+# call_tracing.py
+#
+# Per-call tracing: one trace per call with nested spans for where its time goes.
+#
+#   call
+#     connect, wait_for_participant, get_lead_info, session_start,
+#     wait_answered, amd, greeting
+#     turn (one per speech_id, from the pipeline metrics)
+#       stt_final, eou, llm, tts
+#     tool.<name> (transfer_call_to_galactic, end_call_galactic, ...)
+#       transfer_call, hangup, update_lead
+#
+# Sampling is decided once per call at its start (head sampling,
+# CALL_TRACE_SAMPLE_RATE), so an unsampled call costs one no-op context
+# manager per span. Spans of a sampled call are queued when they end; a
+# background thread batches them as OTLP/JSON (ExportTraceServiceRequest) and
+# appends them to CALL_TRACE_DIR/<room>.jsonl and/or POSTs them to
+# CALL_TRACE_OTLP_URL (an OTLP/HTTP collector, e.g. http://127.0.0.1:4318/v1/traces).
+#
+# Open a call's timeline, or list the slowest traced calls:
+#
+#   python call_tracing.py call_traces/<room>.jsonl
+#   python call_tracing.py call_traces/
+#
+# `python call_tracing.py --collect 4318` runs a local OTLP/HTTP stand-in that
+# writes what it receives to CALL_TRACE_DIR in the same format.
+import argparse
+import asyncio
+import contextvars
+import functools
+import glob
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional
+
+from livekit.agents import metrics
+
+tracing_logger = logging.getLogger("call_tracing")
+
+# Directory for per-call trace files, empty to disable
+CALL_TRACE_DIR = os.getenv("CALL_TRACE_DIR", "")
+CALL_TRACE_OTLP_URL = os.getenv("CALL_TRACE_OTLP_URL", "")
+CALL_TRACE_SAMPLE_RATE = float(os.getenv("CALL_TRACE_SAMPLE_RATE", "0.1"))
+CALL_TRACING_ENABLED = bool(CALL_TRACE_DIR or CALL_TRACE_OTLP_URL)
+EXPORT_INTERVAL_S = 2.0
+EXPORT_BATCH_SIZE = 256
+EXPORT_TIMEOUT_S = 5.0
+SERVICE_NAME = "voice_agent"
+
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("call_tracing_span", default=None)
+_trace: Optional["CallTrace"] = None
+
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Span:
+    def __init__(self, trace: "CallTrace", name: str, parent: Optional["Span"], start_ns: Optional[int] = None, **attributes: Any):
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent = parent
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = {k: v for k, v in attributes.items() if v is not None}
+        self.status = STATUS_OK
+        self.status_message = ""
+        # End of the latest child recorded with record(), for turns
+        self.covered_end_ns = self.start_ns
+
+    def set(self, **attributes: Any):
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+    def fail(self, error: BaseException):
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    def end(self, end_ns: Optional[int] = None):
+        if self.end_ns is None:
+            self.end_ns = end_ns or time.time_ns()
+            self.trace.exporter.export(self.to_otlp())
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": self.status, "message": self.status_message},
+        }
+        if self.parent is not None:
+            span["parentSpanId"] = self.parent.span_id
+        return span
+
+
+class _NoopSpan:
+    def set(self, **attributes: Any):
+        pass
+
+    def fail(self, error: BaseException):
+        pass
+
+    def end(self, end_ns: Optional[int] = None):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class SpanExporter:
+    """Batches finished spans on a daemon thread; export() only enqueues"""
+
+    def __init__(self, room: str, trace_dir: str = CALL_TRACE_DIR, otlp_url: str = CALL_TRACE_OTLP_URL):
+        self.path = os.path.join(trace_dir, f"{room}.jsonl") if trace_dir else None
+        self.otlp_url = otlp_url or None
+        self.resource = [_attribute("service.name", SERVICE_NAME), _attribute("room", room)]
+        self.queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="call_tracing_export", daemon=True)
+
+        # Statistics
+        self.exported = 0
+        self.failed = 0
+
+    def start(self):
+        if self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.thread.start()
+
+    def export(self, span: Dict[str, Any]):
+        self.queue.put_nowait(span)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch: List[Dict[str, Any]] = []
+            deadline = time.monotonic() + EXPORT_INTERVAL_S
+            while len(batch) < EXPORT_BATCH_SIZE:
+                try:
+                    span = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if span is None:
+                    stopping = True
+                    break
+                batch.append(span)
+            if batch:
+                self._write(batch)
+
+    def _write(self, spans: List[Dict[str, Any]]):
+        request = {
+            "resourceSpans": [{
+                "resource": {"attributes": self.resource},
+                "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": spans}],
+            }]
+        }
+        body = json.dumps(request, separators=(",", ":"))
+        try:
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write(body + "\n")
+            if self.otlp_url:
+                post = urllib.request.Request(
+                    self.otlp_url, data=body.encode(), headers={"Content-Type": "application/json"}, method="POST"
+                )
+                urllib.request.urlopen(post, timeout=EXPORT_TIMEOUT_S).close()
+            self.exported += len(spans)
+        except Exception as e:
+            self.failed += len(spans)
+            tracing_logger.warning(f"Exporting {len(spans)} spans failed: {e}")
+
+    def stop(self, timeout: float = EXPORT_TIMEOUT_S):
+        """Export what is queued and stop; blocking, run it in a thread"""
+        self.queue.put_nowait(None)
+        self.thread.join(timeout)
+
+
+class CallTrace:
+    """The trace of one call; job processes serve one call, so it is process-wide"""
+
+    def __init__(self, room: str, exporter: Optional[SpanExporter] = None, **attributes: Any):
+        self.room = room
+        self.trace_id = os.urandom(16).hex()
+        self.exporter = exporter or SpanExporter(room)
+        self.root = Span(self, "call", None, room=room, **attributes)
+        # speech_id -> turn span, ended when the call's trace closes
+        self.turns: Dict[str, Span] = {}
+
+    def start(self):
+        self.exporter.start()
+        # Tasks started from here on (the whole call) nest their spans under the call
+        _current_span.set(self.root)
+
+    def start_span(self, name: str, start_ns: Optional[int] = None, parent: Optional[Span] = None, **attributes: Any) -> Span:
+        return Span(self, name, parent or _current_span.get() or self.root, start_ns, **attributes)
+
+    def turn(self, speech_id: str) -> Span:
+        span = self.turns.get(speech_id)
+        if span is None:
+            span = self.turns[speech_id] = Span(self, "turn", self.root, speech_id=speech_id)
+        return span
+
+    def record(self, name: str, start_s: float, end_s: float, parent: Span, **attributes: Any):
+        """A span measured elsewhere, from time.time() seconds"""
+        start_ns, end_ns = int(start_s * 1e9), int(end_s * 1e9)
+        span = Span(self, name, parent, start_ns, **attributes)
+        # Turns cover their stages
+        parent.start_ns = min(parent.start_ns, start_ns)
+        parent.covered_end_ns = max(parent.covered_end_ns, end_ns)
+        span.end(end_ns)
+
+    async def aclose(self):
+        for turn in self.turns.values():
+            turn.end(turn.covered_end_ns)
+        self.root.end()
+        await asyncio.to_thread(self.exporter.stop)
+        tracing_logger.info(f"Trace {self.trace_id}: {self.exporter.exported} spans exported, {self.exporter.failed} failed")
+
+
+def start_call(room: str, sample_rate: float = CALL_TRACE_SAMPLE_RATE, **attributes: Any) -> Optional[CallTrace]:
+    """Decide whether this call is traced and start its trace; None if not"""
+    global _trace
+    if not CALL_TRACING_ENABLED or random.random() >= sample_rate:
+        return None
+    _trace = CallTrace(room, **attributes)
+    _trace.start()
+    return _trace
+
+
+def current_trace() -> Optional[CallTrace]:
+    return _trace
+
+
+@contextmanager
+def span(name: str, nest: bool = True, **attributes: Any) -> Iterator[Any]:
+    """Span around a block of the current call; a no-op when the call is not traced.
+
+    With nest=False, tasks started inside the block do not become its children
+    (session_start starts the session's long-lived tasks).
+    """
+    if _trace is None:
+        yield NOOP_SPAN
+        return
+    s = _trace.start_span(name, **attributes)
+    token = _current_span.set(s) if nest else None
+    try:
+        yield s
+    except BaseException as e:
+        s.fail(e)
+        raise
+    finally:
+        if token is not None:
+            _current_span.reset(token)
+        s.end()
+
+
+def traced(name: str):
+    """Decorator for coroutine functions, see span()"""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record_metrics(m: Any):
+    """Turn stages from the pipeline's metrics events (timestamps are when each was emitted)"""
+    if _trace is None:
+        return
+    speech_id = getattr(m, "speech_id", None)
+    if not speech_id:
+        return
+    turn = _trace.turn(speech_id)
+    if isinstance(m, metrics.EOUMetrics):
+        end_of_speech = m.timestamp - m.end_of_utterance_delay
+        _trace.record("stt_final", end_of_speech, end_of_speech + m.transcription_delay, turn)
+        _trace.record("eou", end_of_speech, m.timestamp, turn)
+    elif isinstance(m, metrics.LLMMetrics):
+        _trace.record(
+            "llm", m.timestamp - m.duration, m.timestamp, turn,
+            ttft_s=m.ttft, prompt_tokens=m.prompt_tokens, completion_tokens=m.completion_tokens, cancelled=m.cancelled,
+        )
+    elif isinstance(m, metrics.TTSMetrics):
+        _trace.record(
+            "tts", m.timestamp - m.duration, m.timestamp, turn,
+            ttfb_s=m.ttfb, audio_duration_s=m.audio_duration, characters=m.characters_count, cancelled=m.cancelled,
+        )
+
+
+# Viewer
+
+
+def read_trace(path: str) -> List[Dict[str, Any]]:
+    spans = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for resource_spans in json.loads(line).get("resourceSpans", []):
+                for scope_spans in resource_spans.get("scopeSpans", []):
+                    spans.extend(scope_spans.get("spans", []))
+    return spans
+
+
+def _ms(ns: str) -> float:
+    return int(ns) / 1e6
+
+
+def _attributes(span: Dict[str, Any]) -> str:
+    values = []
+    for a in span.get("attributes", []):
+        value = next(iter(a["value"].values()))
+        if isinstance(value, float):
+            value = round(value, 3)
+        values.append(f"{a['key']}={value}")
+    return " ".join(values)
+
+
+def print_timeline(spans: List[Dict[str, Any]], width: int = 50, min_ms: float = 0.0):
+    if not spans:
+        print("No spans")
+        return
+    start = min(_ms(s["startTimeUnixNano"]) for s in spans)
+    end = max(_ms(s["endTimeUnixNano"]) for s in spans)
+    total = max(end - start, 1.0)
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    ids = {s["spanId"] for s in spans}
+    for s in spans:
+        parent = s.get("parentSpanId")
+        children.setdefault(parent if parent in ids else None, []).append(s)
+
+    print(f"{'offset':>9} {'duration':>9}  {'span':<36}timeline ({total / 1000:.1f}s)")
+
+    def walk(parent: Optional[str], depth: int):
+        for s in sorted(children.get(parent, []), key=lambda s: int(s["startTimeUnixNano"])):
+            offset = _ms(s["startTimeUnixNano"]) - start
+            duration = _ms(s["endTimeUnixNano"]) - _ms(s["startTimeUnixNano"])
+            if duration >= min_ms or s.get("parentSpanId") not in ids:
+                left = int(offset / total * width)
+                bar = " " * left + "#" * max(1, int(duration / total * width))
+                error = " ERROR " + s["status"].get("message", "") if s.get("status", {}).get("code") == STATUS_ERROR else ""
+                name = "  " * depth + s["name"]
+                print(f"{offset / 1000:8.3f}s {duration:7.0f}ms  {name:<36}|{bar:<{width}}| {_attributes(s)}{error}")
+            walk(s["spanId"], depth + 1)
+
+    walk(None, 0)
+
+
+def list_calls(trace_dir: str, limit: int):
+    calls = []
+    for path in glob.glob(os.path.join(trace_dir, "*.jsonl")):
+        roots = [s for s in read_trace(path) if s["name"] == "call"]
+        if roots:
+            duration = _ms(roots[0]["endTimeUnixNano"]) - _ms(roots[0]["startTimeUnixNano"])
+            calls.append((duration, path))
+    for duration, path in sorted(calls, reverse=True)[:limit]:
+        print(f"{duration / 1000:8.1f}s  {path}")
+
+
+class _CollectorHandler(BaseHTTPRequestHandler):
+    trace_dir = "call_traces"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        request = json.loads(body)
+        room = "unknown"
+        for resource_spans in request.get("resourceSpans", []):
+            for a in resource_spans.get("resource", {}).get("attributes", []):
+                if a["key"] == "room":
+                    room = a["value"].get("stringValue", room)
+        with open(os.path.join(self.trace_dir, f"{os.path.basename(room)}.jsonl"), "a") as f:
+            f.write(body.decode() + "\n")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show call traces")
+    parser.add_argument("path", nargs="?", default=CALL_TRACE_DIR or "call_traces", help="A trace file, or a directory to list")
+    parser.add_argument("--min-ms", type=float, default=0.0, help="Hide spans shorter than this")
+    parser.add_argument("--limit", type=int, default=20, help="Calls to list")
+    parser.add_argument("--collect", type=int, metavar="PORT", help="Run a local OTLP/HTTP collector writing to the directory")
+    args = parser.parse_args()
+
+    if args.collect:
+        os.makedirs(args.path, exist_ok=True)
+        _CollectorHandler.trace_dir = args.path
+        print(f"Collecting OTLP/HTTP JSON on http://127.0.0.1:{args.collect}/v1/traces into {args.path}")
+        try:
+            ThreadingHTTPServer(("127.0.0.1", args.collect), _CollectorHandler).serve_forever()
+        except KeyboardInterrupt:
+            pass
+    elif os.path.isdir(args.path):
+        list_calls(args.path, args.limit)
+    else:
+        print_timeline(read_trace(args.path), min_ms=args.min_ms)
+
+
+if __name__ == "__main__":
+    main()
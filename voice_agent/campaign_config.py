@@ -0,0 +1,277 @@
+# campaign_config.py
+#
+# Campaign settings that change without restarting workers: TTS voice and sample
+# rate, LLM model, transfer number, dead-air timeout and the call script. The
+# JSON file at CAMPAIGN_CONFIG (with the script in its own text file) is checked
+# for changes when a call starts; a new version is validated and its script
+# compiled once, then swapped in whole. Each call takes a snapshot at its start
+# and keeps that version until it ends. An invalid file is logged and ignored,
+# so calls keep getting the last good version. Without CAMPAIGN_CONFIG the
+# built-in defaults below are used.
+#
+# Write new versions with an atomic rename (e.g. `cp new.json tmp && mv tmp
+# campaign.json`) so a job never reads a half-written file. Validate a file with
+#
+#   python campaign_config.py campaign.json
+#
+# Example campaign.json:
+#   {
+#     "version": "2025-06-02.1",
+#     "voice_uuid": "3c089e29",
+#     "tts_sample_rate": 24000,
+#     "llm_model": "llama-3.3-70b",
+#     "llm_temperature": 0.1,
+#     "transfer_phone_number": "+15555550100",
+#     "dead_air_timeout_s": 10,
+#     "system_prompt_file": "campaign_prompt.txt",
+#     "introduction": "I'm Lily calling from Consumer Service.",
+#     "opening_pitch": "I'm reaching out because ... Is that correct?"
+#   }
+#
+# introduction and opening_pitch are the opening line, spoken by the greeting
+# fast path (greeting.py) without the LLM; a script can use {opening_pitch} so
+# the two never disagree. A config with its own script must set both.
+import json
+import logging
+import os
+import re
+import string
+import sys
+from dataclasses import dataclass, field, fields
+from typing import Any, Dict, List, Optional, Tuple
+
+import status_codes
+from GalacticVoiceAgent.system_prompt import SYSTEM_PROMPT_TEMPLATE
+from greeting import INTRODUCTION, OPENING_PITCH, greeting_line, static_segments
+
+campaign_logger = logging.getLogger("campaign_config")
+
+CAMPAIGN_CONFIG = os.getenv("CAMPAIGN_CONFIG") or None
+
+SUPPORTED_SAMPLE_RATES = (8000, 16000, 22050, 24000, 44100, 48000)
+PHONE_NUMBER_RE = re.compile(r"^\+?\d{7,15}$")
+
+# Filled in once when the script is compiled
+PROMPT_CONSTANTS = {k: v for k, v in vars(status_codes).items() if k.startswith("DISPOSITION_")}
+# Filled in per call
+PROMPT_CALL_FIELDS = ("greeting",)
+
+
+class CampaignConfigError(ValueError):
+    pass
+
+
+class PromptTemplate:
+    """A call script compiled into literal chunks and per-call fields.
+
+    The {DISPOSITION_*} constants and the campaign's {opening_pitch} are
+    substituted at compile time, so rendering a call's prompt only joins the
+    chunks around its greeting.
+    """
+
+    def __init__(self, template: str, constants: Optional[Dict[str, str]] = None):
+        constants = PROMPT_CONSTANTS if constants is None else constants
+        self.literals: List[str] = []
+        self.fields: List[str] = []
+        pending: List[str] = []
+        try:
+            parsed = list(string.Formatter().parse(template))
+        except ValueError as e:
+            raise CampaignConfigError(f"Malformed prompt template: {e}") from e
+        for literal, name, spec, conversion in parsed:
+            pending.append(literal)
+            if name is None:
+                continue
+            if spec or conversion:
+                raise CampaignConfigError(f"Format specs are not supported in prompt fields ({{{name}}})")
+            if name in constants:
+                pending.append(constants[name])
+            elif name in PROMPT_CALL_FIELDS:
+                self.literals.append("".join(pending))
+                self.fields.append(name)
+                pending = []
+            else:
+                raise CampaignConfigError(f"Unknown field {{{name}}} in the prompt template")
+        self.literals.append("".join(pending))
+
+    def render(self, **values: str) -> str:
+        parts = [self.literals[0]]
+        for name, literal in zip(self.fields, self.literals[1:]):
+            parts.append(values[name])
+            parts.append(literal)
+        return "".join(parts)
+
+
+@dataclass(frozen=True)
+class CampaignConfig:
+    version: str = "builtin"
+    voice_uuid: str = "3c089e29"
+    tts_sample_rate: int = 24000
+    llm_model: str = "llama-3.3-70b"
+    llm_temperature: float = 0.1
+    transfer_phone_number: Optional[str] = field(default_factory=lambda: os.getenv("TRANSFER_PHONE_NUMBER"))
+    dead_air_timeout_s: float = 10.0
+    system_prompt_file: Optional[str] = None
+    introduction: str = INTRODUCTION
+    opening_pitch: str = OPENING_PITCH
+    prompt: PromptTemplate = field(default=None, compare=False, repr=False)
+
+    def render_prompt(self, name: Optional[str]) -> str:
+        return self.prompt.render(greeting=greeting_line(name, self.introduction))
+
+    def greeting_segments(self) -> List[str]:
+        """Static segments of this campaign's opening line, see greeting.py"""
+        return static_segments(self.introduction, self.opening_pitch)
+
+    def provider_settings(self) -> Tuple:
+        """Settings the prewarmed LLM and TTS clients are built with"""
+        return (self.voice_uuid, self.tts_sample_rate, self.llm_model, self.llm_temperature)
+
+
+FIELD_TYPES = {
+    "version": (str,),
+    "voice_uuid": (str,),
+    "tts_sample_rate": (int,),
+    "llm_model": (str,),
+    "llm_temperature": (int, float),
+    "transfer_phone_number": (str,),
+    "dead_air_timeout_s": (int, float),
+    "system_prompt_file": (str,),
+    "introduction": (str,),
+    "opening_pitch": (str,),
+}
+
+
+def parse_config(data: Dict[str, Any], base_dir: str = ".") -> CampaignConfig:
+    """Validate a campaign config and compile its script"""
+    if not isinstance(data, dict):
+        raise CampaignConfigError("Campaign config must be a JSON object")
+    unknown = sorted(set(data) - set(FIELD_TYPES))
+    if unknown:
+        raise CampaignConfigError(f"Unknown fields {unknown}")
+    if not data.get("version"):
+        raise CampaignConfigError("Missing version")
+    for name, value in data.items():
+        if isinstance(value, bool) or not isinstance(value, FIELD_TYPES[name]):
+            raise CampaignConfigError(f"{name} must be {' or '.join(t.__name__ for t in FIELD_TYPES[name])}")
+
+    values = {k: float(v) if FIELD_TYPES[k] == (int, float) else v for k, v in data.items()}
+    config = CampaignConfig(**values)
+    if config.tts_sample_rate not in SUPPORTED_SAMPLE_RATES:
+        raise CampaignConfigError(f"tts_sample_rate must be one of {SUPPORTED_SAMPLE_RATES}")
+    if not 0.0 <= config.llm_temperature <= 2.0:
+        raise CampaignConfigError("llm_temperature must be between 0 and 2")
+    if not 1.0 <= config.dead_air_timeout_s <= 120.0:
+        raise CampaignConfigError("dead_air_timeout_s must be between 1 and 120")
+    if config.transfer_phone_number and not PHONE_NUMBER_RE.match(config.transfer_phone_number):
+        raise CampaignConfigError(f"transfer_phone_number {config.transfer_phone_number!r} is not a phone number")
+
+    for name in ("introduction", "opening_pitch"):
+        if not getattr(config, name).strip():
+            raise CampaignConfigError(f"{name} must not be empty")
+        # The built-in opening would be spoken before a different script
+        if config.system_prompt_file and name not in data:
+            raise CampaignConfigError(f"A config with system_prompt_file must set {name}")
+
+    template = SYSTEM_PROMPT_TEMPLATE
+    if config.system_prompt_file:
+        path = os.path.join(base_dir, config.system_prompt_file)
+        try:
+            with open(path, encoding="utf-8") as f:
+                template = f.read()
+        except OSError as e:
+            raise CampaignConfigError(f"Cannot read system_prompt_file: {e}") from e
+    # Frozen: the compiled script is attached once here and never changes
+    object.__setattr__(config, "prompt", PromptTemplate(template, {**PROMPT_CONSTANTS, "opening_pitch": config.opening_pitch}))
+    return config
+
+
+def load_config(path: str) -> CampaignConfig:
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise CampaignConfigError(f"Cannot read {path}: {e}") from e
+    return parse_config(data, os.path.dirname(os.path.abspath(path)))
+
+
+DEFAULT_CAMPAIGN = parse_config({"version": "builtin"})
+
+
+class CampaignConfigStore:
+    """The latest valid campaign config of this process, reloaded when its files change"""
+
+    def __init__(self, path: Optional[str] = CAMPAIGN_CONFIG):
+        self.path = path
+        self.config = DEFAULT_CAMPAIGN
+        self._stamp = None
+
+        # Statistics
+        self.reloads = 0
+        self.rejected = 0
+
+    def _file_stamp(self) -> Tuple:
+        """Change stamp of the config file and the script it points to"""
+        paths = [self.path]
+        if self.config.system_prompt_file:
+            paths.append(os.path.join(os.path.dirname(os.path.abspath(self.path)), self.config.system_prompt_file))
+        stamp = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+                stamp.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def current(self) -> CampaignConfig:
+        """Snapshot for a new call; reloads first if the files changed since the last check"""
+        if self.path is None:
+            return self.config
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return self.config
+        self._stamp = stamp
+
+        try:
+            config = load_config(self.path)
+        except CampaignConfigError as e:
+            self.rejected += 1
+            campaign_logger.error(f"Ignoring campaign config {self.path}: {e}; keeping version {self.config.version}")
+            return self.config
+
+        previous = self.config
+        self.config = config
+        self.reloads += 1
+        # The new script may be a different file, stamp what is current now
+        self._stamp = self._file_stamp()
+        if config.version == previous.version and previous is not DEFAULT_CAMPAIGN:
+            campaign_logger.warning(f"Campaign config {self.path} changed without a version bump ({config.version})")
+        campaign_logger.info(f"Campaign config {previous.version} -> {config.version}")
+        return config
+
+    def stats(self) -> Dict[str, Any]:
+        return {"version": self.config.version, "reloads": self.reloads, "rejected": self.rejected}
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("usage: python campaign_config.py <campaign.json>", file=sys.stderr)
+        return 2
+    try:
+        config = load_config(argv[0])
+    except CampaignConfigError as e:
+        print(f"INVALID {e}", file=sys.stderr)
+        return 1
+    print(f"OK version {config.version}")
+    for f in fields(config):
+        if f.name != "prompt":
+            print(f"  {f.name:<22} {getattr(config, f.name)}")
+    print(f"  {'script':<22} {len(config.prompt.literals[0]) + sum(map(len, config.prompt.literals[1:]))} chars, "
+          f"per-call fields {config.prompt.fields}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,13 +10,27 @@ count_processes() {
 
 # Show current state
 echo "📊 Before cleanup:"
-echo "  - Worker processes: $(count_processes 'agent.py')"
+echo "  - Worker processes: $(count_processes 'main.py (start|dev)|agent.py')"
 echo "  - Spawn processes: $(count_processes 'multiprocessing.spawn')"
 echo "  - Resource trackers: $(count_processes 'resource_tracker')"
 echo ""
 
-# Kill main worker processes
+# Drain workers first: SIGTERM stops new jobs and lets in-flight calls finish
+# (see worker_drain.py). For restarts without downtime use worker_supervisor.py.
+drain_timeout=$(( ${DRAIN_TIMEOUT_S:-600} + 90 ))
+if [ "$1" != "--force" ] && [ "$(count_processes 'main.py (start|dev)')" -gt 0 ]; then
+    echo "⏳ Draining worker processes (up to ${drain_timeout}s, --force to skip)..."
+    pkill -TERM -f "main.py (start|dev)" 2>/dev/null
+    waited=0
+    while [ "$(count_processes 'main.py (start|dev)')" -gt 0 ] && [ $waited -lt $drain_timeout ]; do
+        sleep 5
+        waited=$((waited + 5))
+    done
+fi
+
+# Kill main worker processes still running
 echo "🔪 Killing worker processes..."
+pkill -9 -f "main.py (start|dev)" 2>/dev/null
 pkill -9 -f "agent.py" 2>/dev/null
 
 # Kill multiprocessing spawn processes
@@ -37,16 +51,16 @@ sleep 1
 # Verify cleanup
 echo ""
 echo "✅ After cleanup:"
-echo "  - Worker processes: $(count_processes 'agent.py')"
+echo "  - Worker processes: $(count_processes 'main.py (start|dev)|agent.py')"
 echo "  - Spawn processes: $(count_processes 'multiprocessing.spawn')"
 echo "  - Resource trackers: $(count_processes 'resource_tracker')"
 
 # Check for any remaining Python processes
-remaining=$(ps aux | grep -E "python.*agent|multiprocessing" | grep -v grep | wc -l)
+remaining=$(ps aux | grep -E "python.*(main|agent)|multiprocessing" | grep -v grep | wc -l)
 if [ $remaining -gt 0 ]; then
     echo ""
     echo "⚠️  Warning: $remaining processes still running:"
-    ps aux | grep -E "python.*agent|multiprocessing" | grep -v grep
+    ps aux | grep -E "python.*(main|agent)|multiprocessing" | grep -v grep
 else
     echo ""
     echo "✨ All clean! Ready to start fresh."
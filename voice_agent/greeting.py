@@ -0,0 +1,254 @@
+# greeting.py
+#
+# Greeting fast path: the opening line is a fixed script line, so it is rendered
+# from a template and spoken with session.say() instead of waiting for an LLM
+# completion. Audio of the static part ("I'm Lily calling from Consumer Service.
+# I'm reaching out because ...") is synthesized once per host, cached as WAV and
+# loaded in prewarm_fnc; only the "Hi {name}." segment is synthesized per call,
+# starting as soon as the lead is known so it is ready when the call is answered.
+# say() adds the line to the chat context as the assistant's first turn, so the
+# LLM continues the script from step 2 as before. The introduction and pitch
+# come from the call's campaign config (campaign_config.py); the defaults below
+# are the built-in script's, and the cache is keyed by the text it holds.
+#
+# benchmarks/replay_pipeline.py --greeting-fast-path measures answer to first audio.
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import wave
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from livekit import rtc
+from livekit.agents import tts as agents_tts
+
+greeting_logger = logging.getLogger("greeting")
+
+GREETING_FAST_PATH_ENABLED = os.getenv("GREETING_FAST_PATH") == "1"
+GREETING_CACHE_DIR = os.getenv("GREETING_CACHE_DIR", "greeting_cache")
+
+INTRODUCTION = "I'm Lily calling from Consumer Service."
+OPENING_PITCH = (
+    "I'm reaching out because it looks like you've still got over seven thousand dollars in credit card debt, "
+    "and from what we can see, you've been making your monthly payments on time. Is that correct?"
+)
+# Same frame size the TTS plugins emit
+FRAME_MS = 200
+
+
+def greeting_line(name: Optional[str], introduction: str = INTRODUCTION) -> str:
+    """First sentence of the script, also used in the system prompt"""
+    if name is not None:
+        return f"Hi {name}. {introduction}"
+    return f"Hey there, {introduction}"
+
+
+def opening_line(name: Optional[str], introduction: str = INTRODUCTION, pitch: str = OPENING_PITCH) -> str:
+    return f"{greeting_line(name, introduction)} {pitch}"
+
+
+def opening_segments(
+    name: Optional[str], introduction: str = INTRODUCTION, pitch: str = OPENING_PITCH
+) -> Tuple[Optional[str], str]:
+    """(per-call segment, static segment) of the opening line"""
+    if name is not None:
+        return f"Hi {name}.", f"{introduction} {pitch}"
+    return None, opening_line(None, introduction, pitch)
+
+
+def static_segments(introduction: str = INTRODUCTION, pitch: str = OPENING_PITCH) -> List[str]:
+    """Every static segment, i.e. what GreetingAudioCache pre-synthesizes"""
+    return [f"{introduction} {pitch}", opening_line(None, introduction, pitch)]
+
+
+async def synthesize(tts: agents_tts.TTS, text: str) -> AsyncIterator[rtc.AudioFrame]:
+    """Stream the frames of `text` as the TTS produces them"""
+    async with tts.stream() as stream:
+        stream.push_text(text)
+        stream.end_input()
+        async for event in stream:
+            yield event.frame
+
+
+class GreetingAudioCache:
+    """Pre-synthesized audio of the static greeting segments.
+
+    Kept in memory per job process and as WAV files in `cache_dir`, keyed by the
+    voice and the text, so a host synthesizes each segment once.
+    """
+
+    def __init__(self, voice: str, sample_rate: int, cache_dir: str = GREETING_CACHE_DIR):
+        self.voice = voice
+        self.sample_rate = sample_rate
+        self.cache_dir = cache_dir
+        self.frames: Dict[str, List[rtc.AudioFrame]] = {}
+
+    def _path(self, text: str) -> str:
+        key = hashlib.sha1(f"{self.voice}|{self.sample_rate}|{text}".encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{key}.wav")
+
+    def _to_frames(self, pcm: bytes) -> List[rtc.AudioFrame]:
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        step = self.sample_rate * FRAME_MS // 1000
+        return [
+            rtc.AudioFrame(
+                samples[start:start + step].tobytes(),
+                sample_rate=self.sample_rate,
+                num_channels=1,
+                samples_per_channel=len(samples[start:start + step]),
+            )
+            for start in range(0, len(samples), step)
+        ]
+
+    def load(self, texts: Iterable[str]) -> int:
+        """Load cached segments from disk (blocking, for prewarm_fnc); returns how many were found"""
+        for text in texts:
+            path = self._path(text)
+            if text in self.frames or not os.path.exists(path):
+                continue
+            try:
+                with wave.open(path, "rb") as f:
+                    if f.getframerate() != self.sample_rate or f.getnchannels() != 1:
+                        continue
+                    self.frames[text] = self._to_frames(f.readframes(f.getnframes()))
+            except (OSError, EOFError, wave.Error) as e:
+                greeting_logger.warning(f"Unreadable greeting cache file {path}: {e}")
+        return len(self.frames)
+
+    def get(self, text: str) -> Optional[List[rtc.AudioFrame]]:
+        return self.frames.get(text)
+
+    def _save(self, text: str, pcm: bytes):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(text)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with wave.open(tmp_path, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(self.sample_rate)
+            f.writeframes(pcm)
+        os.replace(tmp_path, path)
+
+    async def warm(self, tts: agents_tts.TTS, texts: Iterable[str]):
+        """Synthesize and store the segments that are not cached yet"""
+        for text in texts:
+            if text in self.frames:
+                continue
+            started_at = time.perf_counter()
+            chunks = []
+            async for frame in synthesize(tts, text):
+                if frame.sample_rate != self.sample_rate or frame.num_channels != 1:
+                    greeting_logger.warning(
+                        f"TTS returned {frame.sample_rate}Hz/{frame.num_channels}ch audio, "
+                        f"expected {self.sample_rate}Hz mono; not caching the greeting"
+                    )
+                    return
+                chunks.append(bytes(frame.data))
+            pcm = b"".join(chunks)
+            await asyncio.to_thread(self._save, text, pcm)
+            self.frames[text] = self._to_frames(pcm)
+            greeting_logger.info(
+                f"Cached greeting segment ({len(pcm) / 2 / self.sample_rate:.1f}s of audio) "
+                f"in {(time.perf_counter() - started_at) * 1000:.0f}ms"
+            )
+
+
+class GreetingFastPath:
+    """The opening line of one call: live name segment followed by the cached static segment.
+
+    Until the static segment is cached on this host, the whole line is
+    synthesized live, which still skips the LLM round trip.
+    """
+
+    def __init__(
+        self,
+        tts: agents_tts.TTS,
+        cache: GreetingAudioCache,
+        name: Optional[str],
+        introduction: str = INTRODUCTION,
+        pitch: str = OPENING_PITCH,
+    ):
+        self.tts = tts
+        self.text = opening_line(name, introduction, pitch)
+        live_text, static_text = opening_segments(name, introduction, pitch)
+        self.static_frames = cache.get(static_text)
+        if self.static_frames is None:
+            live_text, self.static_frames = self.text, []
+        self.live_text = live_text
+        self.cached = bool(self.static_frames)
+
+        self._frames: asyncio.Queue = asyncio.Queue()
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.error: Optional[BaseException] = None
+
+        # Statistics
+        self.started_at: Optional[float] = None
+        self.live_ready_ms: Optional[float] = None
+        self.said_at: Optional[float] = None
+        self.first_audio_ms: Optional[float] = None
+
+    def start(self):
+        """Start synthesizing the live segment, before the call is answered"""
+        self.started_at = time.perf_counter()
+        if self.live_text is None:
+            self._frames.put_nowait(None)
+            self._ready.set()
+            return
+        self._task = asyncio.create_task(self._synthesize(), name="greeting_synthesis")
+
+    async def _synthesize(self):
+        try:
+            async for frame in synthesize(self.tts, self.live_text):
+                if not self._ready.is_set():
+                    self.live_ready_ms = (time.perf_counter() - self.started_at) * 1000
+                    self._ready.set()
+                self._frames.put_nowait(frame)
+        except Exception as e:
+            self.error = e
+            greeting_logger.error(f"Greeting synthesis failed: {e}")
+        finally:
+            self._frames.put_nowait(None)
+            self._ready.set()
+
+    async def ready(self, timeout: float = 3.0) -> bool:
+        """Whether the line can be spoken; otherwise fall back to generate_reply"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            greeting_logger.warning(f"Greeting synthesis not ready after {timeout:.1f}s")
+            return False
+        return self.error is None
+
+    async def _audio(self) -> AsyncIterator[rtc.AudioFrame]:
+        first = True
+        while (frame := await self._frames.get()) is not None:
+            if first:
+                self.first_audio_ms = (time.perf_counter() - self.said_at) * 1000
+                first = False
+            yield frame
+        for frame in self.static_frames:
+            if first:
+                self.first_audio_ms = (time.perf_counter() - self.said_at) * 1000
+                first = False
+            yield frame
+
+    def say(self, session):
+        """Speak the line; say() adds it to the chat context as the first assistant turn"""
+        self.said_at = time.perf_counter()
+        return session.say(self.text, audio=self._audio(), allow_interruptions=False)
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        return {
+            "cached": self.cached,
+            "live_ready_ms": round(self.live_ready_ms, 1) if self.live_ready_ms is not None else None,
+            "first_audio_ms": round(self.first_audio_ms, 1) if self.first_audio_ms is not None else None,
+        }
+
+    async def aclose(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        greeting_logger.info(f"Greeting fast path: {self.stats()}")
@@ -0,0 +1,167 @@
+# idle_pool_autoscaler.py
+import logging
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import psutil
+
+autoscaler_logger = logging.getLogger("idle_pool_autoscaler")
+
+# A job that starts within this many seconds of its process finishing prewarm was
+# (almost certainly) waiting on a process spawned for it, i.e. a cold start
+WARM_IDLE_THRESHOLD_S = 1.0
+
+
+class IdlePoolAutoscaler:
+    """Sizes the pool of warm (prewarmed, idle) job processes from the call arrival rate.
+
+    Arrivals are reported by job processes through worker telemetry. The arrival rate
+    is an exponentially weighted moving average, and the target number of idle
+    processes is the number of calls expected to arrive while a cold process spawns,
+    plus a burst margin, bounded by the memory available on the host.
+    """
+
+    def __init__(
+        self,
+        min_idle: int = 1,
+        max_idle: int = 20,
+        spawn_time_s: float = 8.0,
+        burst_z: float = 2.0,
+        half_life_s: float = 60.0,
+        proc_memory_mb: float = 600.0,
+        memory_reserve_mb: float = 1024.0,
+    ):
+        self.min_idle = min_idle
+        self.max_idle = max_idle
+        self.spawn_time_s = spawn_time_s
+        self.burst_z = burst_z
+        self.tau = half_life_s / math.log(2)
+        self.proc_memory_mb = proc_memory_mb
+        self.memory_reserve_mb = memory_reserve_mb
+        self.lock = threading.Lock()
+
+        self._rate = 0.0  # arrivals per second, as of self._last_arrival
+        self._last_arrival: Optional[float] = None
+        self._target = min_idle
+        self._installed = False
+        self.draining = False
+
+        # Statistics
+        self.arrival_count = 0
+        self.warm_hits = 0
+        self.cold_starts = 0
+
+    @classmethod
+    def from_env(cls) -> "IdlePoolAutoscaler":
+        return cls(
+            min_idle=int(os.getenv("IDLE_PROCS_MIN", "1")),
+            max_idle=int(os.getenv("IDLE_PROCS_MAX", "20")),
+            spawn_time_s=float(os.getenv("IDLE_PROCS_SPAWN_TIME_S", "8")),
+            burst_z=float(os.getenv("IDLE_PROCS_BURST_Z", "2")),
+            half_life_s=float(os.getenv("IDLE_PROCS_HALF_LIFE_S", "60")),
+            proc_memory_mb=float(os.getenv("IDLE_PROCS_MEMORY_MB", "600")),
+            memory_reserve_mb=float(os.getenv("IDLE_PROCS_MEMORY_RESERVE_MB", "1024")),
+        )
+
+    def record_job_start(self, warm: bool, now: Optional[float] = None):
+        """Record a job assignment. `warm` is True if the job landed on an idle process"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            self._rate = self._decayed_rate(now) + 1.0 / self.tau
+            self._last_arrival = now
+            self.arrival_count += 1
+            if warm:
+                self.warm_hits += 1
+            else:
+                self.cold_starts += 1
+
+    def on_job_started_event(self, event: Dict[str, Any]):
+        """Telemetry handler for the `job_started` event sent by job processes"""
+        self.record_job_start(bool(event.get("warm")))
+
+    def _decayed_rate(self, now: float) -> float:
+        if self._last_arrival is None:
+            return 0.0
+        return self._rate * math.exp(-(now - self._last_arrival) / self.tau)
+
+    def arrival_rate(self, now: Optional[float] = None) -> float:
+        """Forecast call arrival rate in calls per second"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            return self._decayed_rate(now)
+
+    def memory_cap(self, current_idle: int) -> int:
+        """Maximum number of idle processes the host memory can hold"""
+        available_mb = psutil.virtual_memory().available / (1024 * 1024)
+        spare = max(0.0, available_mb - self.memory_reserve_mb)
+        return current_idle + int(spare // self.proc_memory_mb)
+
+    def drain(self):
+        """The worker takes no more jobs, so it needs no warm processes"""
+        self.draining = True
+
+    def target_idle(self, current_idle: Optional[int] = None, now: Optional[float] = None) -> int:
+        """Number of warm processes needed to absorb arrivals during one cold spawn"""
+        if self.draining:
+            return 0
+        expected = self.arrival_rate(now) * self.spawn_time_s
+        needed = math.ceil(expected + self.burst_z * math.sqrt(expected)) if expected > 0 else 0
+        target = min(self.max_idle, max(self.min_idle, needed))
+
+        current_idle = self._target if current_idle is None else current_idle
+        return max(0, min(target, self.memory_cap(current_idle)))
+
+    def apply(self, worker: Any) -> int:
+        """Update the idle target for the worker's process pool (called from load_fnc).
+
+        The worker resets the pool target right after every load_fnc call, from its
+        own free capacity and `num_idle_processes`, and the pool never keeps more than
+        `num_idle_processes` warm. So on the first call the ceiling is raised to
+        `max_idle` and the pool's setter is wrapped to also cap the target at the
+        forecast, which keeps the worker's capacity limit and adds ours on top.
+        """
+        if not self._installed:
+            self._install(worker)
+
+        target = self.target_idle()
+        if target != self._target:
+            autoscaler_logger.info(
+                f"Idle process target {self._target} -> {target} "
+                f"(arrival rate {self.arrival_rate() * 60:.2f} calls/min)"
+            )
+            self._target = target
+        return target
+
+    def _install(self, worker: Any):
+        self._installed = True
+        pool = getattr(worker, "_proc_pool", None)
+        setter = getattr(pool, "set_target_idle_processes", None)
+        if setter is None or not hasattr(pool, "_default_num_idle_processes"):
+            autoscaler_logger.warning("Process pool does not support resizing, idle target is advisory only")
+            return
+
+        # Raised after the pool started, so startup only waits for min_idle processes
+        opts = getattr(worker, "_opts", None)
+        if opts is not None:
+            opts.num_idle_processes = self.max_idle
+        pool._default_num_idle_processes = self.max_idle
+
+        def set_target_idle_processes(num_idle_processes: int):
+            setter(min(num_idle_processes, self._target))
+
+        pool.set_target_idle_processes = set_target_idle_processes
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            arrivals = self.arrival_count
+            return {
+                "arrival_rate_per_min": self._decayed_rate(time.monotonic()) * 60,
+                "target_idle": self._target,
+                "arrivals": arrivals,
+                "warm_hits": self.warm_hits,
+                "cold_starts": self.cold_starts,
+                "warm_hit_ratio": self.warm_hits / arrivals if arrivals else None,
+            }
@@ -0,0 +1,255 @@
+# latency_histograms.py
+import bisect
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+histogram_logger = logging.getLogger("latency_histograms")
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+
+# eou_processing: eou_delay without the endpointing wait (slo_load.py)
+# tts_cancel_reuse: barge-in until a Resemble socket is idle again (tts_cancellation.py)
+STAGES = ["stt_duration", "eou_delay", "eou_processing", "llm_ttft", "tts_ttfb", "voice_to_voice", "tts_cancel_reuse"]
+QUANTILES = [0.5, 0.9, 0.95, 0.99]
+# The quantile gauges cover this many recent seconds, so they track current latency
+QUANTILE_WINDOW_S = float(os.getenv("LATENCY_QUANTILE_WINDOW_S", "300"))
+# Coarse cumulative buckets (seconds) for the Prometheus histogram series
+EXPORT_BUCKETS = [0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0]
+
+
+class LogHistogram:
+    """Log-bucketed latency histogram with bounded relative error (HDR-style).
+
+    Values between `min_value` and `max_value` seconds land in buckets whose upper
+    bounds grow by 2^(1/sub_buckets), so with 16 sub-buckets any reported
+    percentile is within ~4.4% of the true value. Recording is O(1) and memory is
+    a fixed list of counts regardless of call volume.
+    """
+
+    def __init__(self, min_value: float = 1e-4, max_value: float = 60.0, sub_buckets: int = 16):
+        self.min_value = min_value
+        self.sub_buckets = sub_buckets
+        self.bucket_count = int(math.ceil(math.log2(max_value / min_value) * sub_buckets)) + 1
+        self.counts = [0] * self.bucket_count
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def _index(self, value: float) -> int:
+        if value <= self.min_value:
+            return 0
+        index = int(math.ceil(math.log2(value / self.min_value) * self.sub_buckets))
+        return min(index, self.bucket_count - 1)
+
+    def upper_bound(self, index: int) -> float:
+        return self.min_value * 2 ** (index / self.sub_buckets)
+
+    def record(self, value: float):
+        if value is None or value < 0:
+            return
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = max(1, int(math.ceil(q * self.count)))
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= rank:
+                return min(self.upper_bound(index), self.max)
+        return self.max
+
+    def merge(self, other: "LogHistogram"):
+        for index, bucket in enumerate(other.counts):
+            self.counts[index] += bucket
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+
+class WindowedLogHistogram:
+    """LogHistograms of the last `window_s` seconds, kept in `slots` rotating time slots"""
+
+    def __init__(self, window_s: float = QUANTILE_WINDOW_S, slots: int = 10):
+        self.slot_s = window_s / slots
+        self.slots: Deque[Tuple[int, LogHistogram]] = deque(maxlen=slots)
+
+    def _expire(self, slot: int):
+        while self.slots and slot - self.slots[0][0] >= self.slots.maxlen:
+            self.slots.popleft()
+
+    def record(self, value: float, now: float):
+        slot = int(now // self.slot_s)
+        self._expire(slot)
+        if not self.slots or self.slots[-1][0] != slot:
+            self.slots.append((slot, LogHistogram()))
+        self.slots[-1][1].record(value)
+
+    def snapshot(self, now: float) -> LogHistogram:
+        """The samples of the window as one histogram"""
+        self._expire(int(now // self.slot_s))
+        merged = LogHistogram()
+        for _, histogram in self.slots:
+            merged.merge(histogram)
+        return merged
+
+
+class StageHistogram:
+    """One stage's exported histogram: exact cumulative EXPORT_BUCKETS counts and recent quantiles"""
+
+    def __init__(self, window_s: float = QUANTILE_WINDOW_S):
+        # Samples per EXPORT_BUCKETS bucket, the last one above the largest bound
+        self.bucket_counts = [0] * (len(EXPORT_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = WindowedLogHistogram(window_s)
+
+    def record(self, value: float, now: float):
+        if value is None or value < 0:
+            return
+        self.bucket_counts[bisect.bisect_left(EXPORT_BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.record(value, now)
+
+
+class LatencyRegistry:
+    """Per-stage latency histograms aggregated across all job processes of a worker.
+
+    The Prometheus histogram series are cumulative over the worker's lifetime,
+    so rate()/histogram_quantile() give quantiles over any window; the quantile
+    gauges only cover the last QUANTILE_WINDOW_S seconds.
+    """
+
+    def __init__(self, stages: List[str] = STAGES):
+        self.histograms = {stage: StageHistogram() for stage in stages}
+        self.lock = threading.Lock()
+
+    def record(self, stage: str, value: float, now: Optional[float] = None):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            return
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            histogram.record(float(value), now)
+
+    def on_latency_event(self, event: Dict[str, Any]):
+        """Telemetry handler for the `latency` event sent by job processes"""
+        if event.get("value") is not None:
+            self.record(event.get("stage"), event["value"])
+
+    def render(self, gauges: Optional[Dict[str, float]] = None, now: Optional[float] = None) -> str:
+        """Prometheus text exposition format"""
+        now = time.monotonic() if now is None else now
+        lines = [
+            "# HELP voice_agent_stage_latency_seconds Per-stage voice pipeline latency",
+            "# TYPE voice_agent_stage_latency_seconds histogram",
+        ]
+        summary_lines = [
+            f"# HELP voice_agent_stage_latency_quantile_seconds Per-stage latency quantiles over the last {QUANTILE_WINDOW_S:g}s",
+            "# TYPE voice_agent_stage_latency_quantile_seconds gauge",
+        ]
+        with self.lock:
+            for stage, h in self.histograms.items():
+                seen = 0
+                for bound, count in zip(EXPORT_BUCKETS, h.bucket_counts):
+                    seen += count
+                    lines.append(f'voice_agent_stage_latency_seconds_bucket{{stage="{stage}",le="{bound}"}} {seen}')
+                lines.append(f'voice_agent_stage_latency_seconds_bucket{{stage="{stage}",le="+Inf"}} {h.count}')
+                lines.append(f'voice_agent_stage_latency_seconds_sum{{stage="{stage}"}} {h.sum:.6f}')
+                lines.append(f'voice_agent_stage_latency_seconds_count{{stage="{stage}"}} {h.count}')
+                recent = h.recent.snapshot(now)
+                for q in QUANTILES:
+                    value = recent.percentile(q)
+                    if value is not None:
+                        summary_lines.append(
+                            f'voice_agent_stage_latency_quantile_seconds{{stage="{stage}",quantile="{q}"}} {value:.6f}'
+                        )
+
+        lines.extend(summary_lines)
+        for name, value in (gauges or {}).items():
+            if value is None:
+                continue
+            lines.append(f"# TYPE voice_agent_{name} gauge")
+            lines.append(f"voice_agent_{name} {float(value):.6f}")
+        return "\n".join(lines) + "\n"
+
+
+class VoiceToVoiceTracker:
+    """Job-side join of EOU, LLM and TTS metrics by speech_id into voice-to-voice latency"""
+
+    def __init__(self, max_pending: int = 64):
+        self.pending: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+        self.max_pending = max_pending
+
+    def add(self, speech_id: Optional[str], stage: str, value: float) -> Optional[float]:
+        """Returns the voice-to-voice latency once all three stages of a turn are known"""
+        if not speech_id:
+            return None
+        parts = self.pending.setdefault(speech_id, {})
+        parts[stage] = value
+        if len(self.pending) > self.max_pending:
+            self.pending.popitem(last=False)
+        if len(parts) == 3:
+            del self.pending[speech_id]
+            return parts["eou_delay"] + parts["llm_ttft"] + parts["tts_ttfb"]
+        return None
+
+
+class MetricsHTTPServer:
+    """Serves `/metrics` from a daemon thread in the worker process"""
+
+    def __init__(
+        self,
+        render: Callable[[], str],
+        host: str = METRICS_HOST,
+        port: int = METRICS_PORT,
+    ):
+        self.render = render
+        self.host = host
+        self.port = port
+        self.server: Optional[ThreadingHTTPServer] = None
+
+    def start(self) -> bool:
+        render = self.render
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            histogram_logger.error(f"Failed to start metrics endpoint on {self.host}:{self.port}: {e}")
+            return False
+
+        threading.Thread(target=self.server.serve_forever, daemon=True, name="MetricsHTTP").start()
+        histogram_logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+        return True
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server = None
@@ -0,0 +1,293 @@
+# loop_monitor.py
+import asyncio
+import asyncio.events
+import bisect
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+loop_logger = logging.getLogger("loop_monitor")
+
+# Upper bounds (ms) of the lag histogram buckets, the last bucket is open ended
+LAG_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 250, 500, 1000]
+
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR", "1") != "0"
+SLOW_CALLBACK_MS = float(os.getenv("LOOP_MONITOR_SLOW_CALLBACK_MS", "20"))
+# How often a job sends its new lag samples to the worker's metrics endpoint
+LOOP_MONITOR_REPORT_S = 10.0
+
+_ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+
+
+def _frame_location(frame) -> str:
+    return f"{frame.f_code.co_filename}:{frame.f_lineno} {frame.f_code.co_name}"
+
+
+def _blocking_location(frame) -> Optional[str]:
+    """Innermost frame of a running callback outside asyncio and this module"""
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.startswith(_ASYNCIO_DIR) and filename != __file__:
+            return _frame_location(frame)
+        frame = frame.f_back
+    return None
+
+
+def _callback_location(handle: asyncio.Handle) -> str:
+    """Best-effort `file:line function` of the code a loop callback just ran.
+
+    Only a fallback for callbacks the sampler thread missed: for a task step this
+    is where the coroutine is suspended now, i.e. the await after the blocking
+    stretch, not the blocking line itself.
+    """
+    callback = getattr(handle, "_callback", None)
+    task = getattr(callback, "__self__", None)
+    if isinstance(task, asyncio.Task):
+        # Task step: walk the await chain to where the coroutine is suspended now,
+        # i.e. the end of the synchronous stretch that blocked the loop, skipping
+        # asyncio's own frames (asyncio.sleep, queues, ...)
+        coro = task.get_coro()
+        location = None
+        while coro is not None:
+            frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+            if frame is None:
+                break
+            if not frame.f_code.co_filename.startswith(_ASYNCIO_DIR):
+                location = _frame_location(frame)
+            coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+        return location or f"task {task.get_name()}"
+
+    code = getattr(callback, "__code__", None)
+    if code is not None:
+        return f"{code.co_filename}:{code.co_firstlineno} {code.co_name}"
+    return repr(callback)
+
+
+class LoopLagMonitor:
+    """Measures event-loop lag and records callbacks that block the loop.
+
+    Lag is sampled by a task that sleeps `interval` and measures how late it wakes
+    up. Slow callbacks are found by timing every `Handle._run` while the monitor is
+    installed, which costs two `perf_counter()` calls per callback. A daemon thread
+    wakes every `slow_callback_ms / 2` and, when a callback has been running for
+    that long, takes the loop thread's stack, so a slow callback is reported at the
+    line it was blocked on. New lag samples go to `on_report` every
+    LOOP_MONITOR_REPORT_S and at close, see LoopLagRegistry.
+    """
+
+    _active: Optional["LoopLagMonitor"] = None
+    _original_run = None
+
+    def __init__(
+        self,
+        name: str = "job",
+        interval: float = 0.1,
+        slow_callback_ms: float = SLOW_CALLBACK_MS,
+        max_slow_records: int = 200,
+        on_report: Optional[Callable[..., None]] = None,
+    ):
+        self.name = name
+        self.interval = interval
+        self.slow_callback_s = slow_callback_ms / 1000
+        self.lag_counts = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.lag_sum_ms = 0.0
+        self.lag_max_ms = 0.0
+        self.samples = 0
+        self.slow_callbacks: Deque[Dict[str, Any]] = deque(maxlen=max_slow_records)
+        self.slow_by_location: Counter = Counter()
+        self.task: Optional[asyncio.Task] = None
+
+        self.on_report = on_report
+        self._reported_counts = [0] * len(self.lag_counts)
+        self._reported_sum_ms = 0.0
+        self._reported_slow = 0
+
+        # Start of the callback running now, and the stack the sampler took of it
+        self._running_since: Optional[float] = None
+        self._sampled_since: Optional[float] = None
+        self._sampled_location: Optional[str] = None
+        self._loop_thread_id: Optional[int] = None
+        self._sampler_stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start sampling lag and install the slow-callback hook on this process"""
+        if LoopLagMonitor._active is not None:
+            loop_logger.warning("Loop monitor already running in this process")
+            return
+        LoopLagMonitor._active = self
+        self._install_hook()
+        self.task = asyncio.create_task(self._sample_loop(), name="loop_lag_monitor")
+        self._loop_thread_id = threading.get_ident()
+        self._sampler = threading.Thread(target=self._sample_stacks, daemon=True, name="LoopStackSampler")
+        self._sampler.start()
+
+    def _sample_stacks(self):
+        """Takes the loop thread's stack once per callback that runs past half the slow threshold"""
+        half = self.slow_callback_s / 2
+        while not self._sampler_stop.wait(half):
+            since = self._running_since
+            if since is None or since == self._sampled_since or time.perf_counter() - since < half:
+                continue
+            location = _blocking_location(sys._current_frames().get(self._loop_thread_id))
+            self._sampled_location = location
+            self._sampled_since = since
+
+    def _install_hook(self):
+        if LoopLagMonitor._original_run is not None:
+            return
+        original_run = asyncio.events.Handle._run
+        LoopLagMonitor._original_run = original_run
+        perf_counter = time.perf_counter
+
+        def _timed_run(handle: asyncio.Handle):
+            monitor = LoopLagMonitor._active
+            start = perf_counter()
+            if monitor is not None:
+                monitor._running_since = start
+            original_run(handle)
+            elapsed = perf_counter() - start
+            if monitor is not None:
+                monitor._running_since = None
+                if elapsed >= monitor.slow_callback_s:
+                    monitor._record_slow(handle, start, elapsed)
+
+        asyncio.events.Handle._run = _timed_run
+
+    def _record_slow(self, handle: asyncio.Handle, start: float, elapsed: float):
+        location = self._sampled_location if self._sampled_since == start else None
+        if location is None:
+            try:
+                location = f"before await at {_callback_location(handle)}"
+            except Exception:
+                location = "unknown"
+        self.slow_by_location[location] += 1
+        self.slow_callbacks.append(
+            {"at": time.time(), "duration_ms": elapsed * 1000, "location": location}
+        )
+        loop_logger.warning(f"Slow callback {elapsed * 1000:.1f}ms at {location}")
+
+    async def _sample_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (loop.time() - expected) * 1000)
+            self.samples += 1
+            self.lag_sum_ms += lag_ms
+            self.lag_max_ms = max(self.lag_max_ms, lag_ms)
+            self.lag_counts[bisect.bisect_left(LAG_BUCKETS_MS, lag_ms)] += 1
+            if self.samples % max(1, int(LOOP_MONITOR_REPORT_S / self.interval)) == 0:
+                self._send_report()
+
+    def _send_report(self):
+        """Send the lag samples and slow callbacks since the last report"""
+        if self.on_report is None:
+            return
+        slow = sum(self.slow_by_location.values())
+        counts = [now - sent for now, sent in zip(self.lag_counts, self._reported_counts)]
+        if not any(counts) and slow == self._reported_slow:
+            return
+        self.on_report(
+            counts=counts,
+            sum_ms=self.lag_sum_ms - self._reported_sum_ms,
+            slow_callbacks=slow - self._reported_slow,
+        )
+        self._reported_counts = list(self.lag_counts)
+        self._reported_sum_ms = self.lag_sum_ms
+        self._reported_slow = slow
+
+    def histogram(self) -> Dict[str, int]:
+        labels = [f"<={b}ms" for b in LAG_BUCKETS_MS] + [f">{LAG_BUCKETS_MS[-1]}ms"]
+        return dict(zip(labels, self.lag_counts))
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound (ms) of the bucket holding the q-th lag sample, at most the largest lag seen"""
+        if not self.samples:
+            return None
+        rank = q * self.samples
+        seen = 0
+        for i, count in enumerate(self.lag_counts):
+            seen += count
+            if seen >= rank:
+                return min(float(LAG_BUCKETS_MS[i]), self.lag_max_ms) if i < len(LAG_BUCKETS_MS) else self.lag_max_ms
+        return self.lag_max_ms
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "job": self.name,
+            "samples": self.samples,
+            "lag_avg_ms": self.lag_sum_ms / self.samples if self.samples else None,
+            "lag_p99_ms": self.percentile(0.99),
+            "lag_max_ms": self.lag_max_ms,
+            "histogram": self.histogram(),
+            "slow_callbacks": sum(self.slow_by_location.values()),
+            "top_slow_locations": self.slow_by_location.most_common(5),
+        }
+
+    async def aclose(self):
+        """Stop sampling, uninstall the hook and log the per-job report"""
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+        self._sampler_stop.set()
+        self._send_report()
+        if LoopLagMonitor._active is self:
+            LoopLagMonitor._active = None
+        if LoopLagMonitor._original_run is not None:
+            asyncio.events.Handle._run = LoopLagMonitor._original_run
+            LoopLagMonitor._original_run = None
+        loop_logger.info(f"Event loop report: {self.report()}")
+
+    def recent_slow_callbacks(self) -> List[Dict[str, Any]]:
+        return list(self.slow_callbacks)
+
+
+
+class LoopLagRegistry:
+    """Event-loop lag of all job processes of a worker, for its metrics endpoint.
+
+    Jobs send the samples taken since their last report, so the exported buckets
+    are cumulative counters and Prometheus computes quantiles over any window.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self.sum_ms = 0.0
+        self.slow_callbacks = 0
+        self.lock = threading.Lock()
+
+    def on_loop_lag_event(self, event: Dict[str, Any]):
+        """Telemetry handler for the `loop_lag` event sent by job processes"""
+        counts = event.get("counts")
+        if not isinstance(counts, list) or len(counts) != len(self.counts):
+            return
+        with self.lock:
+            for i, count in enumerate(counts):
+                self.counts[i] += int(count)
+            self.sum_ms += float(event.get("sum_ms", 0.0))
+            self.slow_callbacks += int(event.get("slow_callbacks", 0))
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = [
+            "# HELP voice_agent_loop_lag_seconds Event-loop lag sampled in job processes",
+            "# TYPE voice_agent_loop_lag_seconds histogram",
+        ]
+        with self.lock:
+            seen = 0
+            for bound, count in zip(LAG_BUCKETS_MS, self.counts):
+                seen += count
+                lines.append(f'voice_agent_loop_lag_seconds_bucket{{le="{bound / 1000}"}} {seen}')
+            total = seen + self.counts[-1]
+            lines.append(f'voice_agent_loop_lag_seconds_bucket{{le="+Inf"}} {total}')
+            lines.append(f"voice_agent_loop_lag_seconds_sum {self.sum_ms / 1000:.6f}")
+            lines.append(f"voice_agent_loop_lag_seconds_count {total}")
+            lines.append("# HELP voice_agent_slow_callbacks_total Loop callbacks slower than LOOP_MONITOR_SLOW_CALLBACK_MS")
+            lines.append("# TYPE voice_agent_slow_callbacks_total counter")
+            lines.append(f"voice_agent_slow_callbacks_total {self.slow_callbacks}")
+        return "\n".join(lines) + "\n"
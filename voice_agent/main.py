@@ -1,15 +1,20 @@
 import asyncio
 import base64
+import dataclasses
 import json
 import logging
+import time
 import aiohttp
 from dotenv import load_dotenv
 import os
 from livekit import agents, api, rtc
 from livekit.agents import (
     AgentSession,
+    AgentStateChangedEvent,
+    ConversationItemAddedEvent,
     MetricsCollectedEvent,
     RoomInputOptions,
+    RoomOutputOptions,
     UserStateChangedEvent,
     function_tool,
     get_job_context,
@@ -25,26 +30,76 @@ from livekit.plugins import (
     elevenlabs,
     google,
 )
+from livekit.agents.voice import FunctionToolsExecutedEvent
 from livekit.plugins.turn_detector.english import EnglishModel
 from livekit.protocol import sip as proto_sip
 from livekit.plugins.resemble import SynthesizeStream
 from livekit.agents import utils, tts, tokenize
 
+import call_logging
+import call_tracing
+from call_prewarm import CallPrewarm, PrewarmedDeepgramSTT
+from campaign_config import CampaignConfig, CampaignConfigStore
+from answering_machine import AMD_ENABLED, LABEL_MACHINE, detect_answering_machine
 from apis.get_lead_info import get_lead_info
-from status_codes import DISPOSITION_DEAD_AIR, DISPOSITION_DEBT_7K_10K_HANGUP, DISPOSITION_DEBT_OVER_10K_HANGUP, DISPOSITION_IMMEDIATE_HANGUP, DISPOSITION_QUALIFIED_NOT_TRANSFERRED
+from status_codes import DISPOSITION_DEAD_AIR, DISPOSITION_IMMEDIATE_HANGUP, DISPOSITION_LINE_BUSY, DISPOSITION_TRANSFERRED, DISPOSITION_QUALIFIED_NOT_TRANSFERRED
 from GalacticVoiceAgent.agent import GalacticVoiceAgent
+from greeting import GREETING_FAST_PATH_ENABLED, GreetingAudioCache, GreetingFastPath
+from post_call_queue import (
+    DEBT_AMOUNT_PROMPT,
+    POST_CALL_QUEUE_DIR,
+    EndOfCallRecord,
+    disposition_for_debt,
+    enqueue_record,
+    parse_debt_amount,
+    transcript_from_chat_ctx,
+)
+from call_journal import CALL_JOURNAL_DIR, CallJournal
+from latency_histograms import LatencyRegistry, MetricsHTTPServer, VoiceToVoiceTracker
+from loop_monitor import LOOP_MONITOR_ENABLED, LoopLagMonitor, LoopLagRegistry
+from noise_gate import NOISE_GATING_ENABLED, NoiseCancellationGate
+from idle_pool_autoscaler import WARM_IDLE_THRESHOLD_S, IdlePoolAutoscaler
+from memory_watchdog import CallMemory, MemoryWatchdog
+from slo_load import SLOLoadCalculator
+from task_supervisor import CallTaskSupervisor
+from telephony_audio import TELEPHONY_SAMPLE_RATE, audio_rates
+from tts_cancellation import TTS_FAST_CANCEL, TTSCancellation
+from vad_service import VAD_SERVICE_ENABLED, SharedVAD, start_service_process
+from worker_drain import DRAIN_SHUTDOWN_REASON, WorkerDrain
+import worker_telemetry
 
 load_dotenv(dotenv_path=".env.local")
 
 logger = logging.getLogger("inbound-caller")
-logger.setLevel(logging.DEBUG)
 
 ENV = os.getenv("ENVIRONMENT")
 IS_DEV = ENV == "development"
 
-if IS_DEV:
+# Per-call metrics CSV, always on in development and opt-in in production
+METRICS_CSV_ENABLED = IS_DEV or os.getenv("METRICS_CSV") == "1"
+METRICS_CSV_MAX_BYTES = int(os.getenv("METRICS_CSV_MAX_BYTES", "0")) or None
+
+if METRICS_CSV_ENABLED:
     from metrics_csv_logger import MetricsCSVLogger
-    
+
+LOAD_THRESHOLD = 0.75
+
+# Only used in the worker (main) process, see compute_load
+idle_pool_autoscaler = IdlePoolAutoscaler.from_env()
+slo_load_calculator = SLOLoadCalculator(load_threshold=LOAD_THRESHOLD)
+latency_registry = LatencyRegistry()
+loop_lag_registry = LoopLagRegistry()
+worker_drain = WorkerDrain()
+memory_watchdog = MemoryWatchdog()
+# Campaign settings of this process, reloaded when the config file changes
+campaign_store = CampaignConfigStore()
+# Resemble sockets of syntheses cut short by a barge-in, see tts_cancellation.py
+tts_cancellation = TTSCancellation(
+    on_reuse=lambda seconds: worker_telemetry.send("latency", stage="tts_cancel_reuse", value=seconds)
+)
+AUTOSCALER_LOG_INTERVAL_S = 60.0
+_last_autoscaler_log = 0.0
+
 # Override the Resemble WebSocket URL to use the galactic endpoint
 import livekit.plugins.resemble.tts as resemble_tts
 resemble_tts.RESEMBLE_WEBSOCKET_URL = "wss://galactic-ws.cluster.resemble.ai/stream"
@@ -58,6 +113,8 @@ async def patched_run_ws(self, input_stream: tokenize.SentenceStream, output_emi
 
     last_index = 0
     input_ended = False
+    # request_ids sent that Resemble has not sent audio_end for
+    outstanding: set[int] = set()
 
     async def _send_task(ws: aiohttp.ClientWebSocketResponse) -> None:
         nonlocal input_ended, last_index
@@ -72,6 +129,8 @@ async def patched_run_ws(self, input_stream: tokenize.SentenceStream, output_emi
                 "output_format": "mp3",
             }
             self._mark_started()
+            # The frame is written before send_str first yields, so a cancelled send was still sent
+            outstanding.add(last_index)
             await ws.send_str(json.dumps(payload))
 
         input_ended = True
@@ -98,6 +157,7 @@ async def patched_run_ws(self, input_stream: tokenize.SentenceStream, output_emi
 
             elif data.get("type") == "audio_end":
                 index = data["request_id"]
+                outstanding.discard(index)
                 if index == last_index and input_ended:
                     output_emitter.end_segment()
                     break
@@ -105,28 +165,48 @@ async def patched_run_ws(self, input_stream: tokenize.SentenceStream, output_emi
                 # logger.error("Unexpected Resemble message %s", data)
                 pass
 
-    async with self._tts._pool.connection(timeout=self._conn_options.timeout) as ws:
-        tasks = [
-            asyncio.create_task(_send_task(ws)),
-            asyncio.create_task(_recv_task(ws)),
-        ]
-        try:
-            await asyncio.gather(*tasks)
-        finally:
-            await utils.aio.gracefully_cancel(*tasks)
+    pool = self._tts._pool
+    ws = await pool.get(timeout=self._conn_options.timeout)
+    tasks = [
+        asyncio.create_task(_send_task(ws)),
+        asyncio.create_task(_recv_task(ws)),
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except asyncio.CancelledError:
+        # Barge-in: stop sending and decoding now, the socket is drained or replaced in the background
+        interrupted_at = time.perf_counter()
+        await utils.aio.gracefully_cancel(*tasks)
+        if TTS_FAST_CANCEL:
+            tts_cancellation.abandon(pool, ws, outstanding, interrupted_at)
+        else:
+            pool.remove(ws)
+        raise
+    except BaseException:
+        await utils.aio.gracefully_cancel(*tasks)
+        pool.remove(ws)
+        raise
+    else:
+        pool.put(ws)
 
 # Apply the monkey patch
 SynthesizeStream._run_ws = patched_run_ws
 
-def prewarm_fnc(proc: agents.JobProcess):
-    # Pre-initialize heavy components
-    proc.userdata["vad"] = silero.VAD.load()
-
-    # Pre-initialize API clients (connection pooling)
-    proc.userdata["deepgram_client"] = deepgram.STT(model="nova-2-phonecall")
-    proc.userdata["llm_client"] = openai.LLM.with_cerebras(model="llama-3.3-70b", temperature=0.1)
+def load_campaign_clients(proc: agents.JobProcess, campaign: CampaignConfig, load_greeting_cache: bool = True):
+    """LLM and TTS clients for the campaign's voice and model; rebuilt when a new version changes them"""
+    proc.userdata["llm_client"] = openai.LLM.with_cerebras(model=campaign.llm_model, temperature=campaign.llm_temperature)
     
-    proc.userdata["tts_client"] = resemble.TTS(api_key=os.getenv("RESEMBLE_API_KEY"), voice_uuid="3c089e29", sample_rate=24000)
+    # At the telephony rate in telephony mode, see telephony_audio.py
+    tts_sample_rate = audio_rates(campaign.tts_sample_rate).tts
+    proc.userdata["tts_client"] = resemble.TTS(
+        api_key=os.getenv("RESEMBLE_API_KEY"), voice_uuid=campaign.voice_uuid, sample_rate=tts_sample_rate
+    )
+    if GREETING_FAST_PATH_ENABLED:
+        # Static greeting audio synthesized by an earlier call on this host
+        greeting_cache = GreetingAudioCache(voice=f"resemble:{campaign.voice_uuid}", sample_rate=tts_sample_rate)
+        if load_greeting_cache:
+            greeting_cache.load(campaign.greeting_segments())
+        proc.userdata["greeting_cache"] = greeting_cache
     # proc.userdata["tts_client"] = cartesia.TTS(
     #     api_key=os.getenv("CARTESIA_API_KEY"),
     #     voice="f786b574-daa5-4673-aa0c-cbe3e8534c02",
@@ -135,17 +215,160 @@ def prewarm_fnc(proc: agents.JobProcess):
     #     api_key="sk_e09e83bf20fd499d5b983625b670e9bb6484ea3b4da70f1e",
     #     voice_id="NwhlWbOasPHy5FAy7b7U",
     # )
+    proc.userdata["provider_settings"] = campaign.provider_settings()
+
+
+async def reload_campaign_clients(proc: agents.JobProcess, campaign: CampaignConfig):
+    """load_campaign_clients at call start; closes the clients it replaces (and their pooled sockets)"""
+    replaced = [proc.userdata["llm_client"], proc.userdata["tts_client"]]
+    # The entrypoint reads the greeting cache from disk off the event loop
+    load_campaign_clients(proc, campaign, load_greeting_cache=False)
+    results = await asyncio.gather(*(client.aclose() for client in replaced), return_exceptions=True)
+    for client, result in zip(replaced, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Failed to close replaced {type(client).__name__}: {result!r}")
+
+
+def prewarm_fnc(proc: agents.JobProcess):
+    # Formatting and the hand-off to the worker move off the event loop, see call_logging.py
+    call_logging.install()
+    campaign = campaign_store.current()
+    rates = audio_rates(campaign.tts_sample_rate, shared_vad=VAD_SERVICE_ENABLED)
+
+    # Pre-initialize heavy components; with the VAD service, inference runs batched
+    # in the host's service process instead of a per-process ONNX session
+    proc.userdata["vad"] = SharedVAD.load() if VAD_SERVICE_ENABLED else silero.VAD.load(sample_rate=rates.vad)
+
+    # Pre-initialize API clients (connection pooling)
+    # Its websocket is opened as soon as the call status shows up, see call_prewarm.py
+    proc.userdata["deepgram_client"] = PrewarmedDeepgramSTT(model="nova-2-phonecall", sample_rate=rates.stt)
+    load_campaign_clients(proc, campaign)
+
+    # Used to tell warm-pool hits from cold starts when a job lands on this process
+    proc.userdata["prewarmed_at"] = time.monotonic()
+
+
+def compute_load(worker: agents.Worker) -> float:
+    """SLO-aware worker load reported to LiveKit; also resizes the idle process pool"""
+    global _last_autoscaler_log
+    memory_watchdog.check()
+    if worker_drain.check(worker):
+        idle_pool_autoscaler.drain()
+    idle_pool_autoscaler.apply(worker)
+
+    now = time.monotonic()
+    if now - _last_autoscaler_log >= AUTOSCALER_LOG_INTERVAL_S:
+        _last_autoscaler_log = now
+        logger.info(f"Idle pool: {idle_pool_autoscaler.stats()}")
+
+    load = slo_load_calculator.get_load()
+    if load >= LOAD_THRESHOLD:
+        logger.warning(f"Worker at capacity, load components: {slo_load_calculator.last_components}")
+    return load
+
+
+def render_worker_metrics() -> str:
+    """Prometheus scrape output for this worker host"""
+    gauges = {
+        "load": slo_load_calculator.load,
+        **{f"load_{name}": value for name, value in slo_load_calculator.last_components.items()},
+        **{
+            f"idle_pool_{name}": value
+            for name, value in idle_pool_autoscaler.stats().items()
+            if isinstance(value, (int, float))
+        },
+        # Read by worker_supervisor.py to tell when a replacement worker is warm
+        **worker_drain.stats(),
+        **{f"memory_{name}": value for name, value in memory_watchdog.stats().items()},
+    }
+    return latency_registry.render(gauges) + loop_lag_registry.render()
+
+
+def create_session(stt, llm, tts, vad, turn_detection) -> AgentSession:
+    """Voice pipeline options for a call, shared with benchmarks/replay_pipeline.py"""
+    return AgentSession(
+        stt=stt,
+        llm=llm,
+        tts=tts,
+        vad=vad,
+        turn_detection=turn_detection,
+    )
 
 
 async def entrypoint(ctx: agents.JobContext):
+    idle_s = time.monotonic() - ctx.proc.userdata.get("prewarmed_at", time.monotonic())
+    warm = idle_s >= WARM_IDLE_THRESHOLD_S
+    worker_telemetry.send("job_started", warm=warm, idle_s=idle_s)
+    call_logging.set_call_context(room=ctx.room.name)
+    logger.info("Job started on %s process (idle %.1fs)", "warm" if warm else "cold", idle_s)
+    call_memory = CallMemory(ctx.room.name)
+
+    # This call keeps the campaign version current at its start
+    campaign = campaign_store.current()
+    if ctx.proc.userdata.get("provider_settings") != campaign.provider_settings():
+        logger.info(f"Campaign {campaign.version} changed the voice or model, rebuilding the prewarmed clients")
+        await reload_campaign_clients(ctx.proc, campaign)
+    # Head sampling: either the whole call is traced or none of it, see call_tracing.py
+    call_trace = call_tracing.start_call(ctx.room.name, campaign=campaign.version, warm_process=warm)
+
     phone_number = None
-    await ctx.connect()
+    sip_participant = None
+    result = None
+    agent_instance = None
+    task_supervisor = CallTaskSupervisor(name=ctx.room.name)
+
+    async def hang_up_if_drained(reason: str):
+        # Still on the line when the worker's drain deadline ended the job
+        if reason != DRAIN_SHUTDOWN_REASON or agent_instance is None:
+            return
+        if agent_instance.pending_transfer is not None:
+            await asyncio.wait([agent_instance.pending_transfer])
+        if agent_instance.current_status != DISPOSITION_TRANSFERRED:
+            await agent_instance.hangup()
+
+    async def close_call_tasks(reason: str):
+        await hang_up_if_drained(reason)
+        await task_supervisor.aclose()
+
+    async def report_call_memory(reason: str):
+        # After the room disconnected; the process exits once the callbacks finish
+        await close_call_tasks(reason)
+        report = call_memory.finish()
+        worker_telemetry.send("call_memory", **report)
+        if call_trace:
+            # Once the call's tasks (hangup, update_lead) ended their spans
+            await call_trace.aclose()
+
+    ctx.add_shutdown_callback(report_call_memory)
+
+    if LOOP_MONITOR_ENABLED:
+        loop_monitor = LoopLagMonitor(
+            name=ctx.room.name, on_report=lambda **fields: worker_telemetry.send("loop_lag", **fields)
+        )
+        loop_monitor.start()
+        ctx.add_shutdown_callback(loop_monitor.aclose)
+
+    journal = None
+    if CALL_JOURNAL_DIR:
+        journal = CallJournal.for_call(ctx.room.name)
+        journal.start()
+        journal.append("campaign", version=campaign.version)
+
+    call_prewarm = CallPrewarm(ctx.proc.userdata["deepgram_client"], ctx.proc.userdata["tts_client"])
+    ctx.add_shutdown_callback(call_prewarm.aclose)
+    ctx.add_shutdown_callback(tts_cancellation.aclose)
+
+    with call_tracing.span("connect"):
+        await ctx.connect()
 
     # Wait for a SIP participant to join
     try:
-        sip_participant = await ctx.wait_for_participant(
-            kind=rtc.ParticipantKind.PARTICIPANT_KIND_SIP
-        )
+        with call_tracing.span("wait_for_participant"):
+            sip_participant = await ctx.wait_for_participant(
+                kind=rtc.ParticipantKind.PARTICIPANT_KIND_SIP
+            )
+        # Open the STT and TTS connections while the lead is looked up (and the phone rings)
+        call_prewarm.on_call_status(sip_participant.attributes.get("sip.callStatus"))
 
         if sip_participant.attributes:
             # For Twilio SIP trunking, the phone number is in 'sip.phoneNumber'
@@ -154,8 +377,13 @@ async def entrypoint(ctx: agents.JobContext):
             if phone_number:
                 # Clean up the phone number (remove + if needed for API)
                 phone_number = "8052226101" if IS_DEV else phone_number.strip()
-                result = await get_lead_info(phone_number)
-                logger.info(f"Result: {result}")
+                with call_tracing.span("get_lead_info") as lookup:
+                    result = await get_lead_info(phone_number)
+                    lookup.set(found=result is not None)
+                if result:
+                    call_logging.set_call_context(lead_id=result.get("lead_id"))
+                # Lead fields are redacted on the logging thread
+                logger.debug("Result: %s", result)
             else:
                 logger.warning("sip.phoneNumber not found in attributes")
                 logger.info(
@@ -163,7 +391,7 @@ async def entrypoint(ctx: agents.JobContext):
                 )
 
         if phone_number:
-            logger.info(f"Ready to fetch lead info for: {phone_number}")
+            logger.info("Ready to fetch lead info for: %s", phone_number)
 
     except asyncio.TimeoutError:
         logger.error("Timeout waiting for SIP participant")
@@ -177,13 +405,7 @@ async def entrypoint(ctx: agents.JobContext):
     tts = ctx.proc.userdata["tts_client"]
     vad = ctx.proc.userdata["vad"]
 
-    session = AgentSession(
-        stt=stt,
-        llm=llm,
-        tts=tts,
-        vad=vad,
-        turn_detection=turn_detection,
-    )
+    session = create_session(stt, llm, tts, vad, turn_detection)
 
     async def handle_participant_attributes_changed(
         changed_attributes: dict, participant: rtc.Participant
@@ -197,7 +419,10 @@ async def entrypoint(ctx: agents.JobContext):
             # Check if sip.callStatus is in the changed attributes
             if "sip.callStatus" in changed_attributes:
                 call_status = changed_attributes["sip.callStatus"]
-                logger.info(f"SIP Call Status updated: {call_status}")
+                logger.info("SIP Call Status updated: %s", call_status)
+                call_prewarm.on_call_status(call_status)
+                if journal:
+                    journal.append("sip_status", status=call_status)
                 # Log specific call status information
                 if call_status == "active":
                     logger.info("Call is now active and connected")
@@ -209,33 +434,47 @@ async def entrypoint(ctx: agents.JobContext):
                     logger.info("Inbound call is now ringing for the caller")
                 elif call_status == "hangup":
                     logger.info("Call has been ended by a participant")
-                    chat_ctx = agent_instance.chat_ctx.copy()
-                    chat_ctx.add_message(role="user", content="State only the numeric value of the unsecured debt amount customer has without any currency symbols or words. Just the number. If you cannot find return 0")
+                    if not call_prewarm.answered:
+                        # Never picked up; the entrypoint is waiting for the answer and hangs up
+                        return
+                    if agent_instance is None:
+                        # Still looking up the lead; the room closes and the job ends without a disposition to set
+                        logger.warning("Call ended before the agent was created")
+                        return
+                    if agent_instance.pending_transfer is not None:
+                        # The caller leaves the room when a transfer goes through
+                        await asyncio.wait([agent_instance.pending_transfer])
+                    if task_supervisor.has_run("hangup") or agent_instance.current_status == DISPOSITION_TRANSFERRED:
+                        # We hung up or transferred ourselves, disposition is already set
+                        return
                     if agent_instance.current_status != DISPOSITION_QUALIFIED_NOT_TRANSFERRED:
+                        if POST_CALL_QUEUE_DIR:
+                            # Derived from the transcript by post_call_worker.py once the job is done
+                            agent_instance.needs_debt_disposition = True
+                            await agent_instance.hangup()
+                            return
+
+                        chat_ctx = agent_instance.chat_ctx.copy()
+                        chat_ctx.add_message(role="user", content=DEBT_AMOUNT_PROMPT)
                         await agent_instance.update_chat_ctx(chat_ctx)
 
                         response_stream = llm.chat(chat_ctx=chat_ctx)
-                        unsecured_debt_amount = ""
+                        response = ""
 
                         async for chunk in response_stream:
                             if chunk.delta and chunk.delta.content:
-                                unsecured_debt_amount += chunk.delta.content
+                                response += chunk.delta.content
                         
-                        try:
-                            unsecured_debt_amount = int(unsecured_debt_amount)
-                        except:
-                            raise TypeError("Debt amount is not a string")
+                        unsecured_debt_amount = parse_debt_amount(response)
+                        if unsecured_debt_amount is None:
+                            logger.warning("No debt amount in LLM response %r, using 0", response)
+                            unsecured_debt_amount = 0
                         
-                        print(f"Debt amount: {unsecured_debt_amount}")
+                        logger.info("Debt amount: %s", unsecured_debt_amount)
                         
-                        if unsecured_debt_amount>10_000:
-                            agent_instance.current_status = DISPOSITION_DEBT_OVER_10K_HANGUP
-                        elif unsecured_debt_amount>7_000:
-                            agent_instance.current_status = DISPOSITION_DEBT_7K_10K_HANGUP
-                        else:
-                            agent_instance.current_status = DISPOSITION_IMMEDIATE_HANGUP
+                        agent_instance.current_status = disposition_for_debt(unsecured_debt_amount)
                         
-                        print(f"Agent status: {agent_instance.current_status}")
+                        logger.info("Agent status: %s", agent_instance.current_status)
                         await agent_instance.hangup()
                     
                         
@@ -243,8 +482,9 @@ async def entrypoint(ctx: agents.JobContext):
         changed_attributes: dict, participant: rtc.Participant
     ):
         # Handle all participant attribute changes
-        asyncio.create_task(
-            handle_participant_attributes_changed(changed_attributes, participant)
+        task_supervisor.spawn(
+            handle_participant_attributes_changed(changed_attributes, participant),
+            name="participant_attributes_changed",
         )
 
 
@@ -252,37 +492,68 @@ async def entrypoint(ctx: agents.JobContext):
     ctx.room.on(
         "participant_attributes_changed", on_participant_attributes_changed_handler
     )
+    # BVC on every call, or only on lines that need it (see noise_gate.py)
+    bvc = noise_cancellation.BVC()
+    noise_gate = NoiseCancellationGate.from_env(bvc) if NOISE_GATING_ENABLED else None
     agent_instance = GalacticVoiceAgent(
         f"{result['first_name']} {result['last_name']}" if result else None,
-        result["lead_id"] if result else None
+        result["lead_id"] if result else None,
+        task_supervisor=task_supervisor,
+        noise_gate=noise_gate,
+        campaign=campaign,
     )
 
-    await session.start(
-        room=ctx.room,
-        agent=agent_instance,
-        room_input_options=RoomInputOptions(
-            noise_cancellation=noise_cancellation.BVC(),
-        ),
-    )
+    greeting = None
+    if GREETING_FAST_PATH_ENABLED:
+        # The name segment is synthesized while the session starts and AMD listens
+        greeting_cache = ctx.proc.userdata["greeting_cache"]
+        segments = campaign.greeting_segments()
+        if not all(greeting_cache.get(text) for text in segments):
+            # A new opening line or voice since prewarm; another process may have cached it already
+            await asyncio.to_thread(greeting_cache.load, segments)
+        greeting = GreetingFastPath(
+            tts, greeting_cache, agent_instance.name, campaign.introduction, campaign.opening_pitch
+        )
+        greeting.start()
+        ctx.add_shutdown_callback(greeting.aclose)
+        if not greeting.cached:
+            task_supervisor.spawn(greeting_cache.warm(tts, segments), name="greeting_cache_warm")
+
+    # Room tracks at the rates the STT, VAD and TTS run at, see telephony_audio.py
+    rates = audio_rates(campaign.tts_sample_rate, shared_vad=VAD_SERVICE_ENABLED)
+    # The session's own tasks belong to the call, not to its start
+    with call_tracing.span("session_start", nest=False):
+        await session.start(
+            room=ctx.room,
+            agent=agent_instance,
+            room_input_options=RoomInputOptions(
+                noise_cancellation=bvc,
+                audio_sample_rate=rates.room_input,
+            ),
+            room_output_options=RoomOutputOptions(
+                audio_sample_rate=rates.room_output,
+            ),
+        )
+    if noise_gate:
+        noise_gate.attach(session)
+        ctx.add_shutdown_callback(noise_gate.aclose)
 
     inactivity_task: asyncio.Task | None = None
     async def user_presence_task():
         try:
-            await asyncio.sleep(10)
+            await asyncio.sleep(campaign.dead_air_timeout_s)
             agent_instance.current_status = DISPOSITION_DEAD_AIR
             await agent_instance.hangup()
         except asyncio.CancelledError:
-            print("Inactivity task cancelled - user returned")
+            logger.debug("Inactivity task cancelled - user returned")
             return
 
     @session.on("user_state_changed")
     def _user_state_changed(ev: UserStateChangedEvent):
-        print(f"User status events: {ev.new_state}")
         nonlocal inactivity_task
+        logger.debug("User state: %s", ev.new_state)
         
-        print(f"New State: {ev.new_state}")
-        
-        if ev.new_state == "away":
+        if ev.new_state == "away" and call_prewarm.answered:
             # Cancel existing task
             if inactivity_task and not inactivity_task.done():
                 inactivity_task.cancel()
@@ -293,55 +564,205 @@ async def entrypoint(ctx: agents.JobContext):
                     instructions="The user has been inactive. Politely check if the user is still present."
                 )
                 nonlocal inactivity_task
-                inactivity_task = asyncio.create_task(user_presence_task())
+                inactivity_task = task_supervisor.spawn(user_presence_task(), name="user_presence")
             
-            asyncio.create_task(handle_away())
+            task_supervisor.spawn(handle_away(), name="handle_away")
             
         elif inactivity_task is not None:
             if inactivity_task is not None and not inactivity_task.done():
                 inactivity_task.cancel()
             inactivity_task = None
-            print("User is listening - cancelled hangup")
+            logger.debug("User is listening - cancelled hangup")
             
+    if journal:
+        @session.on("conversation_item_added")
+        def _journal_conversation_item(ev: ConversationItemAddedEvent):
+            journal.append(
+                "message",
+                role=ev.item.role,
+                text=ev.item.text_content,
+                interrupted=ev.item.interrupted,
+            )
+
+        @session.on("function_tools_executed")
+        def _journal_tool_calls(ev: FunctionToolsExecutedEvent):
+            for call, output in ev.zipped():
+                journal.append(
+                    "tool_call",
+                    name=call.name,
+                    arguments=call.arguments,
+                    output=output.output if output else None,
+                )
+
+        @session.on("agent_state_changed")
+        def _journal_agent_state(ev: AgentStateChangedEvent):
+            journal.append("agent_state", state=ev.new_state)
+
+        @session.on("user_state_changed")
+        def _journal_user_state(ev: UserStateChangedEvent):
+            journal.append("user_state", state=ev.new_state)
+
+        async def close_journal(reason: str):
+            await hang_up_if_drained(reason)
+            journal.append(
+                "call_ended",
+                status=agent_instance.current_status,
+                lead_id=agent_instance.lead_id,
+                reason=reason,
+            )
+            await journal.aclose()
+
+        ctx.add_shutdown_callback(close_journal)
+
     # Store reference to agent for access in event handlers
     setattr(session, "agent", agent_instance)
     usage_collector = metrics.UsageCollector()
     
-    if IS_DEV:
-        csv_logger = MetricsCSVLogger()
+    if METRICS_CSV_ENABLED:
+        csv_logger = MetricsCSVLogger(max_file_bytes=METRICS_CSV_MAX_BYTES)
         csv_filename = csv_logger.get_csv_filename("llm_provider", "llm_model")
         csv_logger.initialize_csv(csv_filename)
         logger.info(f"Metrics will be logged to: {csv_filename}")
 
+        async def stop_csv_logger():
+            # Drains the queue and joins the writer thread
+            await asyncio.to_thread(csv_logger.stop)
+
+        ctx.add_shutdown_callback(stop_csv_logger)
+
+    v2v_tracker = VoiceToVoiceTracker()
+
+    def report_latency(stage: str, value: float, speech_id: str | None = None):
+        worker_telemetry.send("latency", stage=stage, value=value)
+        voice_to_voice = v2v_tracker.add(speech_id, stage, value)
+        if voice_to_voice is not None:
+            worker_telemetry.send("latency", stage="voice_to_voice", value=voice_to_voice)
+
     @session.on("metrics_collected")
     def _on_metrics_collected(ev: MetricsCollectedEvent):
-        # Log the raw metric for debugging
-        logger.info(f"Metrics: {ev.metrics}")
+        # Log the raw metric for debugging; formatted on the logging thread, if at all
+        logger.debug("Metrics: %s", ev.metrics, extra={"speech_id": getattr(ev.metrics, "speech_id", None)})
 
         # Collect for summary
         usage_collector.collect(ev.metrics)
-
-        if IS_DEV:
-            asyncio.create_task(
-                asyncio.to_thread(csv_logger.write_metrics, csv_filename, ev.metrics)
-            )
+        call_tracing.record_metrics(ev.metrics)
+
+        # Feed the worker's latency histograms and SLO-aware load function
+        if isinstance(ev.metrics, metrics.STTMetrics):
+            report_latency("stt_duration", ev.metrics.duration)
+        elif isinstance(ev.metrics, metrics.EOUMetrics):
+            report_latency("eou_delay", ev.metrics.end_of_utterance_delay, ev.metrics.speech_id)
+            # Without the endpointing wait, which is policy rather than load
+            report_latency("eou_processing", ev.metrics.transcription_delay + ev.metrics.on_user_turn_completed_delay)
+        elif isinstance(ev.metrics, metrics.LLMMetrics) and ev.metrics.ttft >= 0:
+            report_latency("llm_ttft", ev.metrics.ttft, ev.metrics.speech_id)
+        elif isinstance(ev.metrics, metrics.TTSMetrics) and ev.metrics.ttfb >= 0:
+            report_latency("tts_ttfb", ev.metrics.ttfb, ev.metrics.speech_id)
+
+        if METRICS_CSV_ENABLED:
+            # Only enqueues the row, the file I/O happens on the logger's writer thread
+            csv_logger.write_metrics(csv_filename, ev.metrics)
 
     async def log_usage():
         summary = usage_collector.get_summary()
         logger.error(f"Usage: {summary}")
 
-    ctx.add_shutdown_callback(log_usage)
+    async def emit_post_call_record(reason: str):
+        # Shutdown callbacks run concurrently, wait for the drain hangup to set the disposition
+        await hang_up_if_drained(reason)
+        if not (agent_instance.disposition_queued or agent_instance.needs_debt_disposition):
+            return
+        await enqueue_record(
+            EndOfCallRecord(
+                call_id=ctx.room.name,
+                lead_id=agent_instance.lead_id,
+                status=agent_instance.current_status,
+                lead_fields=agent_instance.lead_fields,
+                needs_debt_disposition=agent_instance.needs_debt_disposition,
+                transcript=transcript_from_chat_ctx(agent_instance.chat_ctx),
+                llm_model=agent_instance.campaign.llm_model,
+                usage=dataclasses.asdict(usage_collector.get_summary()),
+            )
+        )
+
+    if POST_CALL_QUEUE_DIR:
+        ctx.add_shutdown_callback(emit_post_call_record)
+    else:
+        ctx.add_shutdown_callback(log_usage)
+
+    # The greeting and the warm connections are kept for the moment the callee picks up
+    with call_tracing.span("wait_answered") as answer:
+        answered = await call_prewarm.wait_answered(sip_participant)
+        answer.set(answered=answered, first_status=call_prewarm.first_status)
+    if not answered:
+        # Never picked up (or dropped before answering); not a fresh lead any more
+        agent_instance.current_status = DISPOSITION_IMMEDIATE_HANGUP
+        await agent_instance.hangup()
+        return
+
+    if AMD_ENABLED and sip_participant is not None:
+        # Listen before greeting; the session must not turn the callee's "Hello?" into a turn
+        session.input.set_audio_enabled(False)
+        with call_tracing.span("amd") as amd:
+            verdict = await detect_answering_machine(sip_participant)
+            amd.set(label=verdict.label, confidence=verdict.confidence)
+        session.input.set_audio_enabled(True)
+        if journal:
+            journal.append("amd", label=verdict.label, confidence=verdict.confidence, reason=verdict.reason)
+        if verdict.label == LABEL_MACHINE:
+            agent_instance.current_status = DISPOSITION_LINE_BUSY
+            await agent_instance.hangup()
+            return
 
-    await session.generate_reply(allow_interruptions=False)
+    with call_tracing.span("greeting") as greeting_span:
+        if greeting and await greeting.ready():
+            greeting_span.set(fast_path=True)
+            await greeting.say(session)
+        else:
+            greeting_span.set(fast_path=False)
+            await session.generate_reply(allow_interruptions=False)
 
 
 if __name__ == "__main__":
-    agents.cli.run_app(
-        agents.WorkerOptions(
-            entrypoint_fnc=entrypoint,
-            agent_name="incoming-call-agent",
-            load_threshold=0.75,
-            # num_idle_processes=10,
-            prewarm_fnc=prewarm_fnc,
-        )
+    telemetry_server = worker_telemetry.TelemetryServer()
+    telemetry_server.subscribe("job_started", idle_pool_autoscaler.on_job_started_event)
+    telemetry_server.subscribe("latency", slo_load_calculator.on_latency_event)
+    telemetry_server.subscribe("latency", latency_registry.on_latency_event)
+    telemetry_server.subscribe("call_memory", memory_watchdog.on_call_memory_event)
+    telemetry_server.subscribe("loop_lag", loop_lag_registry.on_loop_lag_event)
+    telemetry_server.start()
+
+    metrics_server = MetricsHTTPServer(render_worker_metrics)
+    metrics_server.start()
+
+    if VAD_SERVICE_ENABLED:
+        start_service_process()
+
+    rates = audio_rates(campaign_store.current().tts_sample_rate, shared_vad=VAD_SERVICE_ENABLED)
+    logger.info(
+        f"Audio pipeline {'at ' + str(TELEPHONY_SAMPLE_RATE) + 'Hz' if TELEPHONY_SAMPLE_RATE else 'wideband'}: "
+        f"{rates}, resampling {rates.resampling_stages() or 'none'}"
     )
+
+    try:
+        agents.cli.run_app(
+            agents.WorkerOptions(
+                entrypoint_fnc=entrypoint,
+                agent_name="incoming-call-agent",
+                load_fnc=compute_load,
+                load_threshold=LOAD_THRESHOLD,
+                # Warmed before the worker registers; raised to IDLE_PROCS_MAX and
+                # resized at runtime by idle_pool_autoscaler
+                num_idle_processes=idle_pool_autoscaler.min_idle,
+                prewarm_fnc=prewarm_fnc,
+                # SIGTERM drains; WorkerDrain ends calls at DRAIN_TIMEOUT_S, before this
+                drain_timeout=worker_drain.livekit_drain_timeout,
+                # Distinct per worker when worker_supervisor.py runs several on a host
+                port=int(os.getenv("WORKER_HTTP_PORT", "8081")),
+            )
+        )
+    finally:
+        # Reached once the drain finished and the job processes have exited
+        logger.info(f"Worker exiting: drain {worker_drain.stats()}, memory {memory_watchdog.stats()}, idle pool {idle_pool_autoscaler.stats()}")
+        metrics_server.stop()
+        telemetry_server.stop()
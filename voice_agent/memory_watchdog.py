@@ -0,0 +1,171 @@
+# memory_watchdog.py
+#
+# Memory accounting per call and recycling of the long-lived worker process.
+#
+# Job processes measure their RSS and Python heap (allocated blocks) when a call
+# starts and after it ends, and report the difference to the worker over worker
+# telemetry, so per-call growth shows up in the worker's /metrics. LiveKit runs
+# one job per process and exits the process when the job ends, so job-process
+# leaks cannot build up across calls; what does live for days is the worker
+# process (telemetry, histograms, the process pool). MemoryWatchdog tracks its
+# RSS and requests a recycle after MEMORY_RECYCLE_AFTER_CALLS calls or once it
+# grew MEMORY_RECYCLE_RSS_GROWTH_MB past its baseline. Under worker_supervisor.py
+# the supervisor starts a warm replacement first and then drains the worker.
+# Without a supervisor nothing restarts a worker that exits, so the request only
+# raises the memory_recycle_requested gauge and logs, unless MEMORY_SELF_RECYCLE=1
+# lets the worker drain itself (SIGTERM) for whatever restarts it (systemd, k8s).
+import logging
+import os
+import resource
+import signal
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import psutil
+
+memory_logger = logging.getLogger("memory_watchdog")
+
+MEMORY_RECYCLE_AFTER_CALLS = int(os.getenv("MEMORY_RECYCLE_AFTER_CALLS", "0"))
+MEMORY_RECYCLE_RSS_GROWTH_MB = float(os.getenv("MEMORY_RECYCLE_RSS_GROWTH_MB", "512"))
+# Calls whose job process grew more than this are logged as warnings
+MEMORY_CALL_GROWTH_WARN_MB = float(os.getenv("MEMORY_CALL_GROWTH_WARN_MB", "100"))
+MEMORY_CHECK_INTERVAL_S = 10.0
+# Set by worker_supervisor.py, which does the recycling itself
+WORKER_SUPERVISED = os.getenv("WORKER_SUPERVISED") == "1"
+# An unsupervised worker exits on a recycle request only with this set
+MEMORY_SELF_RECYCLE = os.getenv("MEMORY_SELF_RECYCLE") == "1"
+
+MB = 1024 * 1024
+
+
+def process_memory() -> Dict[str, float]:
+    """RSS and Python heap of this process; cheap enough to call on the event loop"""
+    return {
+        "rss_mb": psutil.Process().memory_info().rss / MB,
+        "heap_blocks": sys.getallocatedblocks(),
+    }
+
+
+class CallMemory:
+    """Memory of a job process before and after its call"""
+
+    def __init__(self, call_id: str):
+        self.call_id = call_id
+        self.before = process_memory()
+        self.after: Optional[Dict[str, float]] = None
+
+    def finish(self) -> Dict[str, Any]:
+        """Measure after the call and return the fields reported to the worker"""
+        self.after = process_memory()
+        # ru_maxrss is in KiB on Linux
+        peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        report = {
+            "rss_before_mb": round(self.before["rss_mb"], 1),
+            "rss_after_mb": round(self.after["rss_mb"], 1),
+            "rss_growth_mb": round(self.after["rss_mb"] - self.before["rss_mb"], 1),
+            "peak_rss_mb": round(peak_rss_mb, 1),
+            "heap_growth_blocks": self.after["heap_blocks"] - self.before["heap_blocks"],
+        }
+        if report["rss_growth_mb"] > MEMORY_CALL_GROWTH_WARN_MB:
+            memory_logger.warning(f"Call {self.call_id} grew its process by {report['rss_growth_mb']:.0f}MB: {report}")
+        else:
+            memory_logger.info(f"Call memory: {report}")
+        return report
+
+
+class MemoryWatchdog:
+    """Per-call memory growth reported by job processes, and the worker process's own RSS.
+
+    Lives in the worker process; check() is called from load_fnc.
+    """
+
+    def __init__(
+        self,
+        recycle_after_calls: int = MEMORY_RECYCLE_AFTER_CALLS,
+        recycle_rss_growth_mb: float = MEMORY_RECYCLE_RSS_GROWTH_MB,
+        supervised: bool = WORKER_SUPERVISED,
+        self_recycle: bool = MEMORY_SELF_RECYCLE,
+    ):
+        self.recycle_after_calls = recycle_after_calls
+        self.recycle_rss_growth_mb = recycle_rss_growth_mb
+        self.supervised = supervised
+        self.self_recycle = self_recycle
+        self.lock = threading.Lock()
+        self.process = psutil.Process()
+
+        self.baseline_rss_mb: Optional[float] = None
+        self.rss_mb: Optional[float] = None
+        self.recycle_reason: Optional[str] = None
+        self._last_check = 0.0
+
+        # Statistics
+        self.calls = 0
+        self.call_growth_total_mb = 0.0
+        self.call_growth_max_mb = 0.0
+        self.call_growth_last_mb: Optional[float] = None
+        self.job_peak_rss_max_mb = 0.0
+
+    def on_call_memory_event(self, event: Dict[str, Any]):
+        """Telemetry handler for the call_memory events of job processes"""
+        try:
+            growth = float(event["rss_growth_mb"])
+            peak = float(event.get("peak_rss_mb", 0.0))
+        except (KeyError, TypeError, ValueError):
+            return
+        with self.lock:
+            self.calls += 1
+            self.call_growth_total_mb += growth
+            self.call_growth_max_mb = max(self.call_growth_max_mb, growth)
+            self.call_growth_last_mb = growth
+            self.job_peak_rss_max_mb = max(self.job_peak_rss_max_mb, peak)
+
+    def check(self, now: Optional[float] = None) -> Optional[str]:
+        """Measure the worker process and decide whether to recycle it; returns the reason once it should"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if now - self._last_check < MEMORY_CHECK_INTERVAL_S:
+                return self.recycle_reason
+            self._last_check = now
+            self.rss_mb = self.process.memory_info().rss / MB
+            if self.baseline_rss_mb is None:
+                self.baseline_rss_mb = self.rss_mb
+            if self.recycle_reason is not None:
+                return self.recycle_reason
+
+            growth = self.rss_mb - self.baseline_rss_mb
+            if self.recycle_after_calls and self.calls >= self.recycle_after_calls:
+                self.recycle_reason = f"served {self.calls} calls"
+            elif self.recycle_rss_growth_mb and growth >= self.recycle_rss_growth_mb:
+                self.recycle_reason = f"RSS grew {growth:.0f}MB to {self.rss_mb:.0f}MB"
+            else:
+                return None
+
+        if self.supervised:
+            memory_logger.warning(f"Recycling worker: {self.recycle_reason}")
+        elif self.self_recycle:
+            memory_logger.warning(f"Recycling worker: {self.recycle_reason}; draining")
+            # The CLI turns SIGTERM into a drain, so calls in flight are not affected
+            os.kill(os.getpid(), signal.SIGTERM)
+        else:
+            memory_logger.warning(
+                f"Worker should be recycled: {self.recycle_reason}; not supervised and "
+                f"MEMORY_SELF_RECYCLE is off, so it keeps running"
+            )
+        return self.recycle_reason
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "calls": self.calls,
+                "call_rss_growth_mb_avg": self.call_growth_total_mb / self.calls if self.calls else None,
+                "call_rss_growth_mb_max": self.call_growth_max_mb,
+                "call_rss_growth_mb_last": self.call_growth_last_mb,
+                "job_peak_rss_mb_max": self.job_peak_rss_max_mb,
+                "worker_rss_mb": self.rss_mb,
+                "worker_rss_growth_mb": (
+                    self.rss_mb - self.baseline_rss_mb if self.baseline_rss_mb is not None else None
+                ),
+                "recycle_requested": self.recycle_reason is not None,
+            }
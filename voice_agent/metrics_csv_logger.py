@@ -1,6 +1,8 @@
 # metrics_csv_logger.py
 import csv
 import os
+import time
+from collections import OrderedDict
 from datetime import datetime
 from typing import Dict, Any, Optional, TYPE_CHECKING
 import threading
@@ -48,22 +50,61 @@ else:
             pass
 
 
+HEADERS = [
+    "metrics_type",
+    "metrics_duration",
+    "metrics_timestamp",
+    "metrics_turncount",
+    "speech_id",
+    "ttft",
+    "ttfb",
+    "audio_duration",
+    "end_of_utterance_delay",
+    "transcription_delay",
+    "prompt_tokens",
+    "completion_tokens",
+    "total_tokens",
+    "characters_count",
+]
+
+# Queue marker asking the writer thread to switch files, see rotate()
+_ROTATE = object()
+
+
 class MetricsCSVLogger:
-    def __init__(self, base_dir: str = "metrics"):
+    def __init__(
+        self,
+        base_dir: str = "metrics",
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_file_bytes: Optional[int] = None,
+        max_tracked_speech_ids: int = 256,
+    ):
         self.base_dir = base_dir
         self.turn_counter = 0
         self.current_speech_id = None
-        self.speech_id_to_turn = {}  # Map speech_id to turn number
+        # Map speech_id to turn number, oldest entries evicted past max_tracked_speech_ids
+        self.speech_id_to_turn = OrderedDict()
+        self.max_tracked_speech_ids = max_tracked_speech_ids
         self.lock = threading.Lock()
 
+        # Rows are written in batches of batch_size, or every flush_interval seconds
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Rotate to a new part file once the current one exceeds max_file_bytes
+        self.max_file_bytes = max_file_bytes
+
         # Queue for non-blocking writes
-        self.write_queue = queue.Queue(maxsize=1000)
+        self.write_queue = queue.Queue(maxsize=10000)
         self.writer_thread = None
         self.stop_event = threading.Event()
         self.current_filename = None
+        self.pending_filename = None
 
         # Statistics
         self.write_count = 0
+        self.batch_count = 0
+        self.rotation_count = 0
         self.error_count = 0
         self.dropped_count = 0
 
@@ -89,16 +130,8 @@ class MetricsCSVLogger:
         try:
             self.current_filename = filename
 
-            # Simple headers - just 4 columns
-            headers = [
-                "metrics_type",
-                "metrics_duration",
-                "metrics_timestamp",
-                "metrics_turncount",
-            ]
-
             with open(filename, "w", newline="") as f:
-                writer = csv.DictWriter(f, fieldnames=headers)
+                writer = csv.DictWriter(f, fieldnames=HEADERS)
                 writer.writeheader()
 
             # Start the writer thread
@@ -119,53 +152,97 @@ class MetricsCSVLogger:
             return False
 
     def _writer_loop(self, filename: str):
-        """Background thread that writes metrics from queue to file"""
+        """Background thread that writes metrics from queue to file in batches"""
         metrics_logger.info(f"Starting CSV writer thread for {filename}")
 
+        f = None
         try:
-            with open(filename, "a", newline="", buffering=1) as f:  # Line buffering
-                headers = [
-                    "metrics_type",
-                    "metrics_duration",
-                    "metrics_timestamp",
-                    "metrics_turncount",
-                ]
-                writer = csv.DictWriter(f, fieldnames=headers)
-
-                while not self.stop_event.is_set() or not self.write_queue.empty():
-                    try:
-                        # Get row with timeout
-                        row = self.write_queue.get(timeout=0.1)
-                        if row is None:  # Poison pill
-                            break
-
-                        # Write the row
-                        writer.writerow(row)
-                        f.flush()  # Ensure data is written
-
-                        self.write_count += 1
-
-                        # Log progress every 10 writes
-                        if self.write_count % 10 == 0:
-                            metrics_logger.debug(
-                                f"Written {self.write_count} metrics to CSV"
-                            )
-
-                    except queue.Empty:
+            f = open(filename, "a", newline="")
+            writer = csv.DictWriter(f, fieldnames=HEADERS)
+            part = 1
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            stopping = False
+
+            while not stopping:
+                try:
+                    row = self.write_queue.get(
+                        timeout=max(0.0, deadline - time.monotonic())
+                    )
+                    if row is None:  # Poison pill, drain what is left
+                        stopping = True
+                    elif row is _ROTATE:
+                        self._write_batch(f, writer, batch)
+                        batch = []
+                        deadline = time.monotonic() + self.flush_interval
+                        f.close()
+                        filename = self.pending_filename
+                        f, writer = self._open_new_file(filename)
+                        part = 1
                         continue
-                    except Exception as e:
-                        self.error_count += 1
-                        metrics_logger.error(f"Error writing row to CSV: {e}")
+                    else:
+                        batch.append(row)
+                        if len(batch) < self.batch_size:
+                            continue
+                except queue.Empty:
+                    stopping = self.stop_event.is_set()
+
+                try:
+                    self._write_batch(f, writer, batch)
+                except Exception as e:
+                    self.error_count += len(batch)
+                    metrics_logger.error(f"Error writing batch to CSV: {e}")
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+                if self.max_file_bytes and f.tell() >= self.max_file_bytes:
+                    f.close()
+                    part += 1
+                    root, ext = os.path.splitext(filename)
+                    f, writer = self._open_new_file(f"{root}_part{part}{ext}")
 
         except Exception as e:
             metrics_logger.error(
                 f"Fatal error in writer thread: {e}\n{traceback.format_exc()}"
             )
         finally:
+            if f is not None:
+                f.close()
             metrics_logger.info(
-                f"CSV writer thread stopped. Wrote {self.write_count} metrics, {self.error_count} errors"
+                f"CSV writer thread stopped. Wrote {self.write_count} metrics in {self.batch_count} batches, {self.error_count} errors"
             )
 
+    def _write_batch(self, f, writer: csv.DictWriter, batch: list):
+        if not batch:
+            return
+        writer.writerows(batch)
+        f.flush()
+        self.write_count += len(batch)
+        self.batch_count += 1
+        metrics_logger.debug("Written %d metrics to CSV", self.write_count)
+
+    def _open_new_file(self, filename: str):
+        f = open(filename, "w", newline="")
+        writer = csv.DictWriter(f, fieldnames=HEADERS)
+        writer.writeheader()
+        self.current_filename = filename
+        self.rotation_count += 1
+        metrics_logger.info(f"Rotated metrics CSV to {filename}")
+        return f, writer
+
+    def rotate(self, filename: str):
+        """Switch to a new file and restart the turn count.
+
+        main.py creates a logger per call, so it does not need this; it is for
+        callers that keep one logger across calls.
+        """
+        self.pending_filename = filename
+        self.write_queue.put(_ROTATE)
+        with self.lock:
+            self.turn_counter = 0
+            self.current_speech_id = None
+            self.speech_id_to_turn.clear()
+
     def update_turn(self, speech_id: str) -> int:
         """Update turn counter when a new speech_id is encountered and return turn number"""
         try:
@@ -174,8 +251,10 @@ class MetricsCSVLogger:
                     self.turn_counter += 1
                     self.speech_id_to_turn[speech_id] = self.turn_counter
                     self.current_speech_id = speech_id
+                    if len(self.speech_id_to_turn) > self.max_tracked_speech_ids:
+                        self.speech_id_to_turn.popitem(last=False)
                     metrics_logger.debug(
-                        f"New turn {self.turn_counter} for speech_id: {speech_id}"
+                        "New turn %d for speech_id: %s", self.turn_counter, speech_id
                     )
 
                 return self.speech_id_to_turn.get(speech_id, self.turn_counter)
@@ -214,14 +293,14 @@ class MetricsCSVLogger:
             return None
 
     def write_metrics(self, filename: str, metrics: Any):
-        """Queue metrics for writing (non-blocking)"""
+        """Queue metrics for writing (non-blocking, cheap enough to call on the event loop)"""
         try:
-            # Skip VAD and EOU metrics if you don't want them
-            if isinstance(metrics, (VADMetrics, EOUMetrics)):
+            # Skip VAD metrics, they are emitted for every inference window
+            if isinstance(metrics, VADMetrics):
                 return
 
-            # Only process STT, LLM, and TTS
-            if not isinstance(metrics, (STTMetrics, LLMMetrics, TTSMetrics)):
+            # Only process STT, EOU, LLM, and TTS
+            if not isinstance(metrics, (STTMetrics, EOUMetrics, LLMMetrics, TTSMetrics)):
                 return
 
             # Get speech_id and turn number
@@ -230,36 +309,32 @@ class MetricsCSVLogger:
                 self.update_turn(speech_id) if speech_id else self.turn_counter
             )
 
-            # Get metric type
-            metric_type = self.get_metric_type_name(metrics)
-
-            # Get duration
-            duration = self.get_duration(metrics)
-
-            # Get timestamp
-            timestamp = getattr(metrics, "timestamp", datetime.now().timestamp())
-
-            # Prepare simple row with just 4 columns
             row = {
-                "metrics_type": metric_type,
-                "metrics_duration": duration,
-                "metrics_timestamp": timestamp,
+                "metrics_type": self.get_metric_type_name(metrics),
+                "metrics_duration": self.get_duration(metrics),
+                "metrics_timestamp": getattr(metrics, "timestamp", None) or time.time(),
                 "metrics_turncount": turn_number,
+                "speech_id": speech_id,
+                "ttft": getattr(metrics, "ttft", None),
+                "ttfb": getattr(metrics, "ttfb", None),
+                "audio_duration": getattr(metrics, "audio_duration", None),
+                "end_of_utterance_delay": getattr(metrics, "end_of_utterance_delay", None),
+                "transcription_delay": getattr(metrics, "transcription_delay", None),
+                "prompt_tokens": getattr(metrics, "prompt_tokens", None),
+                "completion_tokens": getattr(metrics, "completion_tokens", None),
+                "total_tokens": getattr(metrics, "total_tokens", None),
+                "characters_count": getattr(metrics, "characters_count", None),
             }
 
             # Queue the row for writing (non-blocking)
             try:
                 self.write_queue.put_nowait(row)
-
-                # Simple log
-                metrics_logger.info(
-                    f"Queued metric: type={metric_type}, duration={duration}, turn={turn_number}"
-                )
             except queue.Full:
                 self.dropped_count += 1
-                metrics_logger.warning(
-                    f"Metrics queue full, dropped metric. Total dropped: {self.dropped_count}"
-                )
+                if self.dropped_count % 100 == 1:
+                    metrics_logger.warning(
+                        f"Metrics queue full, dropped metric. Total dropped: {self.dropped_count}"
+                    )
 
         except Exception as e:
             metrics_logger.error(
@@ -286,6 +361,7 @@ class MetricsCSVLogger:
         metrics_logger.info(
             f"Metrics CSV logger stopped. "
             f"Written: {self.write_count}, "
+            f"Batches: {self.batch_count}, "
             f"Errors: {self.error_count}, "
             f"Dropped: {self.dropped_count}"
         )
@@ -297,6 +373,8 @@ class MetricsCSVLogger:
                 "total_turns": self.turn_counter,
                 "stats": {
                     "written": self.write_count,
+                    "batches": self.batch_count,
+                    "rotations": self.rotation_count,
                     "errors": self.error_count,
                     "dropped": self.dropped_count,
                     "queued": self.write_queue.qsize(),
@@ -0,0 +1,295 @@
+# noise_gate.py
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, AsyncIterable, AsyncIterator, Deque, Dict, Optional
+
+import numpy as np
+from livekit import rtc
+
+noise_logger = logging.getLogger("noise_gate")
+
+# Off by default: the expander changes what Deepgram hears, keep it off until
+# benchmarks/noise_gate_wer.py on recorded calls shows the WER does not rise
+NOISE_GATING_ENABLED = os.getenv("NOISE_GATING") == "1"
+
+MODE_OFF = "off"
+MODE_GATE = "gate"  # NumPy downward expander on the STT input
+MODE_BVC = "bvc"  # LiveKit BVC noise cancellation on the inbound track
+MODES = [MODE_OFF, MODE_GATE, MODE_BVC]
+
+# Typical active speech level on a telephone line (ITU-T P.56 nominal -26 dBov),
+# used as the speech level while the caller has not spoken in the window
+NOMINAL_SPEECH_DBFS = -26.0
+# A window holds speech when its loud frames are this far above the noise floor
+SPEECH_MARGIN_DB = 10.0
+SILENCE_DBFS = -96.0
+
+
+def frame_dbfs(frame: rtc.AudioFrame) -> float:
+    samples = np.frombuffer(frame.data, dtype=np.int16)
+    if not len(samples):
+        return SILENCE_DBFS
+    rms = np.sqrt(np.mean(samples.astype(np.float32) ** 2))
+    return max(SILENCE_DBFS, 20 * np.log10(rms / 32768 + 1e-12))
+
+
+class LineQualityMeter:
+    """Rolling noise floor and SNR of the raw inbound audio.
+
+    The noise floor is a low percentile of the frame levels over the window and the
+    speech level a high percentile, so neither needs a VAD.
+    """
+
+    def __init__(self, window_s: float = 8.0, noise_percentile: float = 10, speech_percentile: float = 95):
+        self.window_s = window_s
+        self.noise_percentile = noise_percentile
+        self.speech_percentile = speech_percentile
+        self.levels: Deque[tuple] = deque()
+        self.window_duration = 0.0
+        self.measured_s = 0.0
+
+    def add(self, frame: rtc.AudioFrame) -> float:
+        duration = frame.samples_per_channel / frame.sample_rate
+        level = frame_dbfs(frame)
+        self.levels.append((level, duration))
+        self.window_duration += duration
+        self.measured_s += duration
+        while self.window_duration - self.levels[0][1] >= self.window_s:
+            self.window_duration -= self.levels.popleft()[1]
+        return level
+
+    def measure(self) -> Optional[Dict[str, float]]:
+        if not self.levels:
+            return None
+        levels = np.fromiter((level for level, _ in self.levels), dtype=np.float64, count=len(self.levels))
+        noise_floor, loud = np.percentile(levels, [self.noise_percentile, self.speech_percentile])
+        speech = loud if loud - noise_floor >= SPEECH_MARGIN_DB else max(loud, NOMINAL_SPEECH_DBFS)
+        return {
+            "noise_floor_dbfs": float(noise_floor),
+            "speech_dbfs": float(speech),
+            "snr_db": float(speech - noise_floor),
+        }
+
+
+class NoiseCancellationGate:
+    """Runs BVC only on lines that need it.
+
+    The line SNR picks one of three modes: no processing, a cheap NumPy expander
+    that attenuates frames near the noise floor before STT, or BVC on the inbound
+    track. Each mode has separate enter and leave thresholds and a minimum hold
+    time, so a line near a threshold does not flap. Calls start in BVC until the
+    first `probe_s` seconds of audio have been measured.
+
+    BVC runs inside the track's AudioStream, so switching it reopens RoomIO's
+    stream with or without noise cancellation. While BVC is on, the pipeline only
+    sees denoised audio, so the meter reads a second, raw stream of the track.
+    """
+
+    def __init__(
+        self,
+        noise_cancellation: Optional[rtc.NoiseCancellationOptions] = None,
+        bvc_on_snr_db: float = 12.0,
+        bvc_off_snr_db: float = 18.0,
+        gate_on_snr_db: float = 25.0,
+        gate_off_snr_db: float = 30.0,
+        probe_s: float = 3.0,
+        min_hold_s: float = 10.0,
+        evaluate_interval_s: float = 0.5,
+        gate_margin_db: float = 6.0,
+        gate_attenuation_db: float = 12.0,
+        meter: Optional[LineQualityMeter] = None,
+    ):
+        self.noise_cancellation = noise_cancellation
+        self.bvc_on_snr_db = bvc_on_snr_db
+        self.bvc_off_snr_db = bvc_off_snr_db
+        self.gate_on_snr_db = gate_on_snr_db
+        self.gate_off_snr_db = gate_off_snr_db
+        self.probe_s = probe_s
+        self.min_hold_s = min_hold_s
+        self.evaluate_interval_s = evaluate_interval_s
+        self.gate_margin_db = gate_margin_db
+        self.gate_gain = 10 ** (-gate_attenuation_db / 20)
+        self.meter = meter or LineQualityMeter()
+
+        self.mode = MODE_BVC
+        self.last_quality: Optional[Dict[str, float]] = None
+        self._mode_since = time.monotonic()
+        self._last_switch_at: Optional[float] = None
+        self._next_evaluation_s = 0.0
+        self._audio_input = None
+        self._raw_stream: Optional[rtc.AudioStream] = None
+        self._raw_task: Optional[asyncio.Task] = None
+        self._closed = False
+
+        # Statistics
+        self.mode_s = {mode: 0.0 for mode in MODES}
+        self.switches = 0
+        self.processing_s = 0.0  # metering and expander time on the call's event loop
+
+    @classmethod
+    def from_env(cls, noise_cancellation: Optional[rtc.NoiseCancellationOptions]) -> "NoiseCancellationGate":
+        return cls(
+            noise_cancellation,
+            bvc_on_snr_db=float(os.getenv("NOISE_GATING_BVC_ON_SNR_DB", "12")),
+            bvc_off_snr_db=float(os.getenv("NOISE_GATING_BVC_OFF_SNR_DB", "18")),
+            gate_on_snr_db=float(os.getenv("NOISE_GATING_GATE_ON_SNR_DB", "25")),
+            gate_off_snr_db=float(os.getenv("NOISE_GATING_GATE_OFF_SNR_DB", "30")),
+            min_hold_s=float(os.getenv("NOISE_GATING_MIN_HOLD_S", "10")),
+        )
+
+    @property
+    def bvc_applied(self) -> bool:
+        """Whether BVC is actually in the inbound audio path (only with RoomIO)"""
+        return self.mode == MODE_BVC and self._audio_input is not None
+
+    def attach(self, session) -> bool:
+        """Take control of the noise cancellation of the session's RoomIO audio input.
+
+        Relies on RoomIO internals; without them the gate still measures the line
+        and runs the expander, but cannot switch BVC.
+        """
+        room_io = getattr(session, "_room_io", None)
+        audio_input = getattr(room_io, "_audio_input", None) if room_io else None
+        if audio_input is None or not hasattr(audio_input, "_noise_cancellation"):
+            noise_logger.warning("RoomIO audio input not found, noise gating cannot switch BVC")
+            return False
+        self._audio_input = audio_input
+        # Audio is discarded during the uninterruptible greeting, the raw stream is
+        # not, so the probe can finish while the agent is still talking
+        self._open_raw_stream()
+        return True
+
+    def _desired_mode(self, snr_db: float) -> str:
+        if snr_db < self.bvc_on_snr_db:
+            return MODE_BVC
+        if self.mode == MODE_BVC and snr_db < self.bvc_off_snr_db:
+            return MODE_BVC
+        if snr_db < self.gate_on_snr_db:
+            return MODE_GATE
+        if self.mode != MODE_OFF and snr_db < self.gate_off_snr_db:
+            return MODE_GATE
+        return MODE_OFF
+
+    def _evaluate(self):
+        if self.meter.measured_s < max(self.probe_s, self._next_evaluation_s):
+            return
+        self._next_evaluation_s = self.meter.measured_s + self.evaluate_interval_s
+
+        quality = self.meter.measure()
+        if quality is None:
+            return
+        self.last_quality = quality
+        mode = self._desired_mode(quality["snr_db"])
+        now = time.monotonic()
+        held = self._last_switch_at is None or now - self._last_switch_at >= self.min_hold_s
+        if mode != self.mode and held:
+            self._set_mode(mode, now)
+
+    def _set_mode(self, mode: str, now: float):
+        quality = self.last_quality or {}
+        noise_logger.info(
+            f"Noise gating {self.mode} -> {mode} (SNR {quality.get('snr_db', 0):.1f}dB, "
+            f"noise floor {quality.get('noise_floor_dbfs', 0):.1f}dBFS)"
+        )
+        self.mode_s[self.mode] += now - self._mode_since
+        was_bvc = self.mode == MODE_BVC
+        self.mode = mode
+        self._mode_since = now
+        self._last_switch_at = now
+        self.switches += 1
+        if was_bvc != (mode == MODE_BVC):
+            self._apply_bvc(mode == MODE_BVC)
+
+    def _apply_bvc(self, enabled: bool):
+        audio_input = self._audio_input
+        if audio_input is None:
+            return
+        if not enabled:
+            self._close_raw_stream()
+
+        audio_input._noise_cancellation = self.noise_cancellation if enabled else None
+        publication = audio_input._publication
+        participant = audio_input._room.remote_participants.get(audio_input._participant_identity)
+        if publication is None or publication.track is None or participant is None:
+            return
+        # Reopen the track's stream; clearing the publication lets RoomIO accept the same track
+        audio_input._publication = None
+        audio_input._on_track_available(publication.track, publication, participant)
+
+    def _open_raw_stream(self):
+        publication = self._audio_input._publication if self._audio_input else None
+        if publication is None or publication.track is None or self._raw_stream or self._closed:
+            return
+        self._raw_stream = rtc.AudioStream.from_track(
+            track=publication.track,
+            sample_rate=self._audio_input._sample_rate,
+            num_channels=self._audio_input._num_channels,
+        )
+        self._raw_task = asyncio.create_task(self._read_raw_stream(self._raw_stream), name="noise_gate_raw")
+
+    async def _read_raw_stream(self, stream: rtc.AudioStream):
+        async for event in stream:
+            started_at = time.perf_counter()
+            self.meter.add(event.frame)
+            self._evaluate()
+            self.processing_s += time.perf_counter() - started_at
+
+    def _close_raw_stream(self) -> Optional[asyncio.Task]:
+        if self._raw_task:
+            self._raw_task.cancel()
+            self._raw_task = None
+        stream, self._raw_stream = self._raw_stream, None
+        return asyncio.create_task(stream.aclose()) if stream else None
+
+    def _expand(self, frame: rtc.AudioFrame, level: float) -> rtc.AudioFrame:
+        """Attenuate frames within `gate_margin_db` of the noise floor"""
+        if not self.last_quality or level > self.last_quality["noise_floor_dbfs"] + self.gate_margin_db:
+            return frame
+        samples = np.frombuffer(frame.data, dtype=np.int16)
+        return rtc.AudioFrame(
+            (samples * self.gate_gain).astype(np.int16).tobytes(),
+            sample_rate=frame.sample_rate,
+            num_channels=frame.num_channels,
+            samples_per_channel=frame.samples_per_channel,
+        )
+
+    async def process(self, audio: AsyncIterable[rtc.AudioFrame]) -> AsyncIterator[rtc.AudioFrame]:
+        """Wraps the STT node input: meters the line and applies the expander"""
+        async for frame in audio:
+            if self.bvc_applied:
+                # The pipeline audio is denoised now, meter the raw stream instead
+                if self._raw_stream is None:
+                    self._open_raw_stream()
+                yield frame
+                continue
+
+            started_at = time.perf_counter()
+            level = self.meter.add(frame)
+            self._evaluate()
+            if self.mode == MODE_GATE:
+                frame = self._expand(frame, level)
+            self.processing_s += time.perf_counter() - started_at
+            yield frame
+
+    def stats(self) -> Dict[str, Any]:
+        mode_s = dict(self.mode_s)
+        mode_s[self.mode] += time.monotonic() - self._mode_since
+        total = sum(mode_s.values())
+        return {
+            "mode": self.mode,
+            "switches": self.switches,
+            "bvc_share": mode_s[MODE_BVC] / total if total else None,
+            "mode_s": {mode: round(s, 1) for mode, s in mode_s.items()},
+            "processing_ms": round(self.processing_s * 1000, 1),
+            **(self.last_quality or {}),
+        }
+
+    async def aclose(self):
+        self._closed = True
+        closing = self._close_raw_stream()
+        if closing:
+            await closing
+        noise_logger.info(f"Noise gating report: {self.stats()}")
@@ -0,0 +1,120 @@
+# post_call_queue.py
+import asyncio
+import dataclasses
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from status_codes import (
+    DISPOSITION_DEBT_7K_10K_HANGUP,
+    DISPOSITION_DEBT_OVER_10K_HANGUP,
+    DISPOSITION_IMMEDIATE_HANGUP,
+)
+
+post_call_logger = logging.getLogger("post_call_queue")
+
+# Spool directory shared by job processes and post_call_worker.py. When unset,
+# dispositions are computed and reported inline by the job process.
+POST_CALL_QUEUE_DIR = os.getenv("POST_CALL_QUEUE_DIR")
+
+DEBT_AMOUNT_PROMPT = "State only the numeric value of the unsecured debt amount customer has without any currency symbols or words. Just the number. If you cannot find return 0"
+
+
+# First amount in an LLM reply: "12,500.00", "$8000", "7k to 10k"
+DEBT_AMOUNT_RE = re.compile(
+    r"(\d{1,3}(?:,\d{3})+|\d+)(\.\d+)?\s*(k|thousand|grand|m|mil|million)?\b", re.IGNORECASE
+)
+DEBT_MAGNITUDES = {"k": 1_000, "thousand": 1_000, "grand": 1_000, "m": 1_000_000, "mil": 1_000_000, "million": 1_000_000}
+
+
+def parse_debt_amount(response: str) -> Optional[int]:
+    """Whole dollars of the first amount in `response` ("7,500", "15k", "15 thousand"), None if there is none.
+
+    Amounts spelled out in words ("fifteen thousand") have no digits and are not parsed.
+    """
+    match = DEBT_AMOUNT_RE.search(response)
+    if match is None:
+        return None
+    whole, fraction, magnitude = match.groups()
+    amount = float(whole.replace(",", "") + (fraction or ""))
+    if magnitude:
+        amount *= DEBT_MAGNITUDES[magnitude.lower()]
+    return int(amount)
+
+
+def disposition_for_debt(unsecured_debt_amount: int) -> str:
+    """Disposition for a caller who hung up before being transferred"""
+    if unsecured_debt_amount > 10_000:
+        return DISPOSITION_DEBT_OVER_10K_HANGUP
+    elif unsecured_debt_amount > 7_000:
+        return DISPOSITION_DEBT_7K_10K_HANGUP
+    return DISPOSITION_IMMEDIATE_HANGUP
+
+
+@dataclass
+class EndOfCallRecord:
+    """Everything needed to finish a call's bookkeeping after the job has exited"""
+
+    call_id: str
+    lead_id: Optional[str]
+    status: str
+    # Extra update_lead fields, e.g. comments for transferred calls
+    lead_fields: Dict[str, Any] = field(default_factory=dict)
+    # Caller hung up mid-qualification: the status must be derived from the transcript
+    needs_debt_disposition: bool = False
+    transcript: List[Dict[str, str]] = field(default_factory=list)
+    # The campaign's model, used to read the debt amount from the transcript
+    llm_model: Optional[str] = None
+    usage: Dict[str, Any] = field(default_factory=dict)
+    ended_at: float = field(default_factory=time.time)
+    attempts: int = 0
+    next_attempt_at: float = 0.0
+
+    def to_json(self) -> str:
+        return json.dumps(dataclasses.asdict(self), separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, data: str) -> "EndOfCallRecord":
+        return cls(**json.loads(data))
+
+
+def transcript_from_chat_ctx(chat_ctx: Any) -> List[Dict[str, str]]:
+    """Compact role/text transcript from an agent ChatContext"""
+    transcript = []
+    for item in chat_ctx.items:
+        if getattr(item, "type", None) != "message" or item.role not in ("user", "assistant"):
+            continue
+        text = item.text_content
+        if text:
+            transcript.append({"role": item.role, "text": text})
+    return transcript
+
+
+def write_record(queue_dir: str, record: EndOfCallRecord) -> str:
+    """Atomically write a record into the spool (blocking, run it in a thread)"""
+    os.makedirs(queue_dir, exist_ok=True)
+    name = f"{int(record.ended_at * 1000)}_{record.call_id}_{uuid.uuid4().hex[:8]}.json"
+    tmp_path = os.path.join(queue_dir, f".{name}.tmp")
+    path = os.path.join(queue_dir, name)
+    with open(tmp_path, "w") as f:
+        f.write(record.to_json())
+    # os.replace is atomic, the worker never sees a partially written record
+    os.replace(tmp_path, path)
+    return path
+
+
+async def enqueue_record(record: EndOfCallRecord, queue_dir: Optional[str] = None) -> bool:
+    """Hand an end-of-call record to the post-call worker without blocking the loop"""
+    queue_dir = queue_dir or POST_CALL_QUEUE_DIR
+    try:
+        path = await asyncio.to_thread(write_record, queue_dir, record)
+        post_call_logger.info(f"Queued end-of-call record {path}")
+        return True
+    except Exception as e:
+        post_call_logger.error(f"Failed to queue end-of-call record for {record.call_id}: {e}")
+        return False
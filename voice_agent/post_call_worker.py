@@ -0,0 +1,221 @@
+# post_call_worker.py
+#
+# Computes dispositions and writes them to the dialer for calls that have
+# already ended, so job processes are free for the next call as soon as the
+# room is gone. Run one or more alongside the agent workers:
+#
+#   POST_CALL_QUEUE_DIR=post_call_queue python post_call_worker.py --concurrency 8
+import argparse
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from livekit.agents import ChatContext
+from livekit.plugins import openai
+
+from apis.update_lead import update_lead_with_retry
+from campaign_config import CampaignConfigStore
+from post_call_queue import (
+    DEBT_AMOUNT_PROMPT,
+    POST_CALL_QUEUE_DIR,
+    EndOfCallRecord,
+    disposition_for_debt,
+    parse_debt_amount,
+)
+
+load_dotenv(dotenv_path=".env.local")
+
+logger = logging.getLogger("post_call_worker")
+logger.setLevel(logging.INFO)
+
+
+class PostCallWorker:
+    """Drains the end-of-call spool in batches with bounded concurrency and retries.
+
+    Records are claimed by renaming them into `processing/<pid>/`, so several
+    worker processes can share one spool. Failed records go back to the spool with
+    an exponential backoff and end up in `failed/` after `max_attempts`.
+    """
+
+    def __init__(
+        self,
+        queue_dir: str,
+        concurrency: int = 8,
+        batch_size: int = 50,
+        poll_interval: float = 1.0,
+        max_attempts: int = 5,
+        retry_backoff: float = 5.0,
+    ):
+        self.queue_dir = queue_dir
+        self.processing_dir = os.path.join(queue_dir, "processing", str(os.getpid()))
+        self.failed_dir = os.path.join(queue_dir, "failed")
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        # Records carry the model of the campaign the call ran with; older ones
+        # fall back to the current campaign config (CAMPAIGN_CONFIG)
+        self.campaign_store = CampaignConfigStore()
+        self.llms: Dict[str, openai.LLM] = {}
+        self.sem = asyncio.Semaphore(concurrency)
+
+        # Statistics
+        self.processed_count = 0
+        self.retried_count = 0
+        self.failed_count = 0
+
+        for directory in (self.queue_dir, self.processing_dir, self.failed_dir):
+            os.makedirs(directory, exist_ok=True)
+
+    def recover_orphans(self):
+        """Return records claimed by worker processes that are no longer running"""
+        processing_root = os.path.dirname(self.processing_dir)
+        for pid in os.listdir(processing_root):
+            if pid == str(os.getpid()) or _pid_alive(pid):
+                continue
+            orphan_dir = os.path.join(processing_root, pid)
+            for name in os.listdir(orphan_dir):
+                os.replace(os.path.join(orphan_dir, name), os.path.join(self.queue_dir, name))
+                logger.info(f"Recovered {name} from dead worker {pid}")
+            os.rmdir(orphan_dir)
+
+    def claim_batch(self) -> List[Tuple[str, EndOfCallRecord]]:
+        now = time.time()
+        batch = []
+        for name in sorted(os.listdir(self.queue_dir)):
+            if len(batch) >= self.batch_size:
+                break
+            if not name.endswith(".json"):
+                continue
+            src = os.path.join(self.queue_dir, name)
+            dst = os.path.join(self.processing_dir, name)
+            try:
+                with open(src) as f:
+                    record = EndOfCallRecord.from_json(f.read())
+                if record.next_attempt_at > now:
+                    continue
+                # Another worker may claim the same file, only one rename succeeds
+                os.rename(src, dst)
+            except FileNotFoundError:
+                continue
+            except Exception as e:
+                logger.error(f"Unreadable record {name}: {e}")
+                os.replace(src, os.path.join(self.failed_dir, name))
+                continue
+            batch.append((dst, record))
+        return batch
+
+    def llm_for(self, record: EndOfCallRecord) -> openai.LLM:
+        model = record.llm_model or self.campaign_store.current().llm_model
+        if model not in self.llms:
+            self.llms[model] = openai.LLM.with_cerebras(model=model, temperature=0.1)
+        return self.llms[model]
+
+    async def classify_debt(self, record: EndOfCallRecord) -> str:
+        chat_ctx = ChatContext.empty()
+        for turn in record.transcript:
+            chat_ctx.add_message(role=turn["role"], content=turn["text"])
+        chat_ctx.add_message(role="user", content=DEBT_AMOUNT_PROMPT)
+
+        response = ""
+        async with self.llm_for(record).chat(chat_ctx=chat_ctx) as stream:
+            async for chunk in stream:
+                if chunk.delta and chunk.delta.content:
+                    response += chunk.delta.content
+
+        unsecured_debt_amount = parse_debt_amount(response)
+        if unsecured_debt_amount is None:
+            logger.warning(f"[{record.call_id}] No debt amount in LLM response {response!r}, using 0")
+            unsecured_debt_amount = 0
+        logger.info(f"[{record.call_id}] Debt amount: {unsecured_debt_amount}")
+        return disposition_for_debt(unsecured_debt_amount)
+
+    async def process(self, path: str, record: EndOfCallRecord):
+        async with self.sem:
+            try:
+                if record.needs_debt_disposition:
+                    record.status = await self.classify_debt(record)
+                    record.needs_debt_disposition = False
+
+                logger.info(f"[{record.call_id}] Usage: {record.usage}")
+                if record.lead_id is None:
+                    success = True
+                else:
+                    success = await update_lead_with_retry(
+                        lead_id=record.lead_id, status=record.status, **record.lead_fields
+                    )
+            except Exception as e:
+                logger.error(f"[{record.call_id}] Post-call processing failed: {e}")
+                success = False
+
+            if success:
+                self.processed_count += 1
+                os.remove(path)
+                logger.info(f"[{record.call_id}] Disposition {record.status} reported")
+                return
+
+            record.attempts += 1
+            name = os.path.basename(path)
+            if record.attempts >= self.max_attempts:
+                self.failed_count += 1
+                target = os.path.join(self.failed_dir, name)
+                logger.error(f"[{record.call_id}] Giving up after {record.attempts} attempts")
+            else:
+                self.retried_count += 1
+                record.next_attempt_at = time.time() + self.retry_backoff * 2 ** (record.attempts - 1)
+                target = os.path.join(self.queue_dir, name)
+            with open(path, "w") as f:
+                f.write(record.to_json())
+            os.replace(path, target)
+
+    async def run(self):
+        self.recover_orphans()
+        logger.info(f"Post-call worker draining {self.queue_dir} (concurrency {self.concurrency})")
+        while True:
+            batch = await asyncio.to_thread(self.claim_batch)
+            if not batch:
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            started_at = time.perf_counter()
+            await asyncio.gather(*(self.process(path, record) for path, record in batch))
+            logger.info(
+                f"Processed batch of {len(batch)} in {time.perf_counter() - started_at:.2f}s "
+                f"(total processed {self.processed_count}, retried {self.retried_count}, failed {self.failed_count})"
+            )
+
+
+def _pid_alive(pid: str) -> bool:
+    try:
+        os.kill(int(pid), 0)
+        return True
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Post-call disposition worker")
+    parser.add_argument("--queue-dir", default=POST_CALL_QUEUE_DIR or "post_call_queue")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--max-attempts", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    worker = PostCallWorker(
+        args.queue_dir,
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+        max_attempts=args.max_attempts,
+    )
+    asyncio.run(worker.run())
+
+
+if __name__ == "__main__":
+    main()
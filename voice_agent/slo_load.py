@@ -0,0 +1,164 @@
+# slo_load.py
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import psutil
+
+slo_logger = logging.getLogger("slo_load")
+
+# p95 latency targets per stage in seconds. eou_processing is the part of the
+# end-of-turn delay the host is responsible for (STT final transcript plus the
+# on_user_turn_completed callback); end_of_utterance_delay itself always includes
+# the endpointing wait (0.5s, up to 6s when the turn detector expects more speech)
+DEFAULT_STAGE_TARGETS = {
+    "eou_processing": float(os.getenv("SLO_EOU_PROCESSING_S", "0.6")),
+    "llm_ttft": float(os.getenv("SLO_LLM_TTFT_S", "0.6")),
+    "tts_ttfb": float(os.getenv("SLO_TTS_TTFB_S", "0.4")),
+}
+
+
+class StageLatencyWindow:
+    """Sliding time window of latency samples for one pipeline stage"""
+
+    def __init__(self, window_s: float = 60.0, max_samples: int = 2000):
+        self.window_s = window_s
+        self.samples: Deque[Tuple[float, float]] = deque(maxlen=max_samples)
+
+    def add(self, value: float, now: float):
+        self.samples.append((now, value))
+
+    def percentile(self, q: float, now: float) -> Optional[float]:
+        while self.samples and now - self.samples[0][0] > self.window_s:
+            self.samples.popleft()
+        if not self.samples:
+            return None
+        values = sorted(v for _, v in self.samples)
+        return values[min(len(values) - 1, int(math.ceil(q * len(values))) - 1)]
+
+
+class SLOLoadCalculator:
+    """Worker load that rises when calls on this host stop meeting their latency targets.
+
+    The reported load is the max of CPU utilization, memory utilization and latency
+    pressure. Latency pressure is scaled so that a stage whose p95 reaches
+    `slo_headroom` of its target reports exactly `load_threshold`, which makes
+    LiveKit stop dispatching new calls to this host before callers notice.
+    """
+
+    def __init__(
+        self,
+        load_threshold: float = 0.75,
+        stage_targets: Optional[Dict[str, float]] = None,
+        slo_headroom: float = 0.9,
+        min_samples: int = 5,
+        smoothing: float = 0.5,
+        window_s: float = 60.0,
+        cpu_samples: int = 5,
+    ):
+        self.load_threshold = load_threshold
+        self.stage_targets = stage_targets or dict(DEFAULT_STAGE_TARGETS)
+        self.slo_headroom = slo_headroom
+        self.min_samples = min_samples
+        self.smoothing = smoothing
+        self.windows = {
+            stage: StageLatencyWindow(window_s) for stage in self.stage_targets
+        }
+        # load_fnc runs every 0.5s; averaging over 2.5s (like the default LiveKit
+        # load) keeps a single busy sample, e.g. a process spawn, from closing admission
+        self.cpu_history: Deque[float] = deque(maxlen=cpu_samples)
+        self.lock = threading.Lock()
+        self.load = 0.0
+        self.last_components: Dict[str, float] = {}
+
+    def record(self, stage: str, value: float, now: Optional[float] = None):
+        window = self.windows.get(stage)
+        if window is None or value is None:
+            return
+        with self.lock:
+            window.add(float(value), time.monotonic() if now is None else now)
+
+    def on_latency_event(self, event: Dict[str, Any]):
+        """Telemetry handler for the `latency` event sent by job processes"""
+        self.record(event.get("stage"), event.get("value"))
+
+    def latency_pressure(self, now: Optional[float] = None) -> Dict[str, float]:
+        now = time.monotonic() if now is None else now
+        pressure = {}
+        with self.lock:
+            for stage, window in self.windows.items():
+                p95 = window.percentile(0.95, now)
+                if p95 is None or len(window.samples) < self.min_samples:
+                    continue
+                ratio = p95 / (self.stage_targets[stage] * self.slo_headroom)
+                pressure[stage] = min(1.0, ratio * self.load_threshold)
+        return pressure
+
+    def get_load(
+        self,
+        cpu: Optional[float] = None,
+        memory: Optional[float] = None,
+        now: Optional[float] = None,
+    ) -> float:
+        """Combined load in [0, 1]. CPU and memory are read from psutil if not given"""
+        self.cpu_history.append(psutil.cpu_percent() / 100 if cpu is None else cpu)
+        components = {
+            "cpu": sum(self.cpu_history) / len(self.cpu_history),
+            "memory": psutil.virtual_memory().percent / 100 if memory is None else memory,
+        }
+        components.update(self.latency_pressure(now))
+
+        raw = max(components.values())
+        # Rise immediately, fall smoothly, so a recovering host is not flooded at once
+        if raw >= self.load:
+            self.load = raw
+        else:
+            self.load = self.smoothing * self.load + (1 - self.smoothing) * raw
+
+        self.last_components = components
+        return self.load
+
+    def accepting(self) -> bool:
+        return self.load < self.load_threshold
+
+
+# Example usage: simulate admission as concurrent calls ramp up on one host
+def main():
+    capacity = 40  # calls at which the host saturates
+    calc = SLOLoadCalculator(load_threshold=0.75, min_samples=1, window_s=8.0)
+    base = {"eou_processing": 0.25, "llm_ttft": 0.30, "tts_ttfb": 0.18}
+
+    print(f"{'calls':>5} {'cpu':>5} {'eou':>6} {'ttft':>6} {'ttfb':>6} {'load':>5}  admit  bottleneck")
+    calls = 0
+    for step in range(60):
+        now = float(step)
+        utilization = min(0.99, calls / capacity)
+        # M/M/1-style queueing: per-stage latency grows as 1 / (1 - utilization)
+        for stage, latency in base.items():
+            calc.record(stage, latency / (1 - utilization), now=now)
+
+        load = calc.get_load(cpu=utilization, memory=0.3, now=now)
+        components = calc.last_components
+        bottleneck = max(components, key=components.get)
+        admit = calc.accepting()
+        print(
+            f"{calls:5d} {utilization:5.2f} "
+            f"{base['eou_processing'] / (1 - utilization):6.2f} "
+            f"{base['llm_ttft'] / (1 - utilization):6.2f} "
+            f"{base['tts_ttfb'] / (1 - utilization):6.2f} "
+            f"{load:5.2f}  {'yes' if admit else 'no ':>5}  {bottleneck}"
+        )
+
+        # One new call offered per step, one call ends every third step
+        if admit:
+            calls += 1
+        if step % 3 == 2 and calls > 0:
+            calls -= 1
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# task_supervisor.py
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Optional, Set
+
+supervisor_logger = logging.getLogger("task_supervisor")
+
+
+class CallTaskSupervisor:
+    """Owns every background task spawned for one call.
+
+    Tasks are tracked until they finish, their exceptions are logged instead of
+    being lost, and at most `max_concurrency` of them run at once. `aclose()` is
+    registered as a job shutdown callback so nothing outlives the call. Tasks
+    started with `critical=True` (lead updates, room teardown) get a grace period
+    to finish before being cancelled.
+    """
+
+    def __init__(self, name: str = "call", max_concurrency: int = 32):
+        self.name = name
+        self.sem = asyncio.Semaphore(max_concurrency)
+        self.tasks: Set[asyncio.Task] = set()
+        self.critical_tasks: Set[asyncio.Task] = set()
+        self.once_tasks: Dict[str, asyncio.Task] = {}
+        self.closed = False
+
+        # Statistics
+        self.spawned_count = 0
+        self.completed_count = 0
+        self.cancelled_count = 0
+        self.error_count = 0
+        self.rejected_count = 0
+        self.durations: Dict[str, Dict[str, float]] = {}
+
+    def spawn(
+        self,
+        coro: Coroutine[Any, Any, Any],
+        name: Optional[str] = None,
+        critical: bool = False,
+    ) -> Optional[asyncio.Task]:
+        """Run `coro` as a tracked background task. Returns None once the supervisor is closed"""
+        name = name or getattr(coro, "__qualname__", "task")
+        if self.closed:
+            self.rejected_count += 1
+            supervisor_logger.warning(f"[{self.name}] Rejected task {name}, call is shutting down")
+            coro.close()
+            return None
+
+        task = asyncio.create_task(self._run(coro, name, critical), name=f"{self.name}:{name}")
+        # Closed on completion so a task cancelled before it started does not leak its coroutine
+        task.add_done_callback(lambda _: coro.close())
+        self.tasks.add(task)
+        if critical:
+            self.critical_tasks.add(task)
+        task.add_done_callback(self._on_task_done)
+        self.spawned_count += 1
+        return task
+
+    def run_once(
+        self, key: str, coro_fn: Callable[[], Awaitable[Any]], critical: bool = True
+    ) -> Awaitable[Any]:
+        """Start `coro_fn()` unless a flow with this key already ran for the call.
+
+        Every caller awaits the same task, shielded so that a cancelled caller
+        (e.g. an interrupted tool call) does not cancel the flow itself.
+        """
+        task = self.once_tasks.get(key)
+        if task is None:
+            if self.closed:
+                # Requested from a shutdown path (e.g. a drain hangup): still run it, the
+                # caller awaits it, but it is no longer supervised
+                supervisor_logger.warning(f"[{self.name}] Running {key} unsupervised, call is shutting down")
+                task = asyncio.ensure_future(coro_fn())
+            else:
+                task = self.spawn(coro_fn(), name=key, critical=critical)
+            self.once_tasks[key] = task
+        else:
+            supervisor_logger.info(f"[{self.name}] {key} already in progress, joining it")
+        return asyncio.shield(task)
+
+    def has_run(self, key: str) -> bool:
+        return key in self.once_tasks
+
+    async def _run(self, coro: Coroutine[Any, Any, Any], name: str, critical: bool) -> Any:
+        # Critical flows must not queue behind best-effort work
+        if critical:
+            return await self._timed(coro, name)
+        async with self.sem:
+            return await self._timed(coro, name)
+
+    async def _timed(self, coro: Coroutine[Any, Any, Any], name: str) -> Any:
+        start = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            duration = time.perf_counter() - start
+            stats = self.durations.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+            stats["count"] += 1
+            stats["total"] += duration
+            stats["max"] = max(stats["max"], duration)
+
+    def _on_task_done(self, task: asyncio.Task):
+        self.tasks.discard(task)
+        self.critical_tasks.discard(task)
+        if task.cancelled():
+            self.cancelled_count += 1
+            return
+
+        exc = task.exception()
+        if exc is not None:
+            self.error_count += 1
+            supervisor_logger.error(
+                f"[{self.name}] Task {task.get_name()} failed: {exc!r}", exc_info=exc
+            )
+        else:
+            self.completed_count += 1
+
+    async def aclose(self, *, grace: float = 10.0):
+        """Stop accepting tasks, let critical ones finish within `grace`, cancel the rest"""
+        self.closed = True
+
+        for task in list(self.tasks - self.critical_tasks):
+            task.cancel()
+
+        if self.critical_tasks:
+            _, pending = await asyncio.wait(set(self.critical_tasks), timeout=grace)
+            for task in pending:
+                supervisor_logger.warning(f"[{self.name}] Cancelling {task.get_name()} after {grace}s grace")
+                task.cancel()
+
+        if self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+        supervisor_logger.info(f"[{self.name}] Task supervisor closed: {self.stats()}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": len(self.tasks),
+            "spawned": self.spawned_count,
+            "completed": self.completed_count,
+            "cancelled": self.cancelled_count,
+            "errors": self.error_count,
+            "rejected": self.rejected_count,
+            "durations": {
+                name: {
+                    "count": s["count"],
+                    "avg": s["total"] / s["count"],
+                    "max": s["max"],
+                }
+                for name, s in self.durations.items()
+            },
+        }
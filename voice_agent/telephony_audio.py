@@ -0,0 +1,90 @@
+# telephony_audio.py
+#
+# Sample rates of the call's audio pipeline. By default the room tracks run at
+# 24kHz: inbound audio is resampled again for Deepgram and Silero (16kHz), and
+# the agent speaks at the campaign's TTS rate. Callers are on narrowband SIP
+# trunks though, so with TELEPHONY_SAMPLE_RATE set (8000 or 16000, or the trunk
+# codec: PCMU/PCMA -> 8000, G722 -> 16000) every stage runs at the codec's rate:
+# the room tracks, Deepgram, Silero and the TTS request, so no resampler runs in
+# the agent between them. LiveKit's SIP bridge reports no codec to the agent, so
+# the rate is configured per deployment to match its trunks.
+#
+# The VAD service (vad_service.py) batches 16kHz windows, so with it Silero stays
+# at 16kHz and 8kHz audio is upsampled for VAD only. The room's WebRTC leg is Opus
+# at 48kHz whatever the rate; LiveKit resamples to and from it in the FFI.
+#
+# benchmarks/sample_rate_cpu.py measures CPU per call at 8, 16 and 24kHz.
+import os
+from dataclasses import dataclass
+from typing import List, Optional
+
+# Default pipeline, matching the LiveKit room I/O and plugin defaults
+WIDEBAND_ROOM_SAMPLE_RATE = 24000
+WIDEBAND_STT_SAMPLE_RATE = 16000
+WIDEBAND_VAD_SAMPLE_RATE = 16000
+
+CODEC_SAMPLE_RATES = {"PCMU": 8000, "PCMA": 8000, "G711": 8000, "G722": 16000}
+TELEPHONY_SAMPLE_RATES = (8000, 16000, 24000)
+# Rates Silero runs at natively
+VAD_SAMPLE_RATES = (8000, 16000)
+
+
+def parse_telephony_sample_rate(value: Optional[str]) -> Optional[int]:
+    """A rate in Hz or a SIP codec name; None disables telephony mode"""
+    if not value or value == "0":
+        return None
+    rate = CODEC_SAMPLE_RATES.get(value.upper()) or (int(value) if value.isdigit() else None)
+    if rate not in TELEPHONY_SAMPLE_RATES:
+        raise ValueError(
+            f"TELEPHONY_SAMPLE_RATE must be one of {TELEPHONY_SAMPLE_RATES} or {sorted(CODEC_SAMPLE_RATES)}, got {value!r}"
+        )
+    return rate
+
+
+TELEPHONY_SAMPLE_RATE = parse_telephony_sample_rate(os.getenv("TELEPHONY_SAMPLE_RATE"))
+
+
+@dataclass(frozen=True)
+class AudioRates:
+    room_input: int
+    stt: int
+    vad: int
+    tts: int
+    room_output: int
+
+    def resampling_stages(self) -> List[str]:
+        """Hops where the agent resamples audio between two stages"""
+        stages = []
+        if self.stt != self.room_input:
+            stages.append(f"stt {self.room_input}->{self.stt}")
+        if self.vad != self.room_input:
+            stages.append(f"vad {self.room_input}->{self.vad}")
+        if self.tts != self.room_output:
+            stages.append(f"output {self.tts}->{self.room_output}")
+        return stages
+
+
+def audio_rates(
+    tts_sample_rate: int,
+    telephony_sample_rate: Optional[int] = TELEPHONY_SAMPLE_RATE,
+    shared_vad: bool = False,
+) -> AudioRates:
+    """Rates for one call; `tts_sample_rate` is the campaign's, used outside telephony mode"""
+    if telephony_sample_rate is None:
+        return AudioRates(
+            room_input=WIDEBAND_ROOM_SAMPLE_RATE,
+            stt=WIDEBAND_STT_SAMPLE_RATE,
+            vad=WIDEBAND_VAD_SAMPLE_RATE,
+            tts=tts_sample_rate,
+            # Played at the TTS rate, so the agent does not resample its own speech
+            room_output=tts_sample_rate,
+        )
+
+    rate = telephony_sample_rate
+    return AudioRates(
+        room_input=rate,
+        stt=rate,
+        vad=rate if rate in VAD_SAMPLE_RATES and not shared_vad else WIDEBAND_VAD_SAMPLE_RATE,
+        tts=rate,
+        room_output=rate,
+    )
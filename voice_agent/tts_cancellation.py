@@ -0,0 +1,162 @@
+# tts_cancellation.py
+#
+# What happens to the Resemble websocket when a synthesis is abandoned, which
+# is what a caller barge-in does: LiveKit cancels the TTS stream and with it
+# patched_run_ws. Before, pool.connection() then marked the socket for closing,
+# Resemble kept synthesizing the sentences already sent into a socket nobody
+# read, and the close ran inside the next turn's pool.get(), in front of the
+# new connect, so the reply right after an interruption paid for both.
+#
+# patched_run_ws now stops sending and decoding at once and hands the socket to
+# TTSCancellation. Resemble has no message to abort a request_id, so:
+#
+# - nothing outstanding: the socket goes straight back to the pool
+# - otherwise the outstanding request_ids are drained in the background without
+#   decoding their audio; if their audio_end messages arrive within
+#   TTS_CANCEL_DRAIN_TIMEOUT_S the socket goes back to the pool, if not it is
+#   closed (which is also what stops Resemble generating audio for it)
+# - meanwhile, if the pool has no other idle socket, a replacement is opened
+#   right away, so the next turn waits neither for the drain nor for a close
+#
+# benchmarks/barge_in_tts.py measures interruption-to-reuse and the next
+# turn's first audio with and without it (TTS_FAST_CANCEL=0).
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional, Set
+
+import aiohttp
+from livekit.agents import utils
+
+cancel_logger = logging.getLogger("tts_cancellation")
+
+TTS_FAST_CANCEL = os.getenv("TTS_FAST_CANCEL", "1") == "1"
+TTS_CANCEL_DRAIN_TIMEOUT_S = float(os.getenv("TTS_CANCEL_DRAIN_TIMEOUT_S", "1.0"))
+# ConnectionPool's default connect timeout
+TTS_REPLACEMENT_CONNECT_TIMEOUT_S = 10.0
+
+WS_CLOSED_TYPES = (
+    aiohttp.WSMsgType.CLOSED,
+    aiohttp.WSMsgType.CLOSE,
+    aiohttp.WSMsgType.CLOSING,
+    aiohttp.WSMsgType.ERROR,
+)
+
+
+class TTSCancellation:
+    """Recycles the Resemble sockets of abandoned syntheses; one per process"""
+
+    def __init__(
+        self,
+        drain_timeout: float = TTS_CANCEL_DRAIN_TIMEOUT_S,
+        on_reuse: Optional[Callable[[float], None]] = None,
+    ):
+        self.drain_timeout = drain_timeout
+        # Called with the seconds from interruption until a socket is idle in the pool again
+        self.on_reuse = on_reuse
+        self._tasks: Set[asyncio.Task] = set()
+
+        # Statistics
+        self.cancelled = 0
+        self.drained = 0
+        self.closed = 0
+        self.replacements = 0
+        self.dropped_messages = 0
+        self.reuse_ms_total = 0.0
+        self.reuse_ms_max = 0.0
+
+    def abandon(
+        self,
+        pool: utils.ConnectionPool,
+        ws: aiohttp.ClientWebSocketResponse,
+        outstanding: Set[int],
+        interrupted_at: float,
+    ):
+        """Take over `ws` once the send and receive tasks of its synthesis were cancelled"""
+        self.cancelled += 1
+        if not outstanding and not ws.closed:
+            pool.put(ws)
+            self._reused(interrupted_at)
+            return
+        task = asyncio.create_task(self._recycle(pool, ws, set(outstanding), interrupted_at), name="tts_cancel_recycle")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _reused(self, interrupted_at: float):
+        elapsed_ms = (time.perf_counter() - interrupted_at) * 1000
+        self.reuse_ms_total += elapsed_ms
+        self.reuse_ms_max = max(self.reuse_ms_max, elapsed_ms)
+        if self.on_reuse is not None:
+            self.on_reuse(elapsed_ms / 1000)
+
+    async def _recycle(
+        self,
+        pool: utils.ConnectionPool,
+        ws: aiohttp.ClientWebSocketResponse,
+        outstanding: Set[int],
+        interrupted_at: float,
+    ):
+        # get() hands out an idle socket if the pool has one and only connects otherwise
+        replacement = asyncio.create_task(pool.get(timeout=TTS_REPLACEMENT_CONNECT_TIMEOUT_S))
+        drain = asyncio.create_task(asyncio.wait_for(self._drain(ws, outstanding), self.drain_timeout))
+        reused = False
+        try:
+            pending = {replacement, drain}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        if task is replacement:
+                            cancel_logger.warning(f"Replacement TTS connection failed: {task.exception()}")
+                        continue
+                    if task is replacement:
+                        self.replacements += 1
+                        pool.put(task.result())
+                    elif not ws.closed:
+                        self.drained += 1
+                        pool.put(ws)
+                    else:
+                        continue
+                    if not reused:
+                        reused = True
+                        self._reused(interrupted_at)
+        finally:
+            await utils.aio.gracefully_cancel(replacement, drain)
+
+        if drain.exception() is not None or ws.closed:
+            self.closed += 1
+            # Closed here rather than in the next pool.get(), then dropped from the pool
+            await ws.close()
+            pool.remove(ws)
+
+    async def _drain(self, ws: aiohttp.ClientWebSocketResponse, outstanding: Set[int]):
+        """Read until Resemble finished every request sent on `ws`"""
+        while outstanding:
+            msg = await ws.receive()
+            if msg.type in WS_CLOSED_TYPES:
+                raise RuntimeError("Resemble connection closed while draining")
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                continue
+            # Audio is dropped without parsing its base64 payload
+            if '"audio_end"' not in msg.data:
+                self.dropped_messages += 1
+                continue
+            outstanding.discard(json.loads(msg.data).get("request_id"))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "cancelled": self.cancelled,
+            "drained": self.drained,
+            "closed": self.closed,
+            "replacements": self.replacements,
+            "dropped_messages": self.dropped_messages,
+            "reuse_ms_avg": self.reuse_ms_total / self.cancelled if self.cancelled else None,
+            "reuse_ms_max": self.reuse_ms_max,
+        }
+
+    async def aclose(self):
+        await utils.aio.gracefully_cancel(*self._tasks)
+        if self.cancelled:
+            cancel_logger.info(f"TTS cancellations: {self.stats()}")
@@ -0,0 +1,402 @@
+# vad_service.py
+#
+# Host-level batched Silero VAD. Instead of every job process loading its own
+# ONNX session and running one 32ms window at a time, job processes write their
+# windows into per-call ring buffers in shared memory and ring a doorbell on a
+# Unix datagram socket. The service process collects windows from all calls for
+# at most `max_wait_ms`, runs them as one batch and rings back. The VAD event
+# logic (thresholds, padding, speech buffers) stays in the job process, in the
+# silero plugin's own VADStream.
+import logging
+import multiprocessing
+import os
+import socket
+import struct
+import threading
+import time
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from livekit.plugins import silero
+from livekit.plugins.silero import onnx_model
+from livekit.plugins.silero import vad as silero_vad
+
+vad_service_logger = logging.getLogger("vad_service")
+
+VAD_SERVICE_ENABLED = os.getenv("VAD_SERVICE") == "1"
+VAD_SERVICE_SOCKET = os.getenv("VAD_SERVICE_SOCKET", "/tmp/galactic_vad.sock")
+VAD_SERVICE_SHM = os.getenv("VAD_SERVICE_SHM", "galactic_vad")
+VAD_SERVICE_SLOTS = int(os.getenv("VAD_SERVICE_SLOTS", "64"))
+VAD_SERVICE_MAX_WAIT_MS = float(os.getenv("VAD_SERVICE_MAX_WAIT_MS", "4"))
+
+SAMPLE_RATE = 16000
+WINDOW_SAMPLES = 512
+CONTEXT_SAMPLES = 64
+RING_SIZE = 4
+
+# Datagram types; slot numbers and pids follow as little-endian uint32
+MSG_CLAIM = b"C"
+MSG_SLOT = b"S"
+MSG_FULL = b"F"
+MSG_WORK = b"W"
+MSG_DONE = b"D"
+MSG_RELEASE = b"R"
+
+STATS_LOG_INTERVAL_S = 60.0
+
+
+class SharedRings:
+    """Numpy views of the shared memory block.
+
+    Per slot: `control` holds the number of windows written by the job process and
+    the number answered by the service, `inputs` a ring of model inputs (context +
+    window) and `outputs` the matching speech probabilities.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, slots: int):
+        self.shm = shm
+        self.control = np.ndarray((slots, 2), dtype=np.int64, buffer=shm.buf)
+        offset = self.control.nbytes
+        self.inputs = np.ndarray(
+            (slots, RING_SIZE, CONTEXT_SAMPLES + WINDOW_SAMPLES), dtype=np.float32, buffer=shm.buf, offset=offset
+        )
+        offset += self.inputs.nbytes
+        self.outputs = np.ndarray((slots, RING_SIZE), dtype=np.float32, buffer=shm.buf, offset=offset)
+
+    @staticmethod
+    def nbytes(slots: int) -> int:
+        return slots * (2 * 8 + RING_SIZE * (CONTEXT_SAMPLES + WINDOW_SAMPLES + 1) * 4)
+
+    @classmethod
+    def create(cls, name: str, slots: int) -> "SharedRings":
+        try:
+            # Left over from a service that did not shut down cleanly
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        return cls(shared_memory.SharedMemory(name=name, create=True, size=cls.nbytes(slots)), slots)
+
+    @classmethod
+    def attach(cls, name: str, slots: int) -> "SharedRings":
+        shm = shared_memory.SharedMemory(name=name)
+        # Python < 3.13 would unlink the block when this job process exits
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm, slots)
+
+    def close(self):
+        # Views must go before the buffer can be released
+        del self.control, self.inputs, self.outputs
+        self.shm.close()
+
+
+class VADInferenceService:
+    """Batches VAD windows from every call on the host into one ONNX run"""
+
+    def __init__(
+        self,
+        socket_path: str = VAD_SERVICE_SOCKET,
+        shm_name: str = VAD_SERVICE_SHM,
+        slots: int = VAD_SERVICE_SLOTS,
+        max_wait_ms: float = VAD_SERVICE_MAX_WAIT_MS,
+        deadline_ms: float = 20.0,
+    ):
+        self.socket_path = socket_path
+        self.shm_name = shm_name
+        self.slots = slots
+        self.max_wait_s = max_wait_ms / 1000
+        self.deadline_s = deadline_ms / 1000
+        self.owners: Dict[int, Tuple[int, bytes]] = {}  # slot -> (pid, client address)
+        self.pending: Dict[int, float] = {}  # slot -> when its doorbell rang
+        self.sock: Optional[socket.socket] = None
+        self.rings: Optional[SharedRings] = None
+        self.session = None
+        self.sr = np.array(SAMPLE_RATE, dtype=np.int64)
+
+        # Statistics
+        self.batches = 0
+        self.windows = 0
+        self.max_batch = 0
+        self.inference_s = 0.0
+        self.deadline_misses = 0
+        self._last_stats_log = time.monotonic()
+
+    def start(self):
+        self.session = onnx_model.new_inference_session(force_cpu=True)
+        self.rings = SharedRings.create(self.shm_name, self.slots)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.socket_path)
+        vad_service_logger.info(f"VAD service listening on {self.socket_path} with {self.slots} slots")
+
+    def serve_forever(self, stop_event: Optional[threading.Event] = None):
+        while stop_event is None or not stop_event.is_set():
+            self.sock.settimeout(1.0)
+            try:
+                data, address = self.sock.recvfrom(64)
+            except socket.timeout:
+                self._reap_dead_owners()
+                self._maybe_log_stats()
+                continue
+            self._handle(data, address)
+            if not self.pending:
+                continue
+
+            # Gather windows from other calls until the wait budget is spent or
+            # every call with a slot is waiting
+            batch_deadline = min(self.pending.values()) + self.max_wait_s
+            while len(self.pending) < len(self.owners):
+                remaining = batch_deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self.sock.settimeout(remaining)
+                try:
+                    data, address = self.sock.recvfrom(64)
+                except socket.timeout:
+                    break
+                self._handle(data, address)
+            self._run_batch()
+            self._maybe_log_stats()
+
+    def _handle(self, data: bytes, address):
+        kind, value = data[:1], struct.unpack("<I", data[1:5])[0] if len(data) >= 5 else 0
+        if kind == MSG_WORK:
+            owner = self.owners.get(value)
+            if owner and owner[1] == address:
+                self.pending.setdefault(value, time.perf_counter())
+        elif kind == MSG_CLAIM:
+            slot = self._claim(value, address)
+            reply = MSG_FULL if slot is None else MSG_SLOT + struct.pack("<I", slot)
+            self._send(reply, address)
+        elif kind == MSG_RELEASE:
+            owner = self.owners.get(value)
+            if owner and owner[1] == address:
+                del self.owners[value]
+                self.pending.pop(value, None)
+
+    def _claim(self, pid: int, address) -> Optional[int]:
+        free = [slot for slot in range(self.slots) if slot not in self.owners]
+        if not free:
+            self._reap_dead_owners()
+            free = [slot for slot in range(self.slots) if slot not in self.owners]
+            if not free:
+                vad_service_logger.warning(f"No free VAD slot for pid {pid}")
+                return None
+        slot = free[0]
+        self.rings.control[slot] = 0
+        self.owners[slot] = (pid, address)
+        return slot
+
+    def _reap_dead_owners(self):
+        for slot, (pid, _) in list(self.owners.items()):
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                del self.owners[slot]
+                self.pending.pop(slot, None)
+
+    def _run_batch(self):
+        rings = self.rings
+        entries: List[Tuple[int, int]] = []
+        written = {}
+        for slot in self.pending:
+            written[slot], answered = rings.control[slot]
+            entries.extend((slot, seq % RING_SIZE) for seq in range(answered, written[slot]))
+        if not entries:
+            self.pending.clear()
+            return
+
+        slots = np.fromiter((slot for slot, _ in entries), dtype=np.int64, count=len(entries))
+        positions = np.fromiter((pos for _, pos in entries), dtype=np.int64, count=len(entries))
+        batch = rings.inputs[slots, positions]
+        started_at = time.perf_counter()
+        # Like the plugin's OnnxModel, the recurrent state starts from zero on every
+        # window, so a batched window gets exactly the probability a local one would
+        state = np.zeros((2, len(entries), 128), dtype=np.float32)
+        out, _ = self.session.run(None, {"input": batch, "state": state, "sr": self.sr})
+        finished_at = time.perf_counter()
+        rings.outputs[slots, positions] = out[:, 0]
+
+        oldest = min(self.pending.values())
+        for slot in self.pending:
+            rings.control[slot, 1] = written[slot]
+            self._send(MSG_DONE, self.owners[slot][1])
+        self.pending.clear()
+
+        self.batches += 1
+        self.windows += len(entries)
+        self.max_batch = max(self.max_batch, len(entries))
+        self.inference_s += finished_at - started_at
+        if finished_at - oldest > self.deadline_s:
+            self.deadline_misses += 1
+
+    def _send(self, data: bytes, address):
+        try:
+            self.sock.sendto(data, address)
+        except OSError:
+            pass  # the job process is gone, its slot is reaped on the next pass
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "slots_in_use": len(self.owners),
+            "batches": self.batches,
+            "windows": self.windows,
+            "avg_batch": self.windows / self.batches if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "avg_inference_ms": self.inference_s / self.batches * 1000 if self.batches else 0.0,
+            "deadline_misses": self.deadline_misses,
+        }
+
+    def _maybe_log_stats(self):
+        now = time.monotonic()
+        if now - self._last_stats_log >= STATS_LOG_INTERVAL_S:
+            self._last_stats_log = now
+            vad_service_logger.info(f"VAD service: {self.stats()}")
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+        if self.rings:
+            self.rings.close()
+            self.rings.shm.unlink()
+
+
+def _run_service(ready):
+    service = VADInferenceService()
+    service.start()
+    ready.set()
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+def start_service_process(timeout: float = 30.0) -> Optional[multiprocessing.Process]:
+    """Start the service next to the worker; job processes connect on their own"""
+    ctx = multiprocessing.get_context("spawn")
+    ready = ctx.Event()
+    process = ctx.Process(target=_run_service, args=(ready,), daemon=True, name="vad_service")
+    process.start()
+    if not ready.wait(timeout):
+        vad_service_logger.error("VAD service did not start, job processes will run VAD locally")
+        process.terminate()
+        return None
+    return process
+
+
+_local_session = None
+
+
+def _local_model(sample_rate: int) -> onnx_model.OnnxModel:
+    global _local_session
+    if _local_session is None:
+        _local_session = onnx_model.new_inference_session(force_cpu=True)
+    return onnx_model.OnnxModel(onnx_session=_local_session, sample_rate=sample_rate)
+
+
+def _release(sock: socket.socket, rings: SharedRings, slot: int):
+    try:
+        sock.sendto(MSG_RELEASE + struct.pack("<I", slot), VAD_SERVICE_SOCKET)
+    except OSError:
+        pass
+    sock.close()
+    rings.close()
+
+
+class RemoteVADModel:
+    """Stand-in for the silero plugin's OnnxModel that runs inference in the service.
+
+    Called from the VADStream's executor thread, so it can block on the doorbell.
+    Falls back to a local ONNX session when the service is down or too slow.
+    """
+
+    def __init__(self, timeout_s: float = 0.1):
+        self.sample_rate = SAMPLE_RATE
+        self.window_size_samples = WINDOW_SAMPLES
+        self.context_size = CONTEXT_SAMPLES
+        self.slot: Optional[int] = None
+        self.fallback: Optional[onnx_model.OnnxModel] = None
+        self._context = np.zeros(CONTEXT_SAMPLES, dtype=np.float32)
+        self._seq = 0
+
+        try:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            # Abstract address, gone with the process
+            self.sock.bind(f"\0galactic_vad_{os.getpid()}_{id(self)}")
+            self.sock.settimeout(timeout_s)
+            self.sock.sendto(MSG_CLAIM + struct.pack("<I", os.getpid()), VAD_SERVICE_SOCKET)
+            reply = self.sock.recv(64)
+            if reply[:1] != MSG_SLOT:
+                raise RuntimeError("no free slot")
+            self.slot = struct.unpack("<I", reply[1:5])[0]
+            self.rings = SharedRings.attach(VAD_SERVICE_SHM, VAD_SERVICE_SLOTS)
+        except (OSError, RuntimeError) as e:
+            vad_service_logger.warning(f"VAD service unavailable ({e}), running VAD locally")
+            self._fall_back()
+            return
+        weakref.finalize(self, _release, self.sock, self.rings, self.slot)
+
+    def _fall_back(self):
+        self.fallback = _local_model(SAMPLE_RATE)
+
+    def __call__(self, x: np.ndarray) -> float:
+        if self.fallback is not None:
+            return self.fallback(x)
+
+        rings, slot = self.rings, self.slot
+        position = self._seq % RING_SIZE
+        rings.inputs[slot, position, :CONTEXT_SAMPLES] = self._context
+        rings.inputs[slot, position, CONTEXT_SAMPLES:] = x
+        self._context = rings.inputs[slot, position, -CONTEXT_SAMPLES:].copy()
+        self._seq += 1
+        rings.control[slot, 0] = self._seq
+
+        try:
+            self.sock.sendto(MSG_WORK + struct.pack("<I", slot), VAD_SERVICE_SOCKET)
+            while rings.control[slot, 1] < self._seq:
+                self.sock.recv(64)
+        except OSError as e:
+            vad_service_logger.warning(f"VAD service stopped answering ({e}), running VAD locally")
+            self._fall_back()
+            return self.fallback(x)
+        return float(rings.outputs[slot, position])
+
+
+class SharedVAD(silero.VAD):
+    """silero.VAD whose streams run inference in the host's VAD service.
+
+    Does not load an ONNX session in the job process unless the service is down.
+    """
+
+    @classmethod
+    def load(
+        cls,
+        *,
+        min_speech_duration: float = 0.05,
+        min_silence_duration: float = 0.55,
+        prefix_padding_duration: float = 0.5,
+        max_buffered_speech: float = 60.0,
+        activation_threshold: float = 0.5,
+    ) -> "SharedVAD":
+        opts = silero_vad._VADOptions(
+            min_speech_duration=min_speech_duration,
+            min_silence_duration=min_silence_duration,
+            prefix_padding_duration=prefix_padding_duration,
+            max_buffered_speech=max_buffered_speech,
+            activation_threshold=activation_threshold,
+            sample_rate=SAMPLE_RATE,
+        )
+        return cls(session=None, opts=opts)
+
+    def stream(self) -> silero_vad.VADStream:
+        stream = silero_vad.VADStream(self, self._opts, RemoteVADModel())
+        self._streams.add(stream)
+        return stream
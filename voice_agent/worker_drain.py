@@ -0,0 +1,113 @@
+# worker_drain.py
+#
+# Graceful drain of a worker. SIGTERM makes LiveKit's CLI drain the worker: it
+# reports itself full so no new jobs are assigned and waits for running jobs.
+# When its drain_timeout expires though, it exits without closing the job
+# processes, so their shutdown callbacks (lead updates, post-call records,
+# journals, metrics CSV) never run. WorkerDrain enforces an earlier deadline of
+# its own: it asks the remaining jobs to shut down with DRAIN_SHUTDOWN_REASON,
+# which hangs up their calls and runs those callbacks, so LiveKit's wait ends
+# normally and the worker exits cleanly. worker_supervisor.py uses this for
+# rolling restarts.
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+drain_logger = logging.getLogger("worker_drain")
+
+# How long in-flight calls may continue once the worker drains
+DRAIN_TIMEOUT_S = float(os.getenv("DRAIN_TIMEOUT_S", "600"))
+# Time jobs get to run their shutdown callbacks after the deadline; LiveKit's own
+# drain timeout is set past it so ours always fires first
+DRAIN_SHUTDOWN_GRACE_S = 60.0
+DRAIN_SHUTDOWN_REASON = "worker drain deadline"
+DRAIN_LOG_INTERVAL_S = 30.0
+
+
+class WorkerDrain:
+    """Watches the worker for the drain LiveKit starts on SIGTERM and enforces DRAIN_TIMEOUT_S.
+
+    check() is called from load_fnc, which LiveKit keeps calling every 0.5s on an
+    executor thread while the worker drains.
+    """
+
+    def __init__(self, timeout_s: float = DRAIN_TIMEOUT_S):
+        self.timeout_s = timeout_s
+        self.lock = threading.Lock()
+        self.worker: Any = None
+        self.started_at: Optional[float] = None
+        self._deadline_hit = False
+        self._last_log = 0.0
+
+        # Statistics
+        self.calls_at_start = 0
+        self.calls_ended_at_deadline = 0
+
+    @property
+    def livekit_drain_timeout(self) -> int:
+        """drain_timeout for WorkerOptions"""
+        return int(self.timeout_s + DRAIN_SHUTDOWN_GRACE_S)
+
+    @property
+    def draining(self) -> bool:
+        return bool(getattr(self.worker, "_draining", False))
+
+    def _running_procs(self) -> list:
+        pool = getattr(self.worker, "_proc_pool", None)
+        return [p for p in getattr(pool, "processes", []) if p.running_job]
+
+    def check(self, worker: Any) -> bool:
+        """Returns True while the worker is draining"""
+        with self.lock:
+            self.worker = worker
+            if not self.draining:
+                return False
+
+            now = time.monotonic()
+            running = self._running_procs()
+            if self.started_at is None:
+                self.started_at = now
+                self.calls_at_start = len(running)
+                drain_logger.info(
+                    f"Draining: {len(running)} calls in flight, deadline in {self.timeout_s:.0f}s"
+                )
+
+            elapsed = now - self.started_at
+            if running and elapsed >= self.timeout_s and not self._deadline_hit:
+                self._deadline_hit = True
+                self.calls_ended_at_deadline = len(running)
+                drain_logger.warning(f"Drain deadline reached, ending {len(running)} calls still in flight")
+                worker._loop.call_soon_threadsafe(self._shut_down_jobs, running)
+            elif now - self._last_log >= DRAIN_LOG_INTERVAL_S:
+                self._last_log = now
+                drain_logger.info(f"Draining: {len(running)} calls in flight after {elapsed:.0f}s")
+            return True
+
+    def _shut_down_jobs(self, procs: list):
+        for proc in procs:
+            asyncio.ensure_future(self._shut_down_job(proc))
+
+    async def _shut_down_job(self, proc: Any):
+        from livekit.agents.ipc import channel, proto
+
+        # The reason tells the job it is being cut short, not that the callee left;
+        # proc.aclose() then waits for its shutdown callbacks
+        try:
+            await channel.asend_message(proc._pch, proto.ShutdownRequest(reason=DRAIN_SHUTDOWN_REASON))
+        except Exception as e:
+            drain_logger.warning(f"Could not send the drain shutdown to a job process: {e}")
+        await proc.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        pool = getattr(self.worker, "_proc_pool", None)
+        warmed = getattr(pool, "_warmed_proc_queue", None)
+        return {
+            "registered": bool(getattr(self.worker, "id", None)),
+            "draining": self.draining,
+            "active_calls": len(self._running_procs()),
+            "warm_processes": warmed.qsize() if warmed is not None else 0,
+            "drain_elapsed_s": time.monotonic() - self.started_at if self.started_at is not None else None,
+        }
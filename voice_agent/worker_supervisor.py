@@ -0,0 +1,310 @@
+# worker_supervisor.py
+#
+# Runs the agent workers of a host and restarts them without dropping calls.
+# Each worker is `python main.py start` with its own ports (LiveKit HTTP, metrics,
+# telemetry) and VAD service socket. A rolling restart replaces the workers one
+# at a time: the replacement starts first and must report registered, warm job
+# processes on its metrics endpoint before the old worker gets SIGTERM and drains
+# (see worker_drain.py), so the host never has less warm capacity than before.
+# Workers that crash are restarted with backoff, workers that ask to be recycled
+# (see memory_watchdog.py) are replaced the same way as in a rolling restart, and
+# stopping the supervisor drains every worker. Run from voice_agent/:
+#
+#   python worker_supervisor.py run --workers 2
+#   python worker_supervisor.py restart      # rolling restart (or SIGHUP)
+#   python worker_supervisor.py stop         # drain and exit (or SIGTERM)
+import argparse
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from worker_drain import DRAIN_SHUTDOWN_GRACE_S, DRAIN_TIMEOUT_S
+
+supervisor_logger = logging.getLogger("worker_supervisor")
+
+PIDFILE = os.getenv("WORKER_SUPERVISOR_PIDFILE", "/tmp/galactic_worker_supervisor.pid")
+WORKER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Ports of slot 0; slot N uses base + N
+BASE_PORTS = {
+    "WORKER_HTTP_PORT": int(os.getenv("WORKER_HTTP_PORT", "8081")),
+    "METRICS_PORT": int(os.getenv("METRICS_PORT", "9464")),
+    "WORKER_TELEMETRY_PORT": int(os.getenv("WORKER_TELEMETRY_PORT", "8790")),
+}
+VAD_SERVICE_SOCKET = os.getenv("VAD_SERVICE_SOCKET", "/tmp/galactic_vad.sock")
+VAD_SERVICE_SHM = os.getenv("VAD_SERVICE_SHM", "galactic_vad")
+
+# A draining worker is killed only once LiveKit's own drain should have ended it
+KILL_AFTER_S = DRAIN_TIMEOUT_S + DRAIN_SHUTDOWN_GRACE_S + 30.0
+MAX_RESTART_BACKOFF_S = 60.0
+RECYCLE_POLL_INTERVAL_S = float(os.getenv("RECYCLE_POLL_S", "15"))
+
+
+@dataclass
+class WorkerHandle:
+    slot: int
+    process: subprocess.Popen
+    started_at: float
+    draining_since: Optional[float] = None
+
+    @property
+    def metrics_url(self) -> str:
+        return f"http://127.0.0.1:{BASE_PORTS['METRICS_PORT'] + self.slot}/metrics"
+
+
+def parse_gauges(text: str) -> Dict[str, float]:
+    """voice_agent_* gauges from the worker's Prometheus output"""
+    gauges = {}
+    for line in text.splitlines():
+        if line.startswith("voice_agent_") and "{" not in line:
+            name, _, value = line.partition(" ")
+            try:
+                gauges[name[len("voice_agent_"):]] = float(value)
+            except ValueError:
+                continue
+    return gauges
+
+
+class WorkerSupervisor:
+    def __init__(
+        self,
+        workers: int,
+        command: List[str],
+        min_warm: int = int(os.getenv("IDLE_PROCS_MIN", "1")),
+        ready_timeout_s: float = 180.0,
+        max_draining: int = 1,
+    ):
+        self.workers = workers
+        self.command = command
+        self.min_warm = min_warm
+        self.ready_timeout_s = ready_timeout_s
+        self.max_draining = max_draining
+
+        self.active: List[WorkerHandle] = []
+        self.draining: List[WorkerHandle] = []
+        self.restart_requested = False
+        self.stop_requested = False
+        self._crashes = 0
+        self._last_recycle_poll = 0.0
+
+        # Statistics
+        self.rolling_restarts = 0
+        self.crash_restarts = 0
+        self.recycles = 0
+
+    def _env(self, slot: int) -> Dict[str, str]:
+        env = dict(os.environ)
+        for name, base in BASE_PORTS.items():
+            env[name] = str(base + slot)
+        env["VAD_SERVICE_SOCKET"] = f"{VAD_SERVICE_SOCKET}.{slot}"
+        env["VAD_SERVICE_SHM"] = f"{VAD_SERVICE_SHM}_{slot}"
+        # The worker leaves recycling to us instead of draining itself
+        env["WORKER_SUPERVISED"] = "1"
+        return env
+
+    def _free_slot(self) -> int:
+        used = {w.slot for w in self.active + self.draining}
+        return next(slot for slot in range(len(used) + 1) if slot not in used)
+
+    def spawn(self) -> WorkerHandle:
+        slot = self._free_slot()
+        process = subprocess.Popen(self.command, cwd=WORKER_DIR, env=self._env(slot))
+        supervisor_logger.info(f"Started worker pid {process.pid} in slot {slot}")
+        return WorkerHandle(slot, process, time.monotonic())
+
+    def status(self, worker: WorkerHandle) -> Optional[Dict[str, float]]:
+        try:
+            with urllib.request.urlopen(worker.metrics_url, timeout=2) as response:
+                return parse_gauges(response.read().decode())
+        except OSError:
+            return None
+
+    def wait_ready(self, worker: WorkerHandle) -> bool:
+        """Until the worker is registered with LiveKit and has `min_warm` prewarmed processes"""
+        deadline = time.monotonic() + self.ready_timeout_s
+        while time.monotonic() < deadline and not self.stop_requested:
+            if worker.process.poll() is not None:
+                supervisor_logger.error(f"Worker pid {worker.process.pid} exited with {worker.process.returncode} while starting")
+                return False
+            gauges = self.status(worker)
+            if gauges and gauges.get("registered") and gauges.get("warm_processes", 0) >= self.min_warm:
+                supervisor_logger.info(
+                    f"Worker pid {worker.process.pid} ready after {time.monotonic() - worker.started_at:.1f}s "
+                    f"with {gauges['warm_processes']:.0f} warm processes"
+                )
+                return True
+            self.reap()
+            time.sleep(1.0)
+        return False
+
+    def drain(self, worker: WorkerHandle):
+        supervisor_logger.info(f"Draining worker pid {worker.process.pid}")
+        worker.draining_since = time.monotonic()
+        if worker.process.poll() is None:
+            worker.process.send_signal(signal.SIGTERM)
+        self.draining.append(worker)
+
+    def reap(self):
+        """Forget drained workers that exited, restart crashed ones, kill stuck ones"""
+        now = time.monotonic()
+        for worker in list(self.draining):
+            if worker.process.poll() is not None:
+                supervisor_logger.info(
+                    f"Worker pid {worker.process.pid} drained in {now - worker.draining_since:.0f}s "
+                    f"(exit {worker.process.returncode})"
+                )
+                self.draining.remove(worker)
+            elif now - worker.draining_since > KILL_AFTER_S:
+                supervisor_logger.error(f"Worker pid {worker.process.pid} still running {KILL_AFTER_S:.0f}s into its drain, killing it")
+                worker.process.kill()
+
+        for worker in list(self.active):
+            if worker.process.poll() is None:
+                continue
+            self.active.remove(worker)
+            if self.stop_requested:
+                continue
+            self.crash_restarts += 1
+            # Back off while workers keep dying soon after starting, e.g. on a bad deploy
+            self._crashes = self._crashes + 1 if now - worker.started_at < 60 else 0
+            backoff = min(MAX_RESTART_BACKOFF_S, 2.0 ** self._crashes) if self._crashes else 0.0
+            supervisor_logger.error(
+                f"Worker pid {worker.process.pid} exited with {worker.process.returncode}, restarting in {backoff:.0f}s"
+            )
+            time.sleep(backoff)
+            self.active.append(self.spawn())
+
+    def replace(self, old: WorkerHandle) -> bool:
+        """Start a replacement, wait until it is warm, then drain `old`"""
+        while len(self.draining) >= self.max_draining and not self.stop_requested:
+            self.reap()
+            time.sleep(1.0)
+        if self.stop_requested:
+            return False
+        if old not in self.active:
+            # Crashed and was already replaced
+            return True
+
+        new = self.spawn()
+        if not self.wait_ready(new):
+            supervisor_logger.error(
+                f"Replacement worker pid {new.process.pid} not ready within {self.ready_timeout_s:.0f}s, "
+                f"keeping worker pid {old.process.pid}"
+            )
+            self.drain(new)
+            return False
+        self.active[self.active.index(old)] = new
+        self.drain(old)
+        return True
+
+    def rolling_restart(self):
+        self.restart_requested = False
+        self.rolling_restarts += 1
+        supervisor_logger.info(f"Rolling restart of {len(self.active)} workers")
+        for old in list(self.active):
+            if not self.replace(old):
+                return
+        supervisor_logger.info("Rolling restart done")
+
+    def recycle_workers(self):
+        """Replace the workers whose memory watchdog asks to be recycled"""
+        now = time.monotonic()
+        if now - self._last_recycle_poll < RECYCLE_POLL_INTERVAL_S:
+            return
+        self._last_recycle_poll = now
+        for worker in list(self.active):
+            gauges = self.status(worker)
+            if gauges and gauges.get("memory_recycle_requested"):
+                supervisor_logger.info(f"Recycling worker pid {worker.process.pid} on its request")
+                if self.replace(worker):
+                    self.recycles += 1
+
+    def stop(self):
+        supervisor_logger.info(f"Stopping: draining {len(self.active)} workers")
+        for worker in list(self.active):
+            self.active.remove(worker)
+            self.drain(worker)
+        while self.draining:
+            self.reap()
+            time.sleep(1.0)
+        supervisor_logger.info(
+            f"All workers stopped ({self.rolling_restarts} rolling restarts, {self.recycles} recycles, "
+            f"{self.crash_restarts} crash restarts)"
+        )
+
+    def run(self):
+        def on_signal(signum, frame):
+            if signum == signal.SIGHUP:
+                self.restart_requested = True
+            else:
+                self.stop_requested = True
+
+        for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, on_signal)
+
+        with open(PIDFILE, "w") as f:
+            f.write(str(os.getpid()))
+        try:
+            for _ in range(self.workers):
+                self.active.append(self.spawn())
+            while not self.stop_requested:
+                if self.restart_requested:
+                    self.rolling_restart()
+                self.recycle_workers()
+                self.reap()
+                time.sleep(1.0)
+            self.stop()
+        finally:
+            if os.path.exists(PIDFILE):
+                os.remove(PIDFILE)
+
+
+def signal_supervisor(sig: int) -> int:
+    try:
+        with open(PIDFILE) as f:
+            pid = int(f.read().strip())
+        os.kill(pid, sig)
+    except (OSError, ValueError) as e:
+        print(f"No running supervisor ({PIDFILE}): {e}", file=sys.stderr)
+        return 1
+    print(f"Sent {signal.Signals(sig).name} to supervisor pid {pid}")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run agent workers with graceful rolling restarts")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="Start and supervise the workers")
+    run.add_argument("--workers", type=int, default=1)
+    run.add_argument("--ready-timeout", type=float, default=180.0, help="Seconds a replacement has to become warm")
+    run.add_argument("--max-draining", type=int, default=1, help="Workers allowed to drain at the same time")
+    run.add_argument("worker_args", nargs=argparse.REMAINDER, help="Worker command (default: python main.py start)")
+    commands.add_parser("restart", help="Rolling restart of the running supervisor's workers")
+    commands.add_parser("stop", help="Drain all workers and stop the supervisor")
+    args = parser.parse_args(argv)
+
+    if args.command == "restart":
+        return signal_supervisor(signal.SIGHUP)
+    if args.command == "stop":
+        return signal_supervisor(signal.SIGTERM)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    worker_args = [a for a in args.worker_args if a != "--"]
+    supervisor = WorkerSupervisor(
+        args.workers,
+        worker_args or [sys.executable, "main.py", "start"],
+        ready_timeout_s=args.ready_timeout,
+        max_draining=args.max_draining,
+    )
+    supervisor.run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
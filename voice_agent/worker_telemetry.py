@@ -0,0 +1,109 @@
+# worker_telemetry.py
+import json
+import logging
+import os
+import socket
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+telemetry_logger = logging.getLogger("worker_telemetry")
+
+TELEMETRY_HOST = "127.0.0.1"
+TELEMETRY_PORT = int(os.getenv("WORKER_TELEMETRY_PORT", "8790"))
+
+# Datagrams larger than this are dropped by the sender instead of fragmented
+MAX_DATAGRAM_BYTES = 8192
+
+_client_socket: Optional[socket.socket] = None
+
+
+def send(event: str, **fields: Any) -> None:
+    """Fire-and-forget a telemetry event from a job process to the worker process.
+
+    Uses a non-blocking localhost UDP socket so it is safe to call from the event
+    loop: if the worker is not listening or the socket buffer is full the event is
+    simply dropped.
+    """
+    global _client_socket
+    try:
+        if _client_socket is None:
+            _client_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            _client_socket.setblocking(False)
+
+        fields["event"] = event
+        fields["pid"] = os.getpid()
+        payload = json.dumps(fields, separators=(",", ":")).encode()
+        if len(payload) > MAX_DATAGRAM_BYTES:
+            return
+        _client_socket.sendto(payload, (TELEMETRY_HOST, TELEMETRY_PORT))
+    except (BlockingIOError, ConnectionRefusedError):
+        pass
+    except Exception as e:
+        telemetry_logger.debug(f"Failed to send telemetry event {event}: {e}")
+
+
+class TelemetryServer:
+    """Receives telemetry events from job processes in the worker (main) process"""
+
+    def __init__(self, host: str = TELEMETRY_HOST, port: int = TELEMETRY_PORT):
+        self.host = host
+        self.port = port
+        self.handlers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {}
+        self.sock: Optional[socket.socket] = None
+        self.thread: Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+
+        # Statistics
+        self.received_count = 0
+        self.error_count = 0
+
+    def subscribe(self, event: str, handler: Callable[[Dict[str, Any]], None]):
+        """Register a handler called (on the receiver thread) for every event of this type"""
+        self.handlers.setdefault(event, []).append(handler)
+
+    def start(self) -> bool:
+        """Bind the UDP socket and start the receiver thread"""
+        try:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.bind((self.host, self.port))
+            self.sock.settimeout(0.5)
+        except OSError as e:
+            telemetry_logger.error(
+                f"Failed to bind telemetry socket {self.host}:{self.port}: {e}"
+            )
+            self.sock = None
+            return False
+
+        self.stop_event.clear()
+        self.thread = threading.Thread(
+            target=self._recv_loop, daemon=True, name="WorkerTelemetry"
+        )
+        self.thread.start()
+        telemetry_logger.info(f"Listening for job telemetry on {self.host}:{self.port}")
+        return True
+
+    def _recv_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                data, _ = self.sock.recvfrom(MAX_DATAGRAM_BYTES)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+
+            try:
+                event = json.loads(data)
+                self.received_count += 1
+                for handler in self.handlers.get(event.get("event"), ()):
+                    handler(event)
+            except Exception as e:
+                self.error_count += 1
+                telemetry_logger.error(f"Error handling telemetry event: {e}")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=2)
+        if self.sock:
+            self.sock.close()
+            self.sock = None